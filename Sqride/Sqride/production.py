@@ -40,6 +40,30 @@ DATABASES = {
     }
 }
 
+# Shared cache, so kitchen state versions and station routing invalidations
+# reach every worker process instead of only the one that made the change
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Kitchen display pushes (group_send) must reach sockets held by every ASGI
+# worker. Without REDIS_URL the in-memory layer from settings.py is kept,
+# which only supports a single worker process.
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        },
+    }
+
 # Static and media files (adjust as needed)
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
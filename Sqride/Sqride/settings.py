@@ -47,8 +47,10 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     
+    'channels',
     'rest_framework',
     'rest_framework_simplejwt',
+    'django_filters',
     'drf_yasg',
     'djoser',
     
@@ -98,6 +100,17 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Sqride.wsgi.application'
+ASGI_APPLICATION = 'Sqride.asgi.application'
+
+# Kitchen displays subscribe to kitchen_<branch_id> groups over WebSockets.
+# The in-memory layer only reaches sockets in the same process, so it
+# supports a single ASGI worker; production.py switches to channels_redis
+# when REDIS_URL is set.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
 
 
 # Database
@@ -213,6 +226,50 @@ SIMPLE_JWT = {
 
 PASSWORD_RESET_TIMEOUT=900  #900 sec = 15 min
 
+# Receipts/invoices are rendered in a background worker once payment completes
+INVOICE_RENDER_ASYNC = True
+INVOICE_RENDER_WORKERS = 2
+
+# Per-branch daily order numbers. 1 keeps them gapless; larger values let each
+# worker reserve a block of numbers at a time (fewer counter writes, gaps allowed)
+ORDER_NUMBER_BLOCK_SIZE = 1
+
+# Kitchen queues: a waiting item gains one priority point per this many minutes
+KITCHEN_PRIORITY_AGING_MINUTES = 5
+
+# Kitchen tickets not finished this many minutes after they reach the kitchen
+# are flagged by the scan_sla_breaches worker
+KITCHEN_SLA_MINUTES = 20
+
+# Each worker reloads its ticket ETA snapshot (item prep time averages,
+# station queue depths, available cooks) per branch after this many seconds
+KITCHEN_ETA_REFRESH_SECONDS = 30
+
+# Workers cache each branch's kitchen state version for this many seconds;
+# without a shared cache this bounds how long other workers can serve a
+# stale version (and 304s) after a kitchen write
+KITCHEN_STATE_CACHE_SECONDS = 1
+
+# Workers recompile their station routing tables at least this often, so
+# route changes reach every worker even without a shared cache
+KITCHEN_ROUTING_MAX_AGE_SECONDS = 60
+
+# Kitchen notifications untouched for this many days are deleted by the
+# purge_kitchen_notifications command
+KITCHEN_NOTIFICATION_RETENTION_DAYS = 7
+
+# Kitchen events older than this many days are deleted by the
+# purge_kitchen_events command; display projections further behind rebuild
+KITCHEN_EVENT_RETENTION_DAYS = 2
+
+# Batched kitchen display updates can wait this long to absorb bursts from
+# separate requests (0 sends each committed batch right away)
+KITCHEN_UPDATE_DEBOUNCE_MS = 0
+
+# Kitchen display sockets that have not authenticated within this many
+# seconds of connecting are closed
+KITCHEN_WS_AUTH_TIMEOUT_SECONDS = 10
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, set to False in production
 # CORS_ALLOWED_ORIGINS = [
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    KitchenStation, KitchenOrder, KitchenOrderItem, 
+    KitchenStation, StationRoute, KitchenOrder, KitchenOrderItem, 
     KitchenDisplay, KitchenStaff, KitchenAnalytics, KitchenNotification
 )
 
@@ -12,6 +12,12 @@ class KitchenStationAdmin(admin.ModelAdmin):
     list_editable = ('is_active',)
     ordering = ('branch', 'name')
 
+@admin.register(StationRoute)
+class StationRouteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'branch', 'category', 'item', 'station')
+    list_filter = ('branch', 'station')
+    search_fields = ('category__name', 'item__name', 'station__name')
+
 @admin.register(KitchenOrder)
 class KitchenOrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'order', 'status', 'priority', 'branch', 'created_at')
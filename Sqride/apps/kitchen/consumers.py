@@ -0,0 +1,95 @@
+import asyncio
+from urllib.parse import parse_qs
+from django.conf import settings
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from accounts.authentication import MultiUserJWTAuthentication
+from accounts.models import UserRole
+
+# Close codes sent to clients that fail authentication or authorization
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+
+
+class KitchenConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live kitchen feed for a branch at ws/kitchen/.
+
+    Clients authenticate with the same JWT access token as the REST API,
+    either as ``?token=<jwt>`` on the URL or as the first message:
+    ``{"type": "authenticate", "token": "<jwt>"}``. The token's role must
+    grant kitchen_display; the socket then joins the ``kitchen_<branch_id>``
+    group that KitchenNotificationService publishes to. Sockets still
+    unauthenticated after KITCHEN_WS_AUTH_TIMEOUT_SECONDS are closed.
+    """
+
+    async def connect(self):
+        self.group_name = None
+        self.auth_timeout = None
+        await self.accept()
+
+        token = parse_qs(self.scope.get('query_string', b'').decode()).get('token')
+        if token:
+            await self.authenticate(token[0])
+        else:
+            self.auth_timeout = asyncio.create_task(self.close_unauthenticated())
+
+    async def close_unauthenticated(self):
+        await asyncio.sleep(getattr(settings, 'KITCHEN_WS_AUTH_TIMEOUT_SECONDS', 10))
+        if self.group_name is None:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+
+    async def disconnect(self, code):
+        if self.auth_timeout is not None:
+            self.auth_timeout.cancel()
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        message_type = content.get('type')
+
+        if self.group_name is None:
+            if message_type == 'authenticate' and content.get('token'):
+                await self.authenticate(content['token'])
+            else:
+                await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+
+        if message_type == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def authenticate(self, raw_token):
+        branch_id, error_code = await self.resolve_branch(raw_token)
+        if branch_id is None:
+            await self.close(code=error_code)
+            return
+
+        self.group_name = f"kitchen_{branch_id}"
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.send_json({'type': 'authenticated', 'branch_id': branch_id})
+
+    @database_sync_to_async
+    def resolve_branch(self, raw_token):
+        """Validate the token and return (branch_id, None) or (None, close_code)"""
+        authentication = MultiUserJWTAuthentication()
+        try:
+            validated_token = authentication.get_validated_token(raw_token)
+            user = authentication.get_user(validated_token)
+        except (TokenError, AuthenticationFailed):
+            return None, CLOSE_UNAUTHENTICATED
+
+        role_id = validated_token.get('role_id')
+        branch_id = getattr(user, 'branch_id', None)
+        if not role_id or not branch_id:
+            return None, CLOSE_FORBIDDEN
+        if not UserRole.objects.filter(id=role_id, branch_id=branch_id, kitchen_display=True).exists():
+            return None, CLOSE_FORBIDDEN
+        return branch_id, None
+
+    async def kitchen_update(self, event):
+        await self.send_json({'type': 'kitchen.update', **event['message']})
+
+    async def kitchen_delay_alert(self, event):
+        await self.send_json({'type': 'kitchen.delay_alert', **event['message']})
@@ -0,0 +1,11 @@
+from kitchen.management.purge import PurgeCommand
+from kitchen.models import KitchenEvent
+
+
+class Command(PurgeCommand):
+    help = 'Delete kitchen events older than the retention period'
+    model = KitchenEvent
+    cutoff_field = 'created_at'
+    retention_setting = 'KITCHEN_EVENT_RETENTION_DAYS'
+    default_days = 2
+    days_help = 'Delete events logged more than this many days ago'
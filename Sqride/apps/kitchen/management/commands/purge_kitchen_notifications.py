@@ -0,0 +1,11 @@
+from kitchen.management.purge import PurgeCommand
+from kitchen.models import KitchenNotification
+
+
+class Command(PurgeCommand):
+    help = 'Delete kitchen notifications older than the retention period'
+    model = KitchenNotification
+    cutoff_field = 'updated_at'
+    retention_setting = 'KITCHEN_NOTIFICATION_RETENTION_DAYS'
+    default_days = 7
+    days_help = 'Delete notifications not updated for this many days'
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from kitchen.services import KitchenSLAService
+
+
+class Command(BaseCommand):
+    help = 'Flag kitchen orders past their SLA deadline and alert their branches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Seconds between scans; 0 runs a single scan (for cron)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of overdue orders flagged per transaction'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if interval <= 0:
+            self.scan(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS('SLA scan complete'))
+            return
+
+        # Runs until stopped; each pass reports what it flagged
+        while True:
+            self.scan(options['batch_size'])
+            time.sleep(interval)
+
+    def scan(self, batch_size):
+        flagged = KitchenSLAService.scan(batch_size=batch_size)
+        if flagged:
+            self.stdout.write(
+                self.style.WARNING(f'Flagged {flagged} orders past their SLA')
+            )
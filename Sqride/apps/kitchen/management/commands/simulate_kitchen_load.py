@@ -0,0 +1,413 @@
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.models import User
+from items.models import Item
+from orders.models import Order
+from orders.services import OrderService
+from restaurants.models import Branch
+from kitchen.models import KitchenDisplay, KitchenOrder
+from kitchen.services import StationRoutingService
+from kitchen.views import KitchenDisplayViewSet, KitchenOrderViewSet
+
+OPERATIONS = ('create', 'start', 'bump', 'refresh')
+
+start_view = KitchenOrderViewSet.as_view({'post': 'start'})
+bump_view = KitchenOrderViewSet.as_view({'post': 'complete'})
+refresh_view = KitchenDisplayViewSet.as_view({'get': 'real_time_data'})
+
+
+def _weights(value, name):
+    """Parse ``id:weight,id:weight`` into {id: weight}"""
+    weights = {}
+    for part in filter(None, value.split(',')):
+        key, _, weight = part.partition(':')
+        try:
+            weights[int(key)] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f'{name} must look like "id:weight,id:weight", got "{part}"')
+    return weights
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return 0
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class QueryCounter:
+    """execute_wrapper hook counting the queries run by one operation"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Schedule:
+    """
+    Time-ordered task queue shared by the worker threads: get() blocks
+    until the earliest task is due, and returns None once the queue is
+    empty and no running task can add to it any more.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._cond = threading.Condition()
+
+    def put(self, due, task):
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), task))
+            self._cond.notify()
+
+    def get(self):
+        with self._cond:
+            while self._heap or self._running:
+                delay = self._heap[0][0] - time.monotonic() if self._heap else None
+                if delay is not None and delay <= 0:
+                    self._running += 1
+                    return heapq.heappop(self._heap)
+                self._cond.wait(delay)
+            return None
+
+    def done(self):
+        """Mark a task returned by get() as finished, after it queued its follow-ups"""
+        with self._cond:
+            self._running -= 1
+            self._cond.notify_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive a synthetic order stream through the order and kitchen paths '
+        'of a branch and report throughput, query counts and latencies. '
+        'Simulated orders are real rows: run it against a staging database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--branch-id',
+            type=int,
+            required=True,
+            help='Branch to place orders on (its kitchen must be enabled)'
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Kitchen user bumping tickets and refreshing displays '
+                 '(default: the first user of the branch with kitchen display access)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=60,
+            help='Mean order arrival rate per minute (Poisson arrivals)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=60,
+            help='Seconds over which orders arrive; tickets still open are bumped afterwards'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Concurrent worker threads, each with its own database connection'
+        )
+        parser.add_argument(
+            '--items-per-order',
+            type=int,
+            default=3,
+            help='Maximum distinct items per order (each order gets 1..n)'
+        )
+        parser.add_argument(
+            '--max-quantity',
+            type=int,
+            default=2,
+            help='Maximum quantity per order line'
+        )
+        parser.add_argument(
+            '--item-mix',
+            default='',
+            help='Relative item weights as "item_id:weight,..." (default: all active items, equally)'
+        )
+        parser.add_argument(
+            '--station-mix',
+            default='',
+            help='Relative station weights as "station_id:weight,..."; each line picks a '
+                 'station first, then one of the items routed to it'
+        )
+        parser.add_argument(
+            '--start-delay',
+            type=float,
+            default=5,
+            help='Mean seconds from ticket creation until the kitchen starts it'
+        )
+        parser.add_argument(
+            '--prep-time',
+            type=float,
+            default=60,
+            help='Mean seconds from start until the ticket is bumped'
+        )
+        parser.add_argument(
+            '--refresh-interval',
+            type=float,
+            default=2,
+            help='Seconds between real-time refreshes of each kitchen display'
+        )
+        parser.add_argument(
+            '--order-type',
+            choices=Order.OrderType.values,
+            default=Order.OrderType.TAKEAWAY,
+            help='Order type of simulated orders'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed, to replay the same order stream'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.branch = Branch.objects.select_related('currency').get(id=options['branch_id'])
+        except Branch.DoesNotExist:
+            raise CommandError(f'Branch with ID {options["branch_id"]} not found')
+        if not self.branch.kitchen_enabled:
+            raise CommandError(f'Kitchen is not enabled for {self.branch.name}; run setup_kitchen first')
+        if options['workers'] < 1 or options['rate'] <= 0 or options['items_per_order'] < 1:
+            raise CommandError('--workers, --rate and --items-per-order must be positive')
+
+        self.user = self.kitchen_user(options['user_id'])
+        self.token = {'role_id': self.user.role_id}
+        self.factory = APIRequestFactory()
+        self.options = options
+        self.random = random.Random(options['seed'])
+
+        orders = self.order_stream(self.item_pool(options))
+        displays = list(
+            KitchenDisplay.objects.filter(branch=self.branch, is_active=True).values_list('id', flat=True)
+        )
+
+        self.schedule = Schedule()
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lag = []
+        self.open_tickets = 0
+        self.display_versions = {}
+
+        self.started = time.monotonic()
+        self.arrivals_end = self.started + options['duration']
+        for offset, items_data, start_delay, prep_time in orders:
+            self.schedule.put(self.started + offset, ('create', items_data, start_delay, prep_time))
+        for display_id in displays:
+            self.schedule.put(self.started, ('refresh', display_id, None))
+
+        self.stdout.write(
+            f'Simulating {len(orders)} orders over {options["duration"]:g}s on {self.branch.name} '
+            f'with {options["workers"]} workers and {len(displays)} displays'
+        )
+        workers = [
+            threading.Thread(target=self.work, name=f'kitchen-load-{i}', daemon=True)
+            for i in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.report(len(orders), time.monotonic() - self.started)
+
+    def kitchen_user(self, user_id):
+        users = User.objects.filter(branch=self.branch, role__kitchen_display=True)
+        if user_id:
+            users = users.filter(id=user_id)
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError('No user of this branch with kitchen display access found')
+        return user
+
+    def item_pool(self, options):
+        """Weighted (item_ids, weights) choices per station, or for all items under key None"""
+        items = dict(
+            Item.objects.filter(branch=self.branch, is_active=True).values_list('item_id', 'category_id')
+        )
+        item_weights = _weights(options['item_mix'], '--item-mix') or dict.fromkeys(items, 1)
+        unknown = set(item_weights) - set(items)
+        if unknown:
+            raise CommandError(f'Items {sorted(unknown)} are not active items of this branch')
+
+        station_weights = _weights(options['station_mix'], '--station-mix')
+        if not station_weights:
+            pool = {None: item_weights}
+        else:
+            table = StationRoutingService.get_table(self.branch.id)
+            pool = {station_id: {} for station_id in station_weights}
+            for item_id, weight in item_weights.items():
+                station_id = StationRoutingService.lookup(table, item_id, items[item_id])
+                if station_id in pool:
+                    pool[station_id][item_id] = weight
+            empty = [station_id for station_id, choices in pool.items() if not choices]
+            if empty:
+                raise CommandError(f'No items are routed to stations {sorted(empty)}')
+
+        if not any(pool.values()):
+            raise CommandError('No active items to order')
+        return {
+            'stations': list(pool),
+            'station_weights': [station_weights.get(station_id, 1) for station_id in pool],
+            'items': {station_id: (list(choices), list(choices.values())) for station_id, choices in pool.items()},
+        }
+
+    def order_stream(self, pool):
+        """Arrival offsets, items and bump timings of every simulated order, drawn up front"""
+        options = self.options
+        rng = self.random
+        orders = []
+        offset = rng.expovariate(options['rate'] / 60)
+        while offset < options['duration']:
+            lines = {}
+            for _ in range(rng.randint(1, options['items_per_order'])):
+                station_id = rng.choices(pool['stations'], pool['station_weights'])[0]
+                item_ids, weights = pool['items'][station_id]
+                lines[rng.choices(item_ids, weights)[0]] = rng.randint(1, options['max_quantity'])
+            items_data = [{'item': item_id, 'quantity': quantity} for item_id, quantity in lines.items()]
+            orders.append((
+                offset,
+                items_data,
+                rng.uniform(0.5, 1.5) * options['start_delay'],
+                rng.uniform(0.5, 1.5) * options['prep_time'],
+            ))
+            offset += rng.expovariate(options['rate'] / 60)
+        return orders
+
+    def work(self):
+        try:
+            while True:
+                entry = self.schedule.get()
+                if entry is None:
+                    return
+                due, _, task = entry
+                try:
+                    self.run(due, task)
+                finally:
+                    self.schedule.done()
+        finally:
+            connections.close_all()
+
+    def run(self, due, task):
+        operation = task[0]
+        counter = QueryCounter()
+        began = time.monotonic()
+        try:
+            with connection.execute_wrapper(counter):
+                result = getattr(self, operation)(*task[1:])
+        except Exception as exc:
+            result = None
+            self.stderr.write(f'{operation} failed: {exc}')
+        elapsed = time.monotonic() - began
+
+        with self.lock:
+            if result is None:
+                self.errors[operation] += 1
+            else:
+                self.samples[operation].append((elapsed, counter.count))
+            if operation == 'create':
+                self.lag.append(began - due)
+                if result is not None:
+                    self.open_tickets += 1
+            elif operation == 'bump' or (operation == 'start' and result is None):
+                self.open_tickets -= 1
+
+        now = time.monotonic()
+        if operation == 'create' and result is not None:
+            self.schedule.put(now + task[2], ('start', result, task[3]))
+        elif operation == 'start' and result is not None:
+            self.schedule.put(now + task[2], ('bump', task[1]))
+        elif operation == 'refresh':
+            with self.lock:
+                active = now < self.arrivals_end or self.open_tickets > 0
+            if active:
+                self.schedule.put(now + self.options['refresh_interval'], ('refresh', task[1], None))
+
+    def post(self, view, path, pk):
+        request = self.factory.post(path)
+        force_authenticate(request, user=self.user, token=self.token)
+        response = view(request, pk=pk)
+        return pk if response.status_code == 200 else None
+
+    def create(self, items_data, start_delay, prep_time):
+        """Place an order; its kitchen ticket is built when the order commits"""
+        order = OrderService.create_order(
+            branch=self.branch,
+            items_data=items_data,
+            order_type=self.options['order_type']
+        )
+        return KitchenOrder.objects.filter(order=order).values_list('id', flat=True).first()
+
+    def start(self, ticket_id, prep_time):
+        return self.post(start_view, f'/api/kitchen/orders/{ticket_id}/start/', ticket_id)
+
+    def bump(self, ticket_id):
+        return self.post(bump_view, f'/api/kitchen/orders/{ticket_id}/complete/', ticket_id)
+
+    def refresh(self, display_id, _):
+        """Poll like a display: conditional on the last ETag, delta since the last version"""
+        etag, version = self.display_versions.get(display_id, (None, None))
+        params = {} if version is None else {'since_version': version}
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        request = self.factory.get(f'/api/kitchen/displays/{display_id}/real_time_data/', params, **headers)
+        force_authenticate(request, user=self.user, token=self.token)
+        response = refresh_view(request, pk=display_id)
+        if response.status_code == 200:
+            self.display_versions[display_id] = (response['ETag'], response.data['version'])
+        elif response.status_code != 304:
+            return None
+        return display_id
+
+    def report(self, planned, elapsed):
+        self.stdout.write(
+            f'\n{"operation":<10}{"count":>8}{"errors":>8}{"per s":>9}'
+            f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}'
+        )
+        for operation in OPERATIONS:
+            samples = self.samples[operation]
+            latencies = sorted(sample[0] * 1000 for sample in samples)
+            queries = sum(sample[1] for sample in samples) / len(samples) if samples else 0
+            self.stdout.write(
+                f'{operation:<10}{len(samples):>8}{self.errors[operation]:>8}'
+                f'{len(samples) / elapsed:>9.2f}'
+                f'{_percentile(latencies, 50):>9.1f}{_percentile(latencies, 95):>9.1f}'
+                f'{_percentile(latencies, 99):>9.1f}{queries:>9.1f}'
+            )
+
+        created = len(self.samples['create'])
+        lag = sorted(self.lag)
+        self.stdout.write(
+            f'\nOrders: {created}/{planned} created, {len(self.samples["bump"])} bumped in {elapsed:.1f}s; '
+            f'target {self.options["rate"]:g}/min, achieved {created / self.options["duration"] * 60:.1f}/min '
+            f'over the arrival window'
+        )
+        message = (
+            f'Arrival lag behind schedule: p50 {_percentile(lag, 50) * 1000:.1f} ms, '
+            f'p99 {_percentile(lag, 99) * 1000:.1f} ms'
+        )
+        # Orders starting well behind their arrival time mean the workers cannot keep up
+        if _percentile(lag, 99) > 1:
+            self.stdout.write(self.style.WARNING(f'{message}: the kitchen backend is saturated'))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from kitchen.services import delete_in_batches
+
+
+class PurgeCommand(BaseCommand):
+    """
+    Base for the kitchen retention commands: deletes ``model`` rows whose
+    ``cutoff_field`` is more than ``--days`` old (default from the
+    ``retention_setting`` setting) in batches.
+    """
+    model = None
+    cutoff_field = 'created_at'
+    retention_setting = None
+    default_days = 7
+    days_help = 'Delete rows older than this many days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, self.retention_setting, self.default_days),
+            help=self.days_help
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help=f'Number of {self.model._meta.verbose_name_plural} deleted per transaction'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = self.model.objects.filter(**{f'{self.cutoff_field}__lt': cutoff})
+        deleted = delete_in_batches(expired, options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} {self.model._meta.verbose_name_plural}')
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0003_rename_inventory_itemingredient_ingredients_and_more'),
+        ('kitchen', '0002_kitchennotification'),
+        ('restaurants', '0007_alter_branch_operating_hours_alter_branch_settings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='station_routes', to='restaurants.branch')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='station_routes', to='items.category')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='station_routes', to='items.item')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='routes', to='kitchen.kitchenstation')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('category__isnull', False), ('item__isnull', True)), models.Q(('category__isnull', True), ('item__isnull', False)), _connector='OR'), name='station_route_category_xor_item'), models.UniqueConstraint(condition=models.Q(('item__isnull', True)), fields=('branch', 'category'), name='unique_station_route_category'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('branch', 'item'), name='unique_station_route_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:39
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import DurationField, F, Value
+
+
+def backfill_queue_keys(apps, schema_editor):
+    KitchenOrderItem = apps.get_model('kitchen', 'KitchenOrderItem')
+    KitchenOrder = apps.get_model('kitchen', 'KitchenOrder')
+    interval = timedelta(minutes=getattr(settings, 'KITCHEN_PRIORITY_AGING_MINUTES', 5))
+    priorities = KitchenOrder.objects.values_list('priority', flat=True).distinct()
+    for priority in priorities:
+        KitchenOrderItem.objects.filter(kitchen_order__priority=priority).update(
+            queue_key=F('created_at') - Value(interval * priority, output_field=DurationField())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_passwordresettoken'),
+        ('kitchen', '0003_station_routes'),
+        ('orders', '0007_order_numbers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kitchenorderitem',
+            name='queue_key',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_queue_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='kitchenorderitem',
+            index=models.Index(fields=['station', 'status', 'queue_key'], include=('kitchen_order', 'order_item'), name='idx_kitchen_item_queue'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0004_kitchen_item_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kitchenorder',
+            name='state_version',
+            field=models.PositiveBigIntegerField(db_index=True, default=0),
+        ),
+    ]
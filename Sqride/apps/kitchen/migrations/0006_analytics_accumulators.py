@@ -0,0 +1,69 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:49
+
+import kitchen.models
+from django.db import migrations, models
+
+
+def seed_accumulators(apps, schema_editor):
+    """
+    Carry the old rows over: the stored average times the count stands in
+    for the prep time sum, duplicate (station, date) rows are merged and the
+    never-filled peak_hours dicts become hourly count arrays
+    """
+    KitchenAnalytics = apps.get_model('kitchen', 'KitchenAnalytics')
+    kept = {}
+    for row in KitchenAnalytics.objects.order_by('id'):
+        seconds = row.average_preparation_time.total_seconds() if row.average_preparation_time else 0
+        row.prep_seconds_sum = seconds * row.total_orders
+        row.prep_seconds_sumsq = seconds * seconds * row.total_orders
+        row.peak_hours = kitchen.models.empty_hourly_counts()
+        first = kept.get((row.station_id, row.date))
+        if first is None:
+            kept[(row.station_id, row.date)] = row
+            continue
+        first.total_orders += row.total_orders
+        first.sla_breaches += row.sla_breaches
+        first.prep_seconds_sum += row.prep_seconds_sum
+        first.prep_seconds_sumsq += row.prep_seconds_sumsq
+        row.delete()
+    for row in kept.values():
+        row.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0005_kitchen_order_state_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kitchenanalytics',
+            name='prep_histogram',
+            field=models.JSONField(default=kitchen.models.empty_prep_histogram),
+        ),
+        migrations.AddField(
+            model_name='kitchenanalytics',
+            name='prep_seconds_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='kitchenanalytics',
+            name='prep_seconds_sumsq',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='kitchenanalytics',
+            name='peak_hours',
+            field=models.JSONField(default=kitchen.models.empty_hourly_counts),
+        ),
+        migrations.RunPython(seed_accumulators, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='kitchenanalytics',
+            name='average_preparation_time',
+        ),
+        migrations.AddConstraint(
+            model_name='kitchenanalytics',
+            constraint=models.UniqueConstraint(fields=('station', 'date'), name='unique_kitchen_analytics_station_date'),
+        ),
+    ]
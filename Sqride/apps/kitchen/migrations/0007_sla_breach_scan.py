@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:50
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import DurationField, F, Value
+
+
+def backfill_sla_deadlines(apps, schema_editor):
+    KitchenOrder = apps.get_model('kitchen', 'KitchenOrder')
+    sla = timedelta(minutes=getattr(settings, 'KITCHEN_SLA_MINUTES', 20))
+    KitchenOrder.objects.filter(
+        sla_breach_time__isnull=True,
+        status__in=['pending', 'preparing']
+    ).update(sla_breach_time=F('created_at') + Value(sla, output_field=DurationField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0006_analytics_accumulators'),
+        ('orders', '0007_order_numbers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kitchenorder',
+            name='sla_breached_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_sla_deadlines, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='kitchenorder',
+            index=models.Index(condition=models.Q(('sla_breached_at__isnull', True), ('status__in', ['pending', 'preparing'])), fields=['sla_breach_time'], name='idx_kitchen_order_sla_due'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:52
+
+import django.db.models.deletion
+import kitchen.models
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_staff_stats(apps, schema_editor):
+    """Running daily totals from the items cooks have already completed"""
+    KitchenOrderItem = apps.get_model('kitchen', 'KitchenOrderItem')
+    KitchenStaffStats = apps.get_model('kitchen', 'KitchenStaffStats')
+    items = KitchenOrderItem.objects.filter(
+        status='completed',
+        prepared_by__isnull=False,
+        started_at__isnull=False,
+        completed_at__isnull=False
+    ).order_by('prepared_by_id', 'completed_at').values_list('prepared_by_id', 'started_at', 'completed_at')
+
+    rows = {}
+    current = None
+    for user_id, started_at, completed_at in items.iterator():
+        date = timezone.localdate(completed_at)
+        if current is None or (current.user_id, current.date) != (user_id, date):
+            previous = current if current is not None and current.user_id == user_id else None
+            current = rows[(user_id, date)] = KitchenStaffStats(
+                user_id=user_id,
+                date=date,
+                completed_items=previous.completed_items if previous else 0,
+                prep_seconds_sum=previous.prep_seconds_sum if previous else 0,
+                prep_histogram=list(previous.prep_histogram) if previous else kitchen.models.empty_prep_histogram()
+            )
+        seconds = max((completed_at - started_at).total_seconds(), 0)
+        current.completed_items += 1
+        current.prep_seconds_sum += seconds
+        current.prep_histogram[kitchen.models.PrepTimeHistogram.bucket_for(seconds)] += 1
+    KitchenStaffStats.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_passwordresettoken'),
+        ('kitchen', '0007_sla_breach_scan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KitchenStaffStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('prep_histogram', models.JSONField(default=kitchen.models.empty_prep_histogram)),
+                ('date', models.DateField()),
+                ('completed_items', models.PositiveIntegerField(default=0)),
+                ('prep_seconds_sum', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kitchen_stats', to='accounts.user')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='unique_kitchen_staff_stats_user_date')],
+            },
+        ),
+        migrations.RunPython(backfill_staff_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:54
+
+from django.db import migrations, models
+
+
+def coalesce_unread(apps, schema_editor):
+    """Keep only the latest unread notification per branch, order and type"""
+    KitchenNotification = apps.get_model('kitchen', 'KitchenNotification')
+    seen = set()
+    stale = []
+    unread = KitchenNotification.objects.filter(is_read=False).order_by('-updated_at', '-id')
+    for row in unread.values('id', 'branch_id', 'order_id', 'notification_type').iterator():
+        key = (row['branch_id'], row['order_id'], row['notification_type'])
+        if key in seen:
+            stale.append(row['id'])
+        else:
+            seen.add(key)
+    for start in range(0, len(stale), 1000):
+        KitchenNotification.objects.filter(id__in=stale[start:start + 1000]).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0008_staff_stats'),
+        ('restaurants', '0008_branch_kitchen_state_version'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='kitchennotification',
+            options={'ordering': ['-updated_at']},
+        ),
+        migrations.RemoveIndex(
+            model_name='kitchennotification',
+            name='kitchen_kit_branch__a7059c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='kitchennotification',
+            name='kitchen_kit_created_f0e473_idx',
+        ),
+        migrations.AddIndex(
+            model_name='kitchennotification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['branch', '-updated_at'], name='idx_kitchen_notif_unread'),
+        ),
+        migrations.AddIndex(
+            model_name='kitchennotification',
+            index=models.Index(fields=['updated_at'], name='idx_kitchen_notif_updated'),
+        ),
+        migrations.RunPython(coalesce_unread, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='kitchennotification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False)), fields=('branch', 'order_id', 'notification_type'), name='unique_unread_kitchen_notification'),
+        ),
+    ]
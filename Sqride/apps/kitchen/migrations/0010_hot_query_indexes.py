@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_passwordresettoken'),
+        ('kitchen', '0009_notification_coalescing'),
+        ('orders', '0007_order_numbers'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='kitchenorder',
+            name='idx_kitchen_order_sla_due',
+        ),
+        migrations.AddIndex(
+            model_name='kitchenorder',
+            index=models.Index(condition=models.Q(('sla_breached_at__isnull', True)), fields=['status', 'sla_breach_time'], name='idx_kitchen_order_sla_due'),
+        ),
+        migrations.AddIndex(
+            model_name='kitchenorder',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'preparing'])), fields=['order', 'status'], name='idx_kitchen_order_active'),
+        ),
+        migrations.AddIndex(
+            model_name='kitchenorderitem',
+            index=models.Index(fields=['kitchen_order', 'status'], name='idx_kitchen_item_ticket_status'),
+        ),
+        migrations.AddIndex(
+            model_name='kitchenorderitem',
+            index=models.Index(fields=['prepared_by', 'status', 'completed_at'], name='idx_kitchen_item_cook_status'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:06
+
+import django.db.models.deletion
+import kitchen.models
+from django.db import migrations, models
+
+
+def backfill_item_prep_stats(apps, schema_editor):
+    """Prep time stats from the items already completed, oldest first"""
+    KitchenOrderItem = apps.get_model('kitchen', 'KitchenOrderItem')
+    ItemPrepStats = apps.get_model('kitchen', 'ItemPrepStats')
+    items = KitchenOrderItem.objects.filter(
+        status='completed',
+        station__isnull=False,
+        started_at__isnull=False,
+        completed_at__isnull=False
+    ).order_by('completed_at').values_list(
+        'station__branch_id', 'order_item__item_id', 'station_id', 'started_at', 'completed_at'
+    )
+
+    rows = {}
+    for branch_id, item_id, station_id, started_at, completed_at in items.iterator():
+        stats = rows.get((branch_id, item_id, station_id))
+        if stats is None:
+            stats = rows[(branch_id, item_id, station_id)] = ItemPrepStats(
+                branch_id=branch_id,
+                item_id=item_id,
+                station_id=station_id,
+                prep_histogram=kitchen.models.empty_prep_histogram()
+            )
+        seconds = max((completed_at - started_at).total_seconds(), 0)
+        stats.ewma_seconds = kitchen.models.ItemPrepStats.moving_average(
+            [seconds], stats.ewma_seconds if stats.samples else None
+        )
+        stats.samples += 1
+        stats.prep_histogram[kitchen.models.PrepTimeHistogram.bucket_for(seconds)] += 1
+    ItemPrepStats.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0003_rename_inventory_itemingredient_ingredients_and_more'),
+        ('kitchen', '0010_hot_query_indexes'),
+        ('restaurants', '0008_branch_kitchen_state_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemPrepStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('prep_histogram', models.JSONField(default=kitchen.models.empty_prep_histogram)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('ewma_seconds', models.FloatField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_prep_stats', to='restaurants.branch')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prep_stats', to='items.item')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_prep_stats', to='kitchen.kitchenstation')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('branch', 'item', 'station'), name='unique_item_prep_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_item_prep_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:12
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0011_item_prep_stats'),
+        ('restaurants', '0008_branch_kitchen_state_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KitchenEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(choices=[('ticket_created', 'Ticket created'), ('ticket_cancelled', 'Ticket cancelled'), ('item_reassigned', 'Item reassigned'), ('item_completed', 'Item completed'), ('item_started', 'Item started'), ('items_added', 'Items added'), ('ticket_updated', 'Ticket updated'), ('ticket_removed', 'Ticket removed')], max_length=20)),
+                ('tickets', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('removed', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kitchen_events', to='restaurants.branch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='idx_kitchen_event_created')],
+                'constraints': [models.UniqueConstraint(fields=('branch', 'sequence'), name='unique_kitchen_event_sequence')],
+            },
+        ),
+    ]
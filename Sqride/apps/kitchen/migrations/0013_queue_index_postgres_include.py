@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+QUEUE_INDEX = 'idx_kitchen_item_queue'
+
+
+def build_covering_queue_index(apps, schema_editor):
+    """
+    Make the station queue index covering on PostgreSQL, the only backend
+    with INCLUDE columns. Databases migrated through 0004 already have it,
+    so it is only rebuilt when its INCLUDE columns are missing.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT i.indnatts > i.indnkeyatts FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %s",
+            [QUEUE_INDEX]
+        )
+        row = cursor.fetchone()
+    if row is not None and row[0]:
+        return
+
+    KitchenOrderItem = apps.get_model('kitchen', 'KitchenOrderItem')
+    fields = ['station', 'status', 'queue_key']
+    if row is not None:
+        schema_editor.remove_index(KitchenOrderItem, models.Index(fields=fields, name=QUEUE_INDEX))
+    schema_editor.add_index(
+        KitchenOrderItem,
+        models.Index(fields=fields, include=['kitchen_order', 'order_item'], name=QUEUE_INDEX)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kitchen', '0012_kitchen_event_log'),
+    ]
+
+    operations = [
+        # The model declares a plain index so other databases are not warned
+        # about unsupported INCLUDE columns (models.W040); PostgreSQL keeps
+        # the covering index
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='kitchenorderitem',
+                    name=QUEUE_INDEX,
+                ),
+                migrations.AddIndex(
+                    model_name='kitchenorderitem',
+                    index=models.Index(fields=['station', 'status', 'queue_key'], name=QUEUE_INDEX),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(build_covering_queue_index, migrations.RunPython.noop),
+            ],
+        ),
+    ]
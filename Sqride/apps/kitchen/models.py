@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from core.models import TimestampedModel
 from orders.models import Order, OrderItem
@@ -18,6 +19,41 @@ class KitchenStation(TimestampedModel):
     def __str__(self):
         return f"{self.name} - {self.branch.name}"
 
+class StationRoute(TimestampedModel):
+    """
+    Routes a menu category, or a single item overriding its category, to a
+    kitchen station. Compiled per branch by StationRoutingService.
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='station_routes')
+    station = models.ForeignKey(KitchenStation, on_delete=models.CASCADE, related_name='routes')
+    category = models.ForeignKey('items.Category', on_delete=models.CASCADE, null=True, blank=True, related_name='station_routes')
+    item = models.ForeignKey('items.Item', on_delete=models.CASCADE, null=True, blank=True, related_name='station_routes')
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(category__isnull=False, item__isnull=True) |
+                    models.Q(category__isnull=True, item__isnull=False)
+                ),
+                name='station_route_category_xor_item'
+            ),
+            models.UniqueConstraint(
+                fields=['branch', 'category'],
+                condition=models.Q(item__isnull=True),
+                name='unique_station_route_category'
+            ),
+            models.UniqueConstraint(
+                fields=['branch', 'item'],
+                condition=models.Q(category__isnull=True),
+                name='unique_station_route_item'
+            ),
+        ]
+
+    def __str__(self):
+        target = self.item or self.category
+        return f"{target} -> {self.station.name}"
+
 class KitchenOrder(TimestampedModel):
     """Represents an order in the kitchen system"""
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='kitchen_orders')
@@ -36,8 +72,34 @@ class KitchenOrder(TimestampedModel):
     notes = models.TextField(blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     estimated_completion_time = models.DateTimeField(null=True, blank=True)
+    # SLA deadline; set from KITCHEN_SLA_MINUTES when the ticket is created
+    # and moved by an explicit completion estimate
     sla_breach_time = models.DateTimeField(null=True, blank=True)
+    # Set once by the SLA scanner when an active ticket passes its deadline
+    sla_breached_at = models.DateTimeField(null=True, blank=True)
     preparation_time = models.DurationField(null=True, blank=True)
+    # Branch kitchen_state_version at this ticket's last change; lets
+    # displays fetch only the tickets changed since the version they hold
+    state_version = models.PositiveBigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Unflagged tickets by status and deadline: the SLA scan reads
+            # just the active statuses' due ranges. The condition has no
+            # parameters so SQLite can use the partial index too.
+            models.Index(
+                fields=['status', 'sla_breach_time'],
+                condition=models.Q(sla_breached_at__isnull=True),
+                name='idx_kitchen_order_sla_due'
+            ),
+            # Active tickets per order, for branch dashboards and displays
+            # (PostgreSQL; SQLite falls back to the order index)
+            models.Index(
+                fields=['order', 'status'],
+                condition=models.Q(status__in=['pending', 'preparing']),
+                name='idx_kitchen_order_active'
+            ),
+        ]
     
     def __str__(self):
         return f"Kitchen Order #{self.id} - {self.order.order_id}"
@@ -67,10 +129,32 @@ class KitchenOrderItem(TimestampedModel):
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
+    # Aging sort key: created_at moved back by the ticket's priority points
+    # (KitchenQueueService.aging_interval() per point). Ascending order is the
+    # same as descending aging score, and unlike the score it never changes
+    # while the item waits, so it can be indexed.
+    queue_key = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Covering (INCLUDE kitchen_order, order_item) on PostgreSQL only;
+            # migration 0013 builds it there
+            models.Index(fields=['station', 'status', 'queue_key'], name='idx_kitchen_item_queue'),
+            # A ticket's items by status (branch item lists, ticket completion)
+            models.Index(fields=['kitchen_order', 'status'], name='idx_kitchen_item_ticket_status'),
+            # A cook's items by status and completion time
+            models.Index(fields=['prepared_by', 'status', 'completed_at'], name='idx_kitchen_item_cook_status'),
+        ]
     
     def __str__(self):
         return f"{self.order_item.item.name} - {self.status}"
 
+    def save(self, *args, **kwargs):
+        if self.queue_key is None:
+            from .services import KitchenQueueService
+            self.queue_key = KitchenQueueService.queue_key(self.kitchen_order.priority, self.created_at)
+        super().save(*args, **kwargs)
+
 class KitchenDisplay(TimestampedModel):
     """Represents a kitchen display screen configuration"""
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='kitchen_displays')
@@ -99,14 +183,204 @@ class KitchenStaff(TimestampedModel):
     class Meta:
         unique_together = ('user', 'station')
 
-class KitchenAnalytics(TimestampedModel):
+class JSONArrayAdd(models.Func):
+    """
+    ``field[i] += n`` for each ``{i: n}`` in ``increments``, on a JSON array
+    of counts, as a single expression usable in an UPDATE
+    """
+    output_field = models.JSONField()
+
+    def __init__(self, field_name, increments):
+        self.increments = {int(index): int(amount) for index, amount in increments.items()}
+        super().__init__(models.F(field_name))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        column, params = compiler.compile(self.source_expressions[0])
+        pairs = ', '.join(
+            f"'$[{index}]', COALESCE(json_extract({column}, '$[{index}]'), 0) + {amount}"
+            for index, amount in self.increments.items()
+        )
+        return f"json_set({column}, {pairs})", params * (len(self.increments) + 1)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        column, params = compiler.compile(self.source_expressions[0])
+        sql = column
+        for index, amount in self.increments.items():
+            sql = (
+                f"jsonb_set({sql}, '{{{index}}}', "
+                f"to_jsonb(COALESCE(({column} ->> {index})::bigint, 0) + {amount}))"
+            )
+        return sql, params * (len(self.increments) + 1)
+
+def empty_prep_histogram():
+    return [0] * (len(PrepTimeHistogram.PREP_TIME_BUCKETS) + 1)
+
+def empty_hourly_counts():
+    return [0] * 24
+
+class PrepTimeHistogram(TimestampedModel):
+    """Fixed-bucket histogram of item prep times, kept as a JSON array of counts"""
+    # Upper bounds, in seconds, of the prep time histogram buckets; the
+    # last bucket counts everything slower
+    PREP_TIME_BUCKETS = (60, 120, 180, 300, 420, 600, 900, 1200, 1800, 2700)
+
+    prep_histogram = models.JSONField(default=empty_prep_histogram)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def bucket_for(cls, seconds):
+        for index, bound in enumerate(cls.PREP_TIME_BUCKETS):
+            if seconds <= bound:
+                return index
+        return len(cls.PREP_TIME_BUCKETS)
+
+    @classmethod
+    def histogram_percentile(cls, histogram, percentile):
+        """
+        Prep time at ``percentile`` (0-100), interpolated within its
+        histogram bucket; the open-ended last bucket reports its lower bound
+        """
+        measured = sum(histogram)
+        if not measured:
+            return None
+        rank = measured * percentile / 100
+        seen = 0
+        lower = 0
+        for index, count in enumerate(histogram):
+            if index == len(cls.PREP_TIME_BUCKETS):
+                break
+            upper = cls.PREP_TIME_BUCKETS[index]
+            if count and seen + count >= rank:
+                return timedelta(seconds=lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+            lower = upper
+        return timedelta(seconds=lower)
+
+    def preparation_time_percentile(self, percentile):
+        return self.histogram_percentile(self.prep_histogram, percentile)
+
+class KitchenAnalytics(PrepTimeHistogram):
+    """
+    Per (station, day) accumulators of completed item prep times: count,
+    sum and sum of squares, a fixed-bucket histogram and completions per
+    local hour. Means, deviation, percentiles and peak hours are derived
+    from them without touching the items.
+    """
     station = models.ForeignKey(KitchenStation, on_delete=models.CASCADE)
     date = models.DateField()
     total_orders = models.IntegerField(default=0)
-    average_preparation_time = models.DurationField(null=True)
-    peak_hours = models.JSONField(default=dict)
+    prep_seconds_sum = models.FloatField(default=0)
+    prep_seconds_sumsq = models.FloatField(default=0)
+    peak_hours = models.JSONField(default=empty_hourly_counts)
     sla_breaches = models.IntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['station', 'date'], name='unique_kitchen_analytics_station_date'),
+        ]
+
+    @property
+    def average_preparation_time(self):
+        if not self.total_orders:
+            return None
+        return timedelta(seconds=self.prep_seconds_sum / self.total_orders)
+
+    @property
+    def preparation_time_stddev(self):
+        if not self.total_orders:
+            return None
+        mean = self.prep_seconds_sum / self.total_orders
+        variance = max(self.prep_seconds_sumsq / self.total_orders - mean * mean, 0)
+        return timedelta(seconds=variance ** 0.5)
+
+    @property
+    def peak_hour(self):
+        """Local hour with the most completions, or None before any"""
+        if not any(self.peak_hours):
+            return None
+        return max(range(len(self.peak_hours)), key=self.peak_hours.__getitem__)
+
+class KitchenStaffStats(PrepTimeHistogram):
+    """
+    A cook's completed items as running totals up to the end of each day
+    they completed something. Stats for any date range are the difference
+    of two rows, whatever the length of the range.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kitchen_stats')
+    date = models.DateField()
+    completed_items = models.PositiveIntegerField(default=0)
+    prep_seconds_sum = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_kitchen_staff_stats_user_date'),
+        ]
+
+class ItemPrepStats(PrepTimeHistogram):
+    """
+    Prep times of one menu item at one station: an exponentially weighted
+    moving average that follows how long it takes lately, and an all-time
+    histogram for quantiles. Updated as items complete; read by
+    KitchenETAService to estimate new tickets.
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='item_prep_stats')
+    item = models.ForeignKey('items.Item', on_delete=models.CASCADE, related_name='prep_stats')
+    station = models.ForeignKey(KitchenStation, on_delete=models.CASCADE, related_name='item_prep_stats')
+    samples = models.PositiveIntegerField(default=0)
+    ewma_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'item', 'station'], name='unique_item_prep_stats'),
+        ]
+
+    # Weight of the newest prep time in the moving average
+    EWMA_ALPHA = 0.2
+
+    @classmethod
+    def moving_average(cls, samples, average=None):
+        """Moving average after ``samples``, in order, starting from ``average`` (or the first sample)"""
+        for seconds in samples:
+            average = seconds if average is None else average + cls.EWMA_ALPHA * (seconds - average)
+        return average
+
+class KitchenEvent(models.Model):
+    """
+    Append-only log of committed kitchen changes, numbered per branch by
+    the kitchen state version they were published under. ``tickets`` holds
+    the changed tickets as flat KDS tickets after the change (whatever
+    their status); ``removed`` the ids of tickets deleted or left without
+    items. Folded into memory by kitchen.projection.
+    """
+    class Kind(models.TextChoices):
+        # Most telling first: an event touching several tickets takes the
+        # first kind any of them had
+        TICKET_CREATED = 'ticket_created', 'Ticket created'
+        TICKET_CANCELLED = 'ticket_cancelled', 'Ticket cancelled'
+        ITEM_REASSIGNED = 'item_reassigned', 'Item reassigned'
+        ITEM_COMPLETED = 'item_completed', 'Item completed'
+        ITEM_STARTED = 'item_started', 'Item started'
+        ITEMS_ADDED = 'items_added', 'Items added'
+        TICKET_UPDATED = 'ticket_updated', 'Ticket updated'
+        TICKET_REMOVED = 'ticket_removed', 'Ticket removed'
+
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='kitchen_events')
+    sequence = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    tickets = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    removed = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'sequence'], name='unique_kitchen_event_sequence'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idx_kitchen_event_created'),
+        ]
+
 class KitchenNotification(TimestampedModel):
     """Model for storing kitchen notifications when WebSocket fails"""
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='kitchen_notifications')
@@ -126,10 +400,25 @@ class KitchenNotification(TimestampedModel):
     )
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-updated_at']
+        constraints = [
+            # One unread notification per order and type: a later status
+            # replaces the earlier one instead of piling up
+            models.UniqueConstraint(
+                fields=['branch', 'order_id', 'notification_type'],
+                condition=models.Q(is_read=False),
+                name='unique_unread_kitchen_notification'
+            ),
+        ]
         indexes = [
-            models.Index(fields=['branch', 'is_read']),
-            models.Index(fields=['created_at']),
+            # Unread rows only, so listing and counting stay proportional
+            # to what is unread rather than to the branch's history
+            models.Index(
+                fields=['branch', '-updated_at'],
+                condition=models.Q(is_read=False),
+                name='idx_kitchen_notif_unread'
+            ),
+            models.Index(fields=['updated_at'], name='idx_kitchen_notif_updated'),
         ]
     
     def __str__(self):
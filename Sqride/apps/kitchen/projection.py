@@ -0,0 +1,278 @@
+"""
+In-memory kitchen state for KDS reads.
+
+Every worker process keeps one projection per branch: its open tickets as
+compact ``__slots__`` records, folded from the branch's KitchenEvent log.
+A read first compares the projection's sequence with the branch's kitchen
+state version (a cache read, re-read from the branch row once it expires,
+so a projection trails writes made through other workers by at most
+KITCHEN_STATE_CACHE_SECONDS); when it is behind, the missing events are
+fetched with one indexed query and folded in order. Responses built from a
+projection carry its own sequence as their version, never a newer cached
+one, so deltas asked for from it miss nothing. A cold projection, or
+one that finds a gap in the sequence (events purged, a reset database),
+rebuilds from the tickets table and then follows the log again.
+"""
+import threading
+from collections import OrderedDict
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from restaurants.models import Branch
+from .models import KitchenEvent, KitchenOrder
+from .services import KitchenStateService, KitchenTicketService
+
+
+class ItemRecord:
+    __slots__ = ('id', 'item_id', 'name', 'quantity', 'notes', 'station_id', 'status')
+
+    def __init__(self, data):
+        for name in self.__slots__:
+            setattr(self, name, data[name])
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class TicketRecord:
+    __slots__ = (
+        'id', 'order_id', 'order_number', 'order_type', 'table', 'status', 'priority', 'notes',
+        'created_at', 'items', 'stations', 'version'
+    )
+
+    def __init__(self, data, version):
+        self.id = data['id']
+        self.order_id = data['order_id']
+        self.order_number = data['order_number']
+        self.order_type = data['order_type']
+        self.table = data['table']
+        self.status = data['status']
+        self.priority = data['priority']
+        self.notes = data['notes']
+        created_at = data['created_at']
+        self.created_at = parse_datetime(created_at) if isinstance(created_at, str) else created_at
+        self.items = tuple(ItemRecord(item) for item in data['items'])
+        self.stations = frozenset(item.station_id for item in self.items)
+        # Kitchen state version this record was last changed under
+        self.version = version
+
+    @property
+    def is_open(self):
+        return self.status in KitchenTicketService.ACTIVE_STATUSES
+
+    def sort_key(self):
+        return (-self.priority, self.created_at, self.id)
+
+    def as_dict(self, now):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'order_number': self.order_number,
+            'order_type': self.order_type,
+            'table': self.table,
+            'status': self.status,
+            'priority': self.priority,
+            'notes': self.notes,
+            'created_at': self.created_at,
+            'age': int((now - self.created_at).total_seconds()),
+            'items': [item.as_dict() for item in self.items],
+        }
+
+
+class BranchProjection:
+    # Finished tickets remembered for ?since_version deltas; a delta from
+    # before the oldest one forgotten is answered with a full refresh
+    FINISHED_LIMIT = 1000
+
+    __slots__ = ('branch_id', 'sequence', 'horizon', 'tickets', 'finished', 'lock')
+
+    def __init__(self, branch_id):
+        self.branch_id = branch_id
+        self.sequence = None
+        self.horizon = 0
+        self.tickets = {}
+        self.finished = OrderedDict()
+        self.lock = threading.Lock()
+
+    def sync(self):
+        """Fold in events up to the branch's current version, rebuilding if they cannot be followed"""
+        target = KitchenStateService.current_version(self.branch_id)
+        if self.sequence is None or target < self.sequence:
+            self.rebuild()
+        elif target > self.sequence:
+            # A gap, or versions with no events left (purged), cannot be followed
+            if not self.catch_up() or self.sequence < target:
+                self.rebuild()
+
+    def catch_up(self):
+        """Fold the events after the current sequence; False if the next one is missing"""
+        events = (
+            KitchenEvent.objects.filter(branch_id=self.branch_id, sequence__gt=self.sequence)
+            .order_by('sequence').values_list('sequence', 'tickets', 'removed')
+        )
+        for sequence, tickets, removed in events:
+            if sequence != self.sequence + 1:
+                return False
+            self.apply(sequence, tickets, removed)
+        return True
+
+    def rebuild(self):
+        """Load the open tickets as of the branch's latest version, then follow the log from there"""
+        version = Branch.objects.filter(id=self.branch_id).values_list('kitchen_state_version', flat=True).first() or 0
+        open_tickets = KitchenOrder.objects.filter(
+            order__branch_id=self.branch_id,
+            status__in=KitchenTicketService.ACTIVE_STATUSES
+        ).values('id')
+        self.tickets = {
+            data['id']: TicketRecord(data, version) for data in KitchenTicketService.build(open_tickets)
+        }
+        self.finished.clear()
+        self.sequence = self.horizon = version
+        # Events committed while loading may repeat changes already loaded;
+        # they carry whole tickets, so folding them again is harmless
+        self.catch_up()
+
+    def apply(self, sequence, tickets, removed):
+        for data in tickets:
+            record = TicketRecord(data, sequence)
+            if record.is_open:
+                self.tickets[record.id] = record
+                self.finished.pop(record.id, None)
+            else:
+                self.tickets.pop(record.id, None)
+                self.finished[record.id] = record
+                self.finished.move_to_end(record.id)
+        for kitchen_order_id in removed:
+            self.tickets.pop(kitchen_order_id, None)
+            self.finished.pop(kitchen_order_id, None)
+        while len(self.finished) > self.FINISHED_LIMIT:
+            _, forgotten = self.finished.popitem(last=False)
+            self.horizon = max(self.horizon, forgotten.version)
+        self.sequence = sequence
+
+
+# Projections of this worker: {branch_id: BranchProjection}
+_projections = {}
+_projections_lock = threading.Lock()
+
+
+class KitchenProjectionService:
+    @staticmethod
+    def get(branch_id):
+        with _projections_lock:
+            projection = _projections.get(branch_id)
+            if projection is None:
+                projection = _projections[branch_id] = BranchProjection(branch_id)
+        return projection
+
+    @staticmethod
+    def version(branch_id):
+        """Kitchen state version the branch's projection is current with"""
+        projection = KitchenProjectionService.get(branch_id)
+        with projection.lock:
+            projection.sync()
+            return projection.sequence
+
+    @staticmethod
+    def tickets(branch_id, station_ids, since_version=None):
+        """
+        Flat KDS tickets with an item at any of the given stations, like
+        KitchenTicketService.build, whether they are a full refresh, and
+        the version they are current with: the open tickets, or with
+        ``since_version`` every ticket changed after it whatever its
+        status. Deltas older than the projection's memory of finished
+        tickets fall back to a full refresh.
+        """
+        projection = KitchenProjectionService.get(branch_id)
+        station_ids = set(station_ids)
+        with projection.lock:
+            projection.sync()
+            version = projection.sequence
+            full = since_version is None or since_version < projection.horizon
+            if full:
+                records = list(projection.tickets.values())
+            else:
+                records = [
+                    record
+                    for tickets in (projection.tickets, projection.finished)
+                    for record in tickets.values()
+                    if record.version > since_version
+                ]
+
+        now = timezone.now()
+        records = sorted((record for record in records if record.stations & station_ids), key=TicketRecord.sort_key)
+        return [record.as_dict(now) for record in records], full, version
+
+    @staticmethod
+    def station_items(branch_id, station_id):
+        """
+        The pending and preparing items at a station, each with its
+        ticket's order details, in ticket display order
+        """
+        projection = KitchenProjectionService.get(branch_id)
+        with projection.lock:
+            projection.sync()
+            records = sorted(
+                (record for record in projection.tickets.values() if station_id in record.stations),
+                key=TicketRecord.sort_key
+            )
+        return [
+            {
+                **item.as_dict(),
+                'kitchen_order_id': record.id,
+                'order_id': record.order_id,
+                'order_number': record.order_number,
+                'order_type': record.order_type,
+                'table': record.table,
+                'priority': record.priority,
+            }
+            for record in records
+            for item in record.items
+            if item.station_id == station_id and item.status in KitchenTicketService.ACTIVE_STATUSES
+        ]
+
+    @staticmethod
+    def workload(branch_id, station_ids):
+        """{station_id: {'pending', 'preparing', 'total'}} over the open tickets' items"""
+        counts = {station_id: {'pending': 0, 'preparing': 0, 'total': 0} for station_id in station_ids}
+        projection = KitchenProjectionService.get(branch_id)
+        with projection.lock:
+            projection.sync()
+            for record in projection.tickets.values():
+                for item in record.items:
+                    station = counts.get(item.station_id)
+                    if station is not None and item.status in KitchenTicketService.ACTIVE_STATUSES:
+                        station[item.status] += 1
+                        station['total'] += 1
+        return counts
+
+    @staticmethod
+    def all_day(branch_id, station_ids):
+        """
+        "All day" counts per station and the version they are current
+        with: the quantities of pending and preparing items across the
+        open tickets, summed per item and notes, largest first.
+        {station_id: [{'item_id', 'name', 'notes', 'quantity', 'pending',
+        'preparing'}]}
+        """
+        totals = {station_id: {} for station_id in station_ids}
+        projection = KitchenProjectionService.get(branch_id)
+        with projection.lock:
+            projection.sync()
+            version = projection.sequence
+            for record in projection.tickets.values():
+                for item in record.items:
+                    station = totals.get(item.station_id)
+                    if station is None or item.status not in KitchenTicketService.ACTIVE_STATUSES:
+                        continue
+                    row = station.get((item.item_id, item.notes))
+                    if row is None:
+                        row = station[(item.item_id, item.notes)] = {
+                            'item_id': item.item_id, 'name': item.name, 'notes': item.notes,
+                            'quantity': 0, 'pending': 0, 'preparing': 0
+                        }
+                    row['quantity'] += item.quantity
+                    row[item.status] += item.quantity
+        return {
+            station_id: sorted(rows.values(), key=lambda row: (-row['quantity'], row['name'], row['notes']))
+            for station_id, rows in totals.items()
+        }, version
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import KitchenStation, KitchenOrder, KitchenOrderItem, KitchenDisplay, KitchenStaff, KitchenAnalytics, KitchenNotification
+from .models import KitchenStation, StationRoute, KitchenOrder, KitchenOrderItem, KitchenDisplay, KitchenStaff, KitchenAnalytics, KitchenNotification
 from orders.serializers import OrderSerializer, OrderItemSerializer
 from accounts.serializers.user_serializers import UserSerializer
 
@@ -9,6 +9,30 @@ class KitchenStationSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('branch',)
 
+class StationRouteSerializer(serializers.ModelSerializer):
+    station_name = serializers.CharField(source='station.name', read_only=True)
+
+    class Meta:
+        model = StationRoute
+        fields = '__all__'
+        read_only_fields = ('branch',)
+
+    def validate(self, data):
+        """A route targets either a category or a single item, within the user's branch"""
+        category = data.get('category', getattr(self.instance, 'category', None))
+        item = data.get('item', getattr(self.instance, 'item', None))
+        if (category is None) == (item is None):
+            raise serializers.ValidationError("Set exactly one of category or item.")
+
+        branch = self.context['request'].user.branch
+        if data.get('station') and data['station'].branch_id != branch.id:
+            raise serializers.ValidationError({"station": "Station does not belong to your branch."})
+        if item is not None and item.branch_id != branch.id:
+            raise serializers.ValidationError({"item": "Item does not belong to your branch."})
+        if category is not None and category.restaurant_id != branch.restaurant_id:
+            raise serializers.ValidationError({"category": "Category does not belong to your restaurant."})
+        return data
+
 class KitchenOrderItemSerializer(serializers.ModelSerializer):
     order_item = OrderItemSerializer(read_only=True)
     station = KitchenStationSerializer(read_only=True)
@@ -23,13 +47,14 @@ class KitchenOrderItemSerializer(serializers.ModelSerializer):
 class KitchenOrderSerializer(serializers.ModelSerializer):
     items = KitchenOrderItemSerializer(many=True, read_only=True)
     order = OrderSerializer(read_only=True)
+    order_number = serializers.CharField(source='order.display_number', read_only=True)
     estimated_completion_time = serializers.DateTimeField(required=False)
     priority = serializers.IntegerField(required=False, default=0)
     
     class Meta:
         model = KitchenOrder
         fields = '__all__'
-        read_only_fields = ('completed_at', 'preparation_time')
+        read_only_fields = ('completed_at', 'preparation_time', 'state_version')
 
 class KitchenDisplaySerializer(serializers.ModelSerializer):
     stations = KitchenStationSerializer(many=True, read_only=True)
@@ -78,12 +103,26 @@ class KitchenStaffSerializer(serializers.ModelSerializer):
 class KitchenAnalyticsSerializer(serializers.ModelSerializer):
     station = KitchenStationSerializer(read_only=True)
     station_name = serializers.CharField(source='station.name', read_only=True)
+    average_preparation_time = serializers.DurationField(read_only=True)
+    preparation_time_stddev = serializers.DurationField(read_only=True)
+    p50_preparation_time = serializers.SerializerMethodField()
+    p90_preparation_time = serializers.SerializerMethodField()
+    peak_hour = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = KitchenAnalytics
         fields = '__all__'
         read_only_fields = ('date',)
 
+    def get_p50_preparation_time(self, obj):
+        return self._duration(obj.preparation_time_percentile(50))
+
+    def get_p90_preparation_time(self, obj):
+        return self._duration(obj.preparation_time_percentile(90))
+
+    def _duration(self, value):
+        return serializers.DurationField().to_representation(value) if value is not None else None
+
 class KitchenNotificationSerializer(serializers.ModelSerializer):
     branch_name = serializers.CharField(source='branch.name', read_only=True)
     
@@ -1,10 +1,71 @@
-from django.db import transaction
+import heapq
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.conf import settings
+from django.db.models import F, Q, Case, Count, DurationField, ExpressionWrapper, FloatField, Value, When
+from django.db.models.functions import Now
 from restaurants.models import Branch
-from .models import KitchenStation, KitchenDisplay, KitchenStaff
+from items.models import Category
+from orders.models import Order
+from .models import (
+    KitchenStation, KitchenDisplay, KitchenStaff, KitchenOrder, KitchenOrderItem, StationRoute,
+    KitchenAnalytics, KitchenStaffStats, ItemPrepStats, KitchenEvent, JSONArrayAdd
+)
+from .utils import calculate_order_priority
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
+
+def commit_batch(local, factory, send, robust=False):
+    """
+    The batch collecting the current transaction's changes on this thread,
+    opening one (``factory()``) whose ``send(batch)`` runs once the
+    transaction commits. ``local`` only keeps a weak reference to the
+    commit hook: Django drops the hooks of rolled back transactions and
+    savepoints, which frees a batch that will never be sent, and the hook
+    forgets its batch as soon as it runs.
+    """
+    ref = getattr(local, 'pending', None)
+    flush = ref() if ref is not None else None
+    if flush is not None:
+        return flush.batch
+
+    batch = factory()
+
+    def flush():
+        if getattr(local, 'pending', None) is ref:
+            local.pending = None
+        send(batch)
+
+    flush.batch = batch
+    ref = local.pending = weakref.ref(flush)
+    transaction.on_commit(flush, robust=robust)
+    return batch
+
+
+def delete_in_batches(queryset, batch_size=1000):
+    """
+    Delete ``queryset``'s rows in id order, ``batch_size`` at a time, each
+    batch in its own short transaction so a large purge never holds locks
+    for long. Returns the number of rows deleted.
+    """
+    queryset = queryset.order_by('id')
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            deleted += queryset.model.objects.filter(id__in=ids).delete()[0]
+        if len(ids) < batch_size:
+            break
+    return deleted
+
 
 class KitchenSystemService:
     @staticmethod
@@ -122,7 +183,20 @@ class KitchenNotificationService:
     @staticmethod
     def notify_kitchen_update(branch_id, order_id, status):
         """
-        Send real-time notification to kitchen staff
+        Send real-time notification to kitchen staff. Updates made inside a
+        transaction are buffered and sent as one batch per branch on commit.
+        """
+        KitchenUpdateBuffer.add(branch_id, {
+            "order_id": order_id,
+            "status": status,
+            "timestamp": timezone.now().isoformat()
+        })
+        return True
+
+    @staticmethod
+    def send_kitchen_updates(branch_id, updates):
+        """
+        Send a batch of updates to the branch's displays as one message
         """
         try:
             channel_layer = get_channel_layer()
@@ -131,8 +205,7 @@ class KitchenNotificationService:
                 {
                     "type": "kitchen.update",
                     "message": {
-                        "order_id": order_id,
-                        "status": status,
+                        "updates": updates,
                         "timestamp": timezone.now().isoformat()
                     }
                 }
@@ -140,22 +213,38 @@ class KitchenNotificationService:
             return True
         except Exception as e:
             # Fallback to database notification if WebSocket fails
-            return KitchenNotificationService.create_database_notification(branch_id, order_id, status)
+            for update in updates:
+                KitchenNotificationService.create_database_notification(
+                    branch_id, update['order_id'], update['status']
+                )
+            return False
 
     @staticmethod
-    def create_database_notification(branch_id, order_id, status):
+    def create_database_notification(branch_id, order_id, status, message=None, notification_type='order_update'):
         """
-        Create a database notification as fallback
+        Create a database notification as fallback. Unread notifications
+        are coalesced per (branch, order, type): a single INSERT ... ON
+        CONFLICT against the partial unique index replaces the status and
+        message of an unread one instead of adding a row.
         """
         try:
             from .models import KitchenNotification
-            KitchenNotification.objects.create(
-                branch_id=branch_id,
-                order_id=order_id,
-                status=status,
-                message=f"Order {order_id} status changed to {status}",
-                created_at=timezone.now()
+            table = connection.ops.quote_name(KitchenNotification._meta.db_table)
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            sql = (
+                f"INSERT INTO {table} "
+                f"(branch_id, order_id, status, message, is_read, notification_type, created_at, updated_at) "
+                f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+                f"ON CONFLICT (branch_id, order_id, notification_type) WHERE NOT is_read "
+                f"DO UPDATE SET status = EXCLUDED.status, message = EXCLUDED.message, "
+                f"updated_at = EXCLUDED.updated_at"
             )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [
+                    branch_id, order_id, status,
+                    message or f"Order {order_id} status changed to {status}",
+                    False, notification_type, now, now
+                ])
             return True
         except Exception:
             return False
@@ -170,43 +259,91 @@ class KitchenNotificationService:
             notifications = KitchenNotification.objects.filter(
                 branch=branch,
                 is_read=False
-            ).order_by('-created_at')[:limit]
+            ).order_by('-updated_at').values(
+                'id', 'order_id', 'status', 'message', 'notification_type', 'created_at', 'updated_at', 'is_read'
+            )[:limit]
             
-            return [{
-                'id': n.id,
-                'order_id': n.order_id,
-                'status': n.status,
-                'message': n.message,
-                'created_at': n.created_at,
-                'is_read': n.is_read
-            } for n in notifications]
+            return list(notifications)
         except Exception:
             return []
 
     @staticmethod
-    def mark_as_read(notification_id):
+    def unread_count(branch):
+        from .models import KitchenNotification
+        return KitchenNotification.objects.filter(branch=branch, is_read=False).count()
+
+    @staticmethod
+    def mark_as_read(branch, notification_ids=None, up_to_id=None):
+        """
+        Mark the branch's unread notifications in ``notification_ids``, or
+        all of them up to and including ``up_to_id``, as read with one
+        UPDATE. Returns the number of notifications marked.
+        """
+        from .models import KitchenNotification
+        notifications = KitchenNotification.objects.filter(branch=branch, is_read=False)
+        if notification_ids is not None:
+            notifications = notifications.filter(id__in=notification_ids)
+        elif up_to_id is not None:
+            notifications = notifications.filter(id__lte=up_to_id)
+        else:
+            return 0
+        return notifications.update(is_read=True, updated_at=timezone.now())
+
+    @staticmethod
+    def clear_notifications(branch):
         """
-        Mark a notification as read
+        Clear all notifications for a branch
         """
         try:
             from .models import KitchenNotification
-            notification = KitchenNotification.objects.get(id=notification_id)
-            notification.is_read = True
-            notification.save()
+            KitchenNotification.objects.filter(branch=branch, is_read=False).update(
+                is_read=True,
+                updated_at=timezone.now()
+            )
             return True
         except Exception:
             return False
 
     @staticmethod
-    def clear_notifications(branch):
+    def purge(older_than, batch_size=1000):
         """
-        Clear all notifications for a branch
+        Delete notifications untouched since ``older_than`` in batches of
+        ``batch_size``, each in its own short transaction. Returns the
+        number deleted.
+        """
+        from .models import KitchenNotification
+        return delete_in_batches(KitchenNotification.objects.filter(updated_at__lt=older_than), batch_size)
+
+    @staticmethod
+    def notify_sla_breaches(branch_id, orders):
+        """
+        One delay alert for all of a branch's tickets that breached their
+        SLA in a scan, falling back to a single database notification
         """
         try:
-            from .models import KitchenNotification
-            KitchenNotification.objects.filter(branch=branch).update(is_read=True)
+            channel_layer = get_channel_layer()
+            async_to_sync(channel_layer.group_send)(
+                f"kitchen_{branch_id}",
+                {
+                    "type": "kitchen.delay_alert",
+                    "message": {
+                        "orders": orders,
+                        "count": len(orders),
+                        "timestamp": timezone.now().isoformat(),
+                        "alert_type": "sla_breach"
+                    }
+                }
+            )
             return True
         except Exception:
+            KitchenNotificationService.create_database_notification(
+                branch_id,
+                orders[0]['order_id'],
+                'sla_breach',
+                message=f"{len(orders)} order(s) past their SLA: "
+                        + ", ".join(str(order['order_id']) for order in orders),
+                notification_type='delay_alert'
+            )
             return False
 
     @staticmethod
@@ -232,6 +369,58 @@ class KitchenNotificationService:
         except Exception:
             return False
 
+class KitchenUpdateBuffer:
+    """
+    Collects kitchen updates per branch so a transaction that bumps many
+    items sends each branch one batched message on commit instead of one
+    blocking group_send per item. Only the latest update per order is
+    kept. With KITCHEN_UPDATE_DEBOUNCE_MS set, committed batches also wait
+    that long, so bursts of separate requests reach the displays as one
+    refresh.
+    """
+    _local = threading.local()
+    _lock = threading.Lock()
+    # Per worker: {branch_id: {order_id: update}} waiting for the debounce window
+    _debounced = {}
+
+    @staticmethod
+    def debounce_seconds():
+        return getattr(settings, 'KITCHEN_UPDATE_DEBOUNCE_MS', 0) / 1000
+
+    @staticmethod
+    def add(branch_id, update):
+        if not connection.in_atomic_block:
+            KitchenUpdateBuffer.send({branch_id: {update['order_id']: update}})
+            return
+
+        batch = commit_batch(KitchenUpdateBuffer._local, lambda: defaultdict(dict), KitchenUpdateBuffer.send)
+        batch[branch_id][update['order_id']] = update
+
+    @staticmethod
+    def send(batch):
+        delay = KitchenUpdateBuffer.debounce_seconds()
+        if delay <= 0:
+            for branch_id, updates in batch.items():
+                KitchenNotificationService.send_kitchen_updates(branch_id, list(updates.values()))
+            return
+
+        with KitchenUpdateBuffer._lock:
+            for branch_id, updates in batch.items():
+                waiting = KitchenUpdateBuffer._debounced.get(branch_id)
+                if waiting is None:
+                    waiting = KitchenUpdateBuffer._debounced[branch_id] = {}
+                    timer = threading.Timer(delay, KitchenUpdateBuffer.flush_debounced, [branch_id])
+                    timer.daemon = True
+                    timer.start()
+                waiting.update(updates)
+
+    @staticmethod
+    def flush_debounced(branch_id):
+        with KitchenUpdateBuffer._lock:
+            updates = KitchenUpdateBuffer._debounced.pop(branch_id, None)
+        if updates:
+            KitchenNotificationService.send_kitchen_updates(branch_id, list(updates.values()))
+
 class KitchenAssignmentService:
     @staticmethod
     def assign_order_to_station(kitchen_order_item):
@@ -253,28 +442,76 @@ class KitchenAssignmentService:
     @staticmethod
     def auto_assign_orders(branch):
         """
-        Automatically assign pending orders to available staff
+        Automatically assign pending orders to available staff.
+
+        Available staff are loaded once, grouped by station, and pending
+        items are popped highest priority first (oldest first within a
+        priority) and paired with a free staff member at their station in
+        memory. The pairs are then written with two bulk updates, so the
+        cost no longer grows with the number of items times staff lookups.
         """
         try:
-            from .models import KitchenOrderItem
-            
-            # Get all pending items that need assignment
-            pending_items = KitchenOrderItem.objects.filter(
-                kitchen_order__order__branch=branch,
-                status='pending',
-                station__isnull=False
-            ).select_related('station')
-            
-            assigned_count = 0
-            
-            for item in pending_items:
-                if KitchenAssignmentService.assign_order_to_station(item):
-                    assigned_count += 1
-                    item.status = 'preparing'
-                    item.started_at = timezone.now()
-                    item.save()
-            
-            return assigned_count
+            with transaction.atomic():
+                staff_by_station = defaultdict(deque)
+                free_staff = (
+                    KitchenStaff.objects
+                    .select_for_update(skip_locked=True)
+                    .filter(station__branch=branch, is_available=True)
+                    .order_by('id')
+                    .values_list('id', 'station_id', 'user_id')
+                )
+                staff_users = {}
+                for staff_id, station_id, user_id in free_staff:
+                    staff_by_station[station_id].append(staff_id)
+                    staff_users[staff_id] = user_id
+                if not staff_by_station:
+                    return 0
+
+                pending = [
+                    (-priority, created_at, item_id, station_id, kitchen_order_id)
+                    for item_id, station_id, kitchen_order_id, priority, created_at in (
+                        KitchenOrderItem.objects.filter(
+                            kitchen_order__order__branch=branch,
+                            status='pending',
+                            station_id__in=list(staff_by_station)
+                        ).values_list('id', 'station_id', 'kitchen_order_id', 'kitchen_order__priority', 'created_at')
+                    )
+                ]
+                heapq.heapify(pending)
+
+                assignments = {}  # staff_id -> kitchen_order_id
+                cooks = {}  # item_id -> user_id of the staff member cooking it
+                while pending and staff_by_station:
+                    _, _, item_id, station_id, kitchen_order_id = heapq.heappop(pending)
+                    station_staff = staff_by_station.get(station_id)
+                    if not station_staff:
+                        continue
+                    staff_id = station_staff.popleft()
+                    assignments[staff_id] = kitchen_order_id
+                    cooks[item_id] = staff_users[staff_id]
+                    if not station_staff:
+                        del staff_by_station[station_id]
+
+                if not cooks:
+                    return 0
+
+                KitchenStaff.objects.filter(id__in=assignments).update(
+                    is_available=False,
+                    current_order_id=Case(
+                        *[When(id=staff_id, then=Value(kitchen_order_id)) for staff_id, kitchen_order_id in assignments.items()]
+                    )
+                )
+                # Credit the items to their cooks, so completing them counts
+                # towards the cooks' stats like items started by hand
+                KitchenOrderItem.objects.filter(id__in=cooks).update(
+                    status='preparing',
+                    started_at=timezone.now(),
+                    prepared_by_id=Case(
+                        *[When(id=item_id, then=Value(user_id)) for item_id, user_id in cooks.items()]
+                    )
+                )
+                KitchenStateService.touch(*set(assignments.values()), kind=KitchenEvent.Kind.ITEM_STARTED)
+                return len(cooks)
         except Exception:
             return 0
 
@@ -293,6 +530,7 @@ class KitchenAssignmentService:
             # Update the item's station
             kitchen_order_item.station = new_station
             kitchen_order_item.save()
+            KitchenStateService.touch(kitchen_order_item.kitchen_order_id, kind=KitchenEvent.Kind.ITEM_REASSIGNED)
             
             # Try to auto-assign to available staff
             if KitchenAssignmentService.assign_order_to_station(kitchen_order_item):
@@ -311,48 +549,1072 @@ class KitchenAssignmentService:
         Get current workload for all stations in a branch
         """
         try:
-            from .models import KitchenOrderItem
-            
-            stations = KitchenStation.objects.filter(branch=branch, is_active=True)
-            workload = {}
-            
-            for station in stations:
-                pending_count = KitchenOrderItem.objects.filter(
-                    station=station,
-                    status='pending'
-                ).count()
-                
-                preparing_count = KitchenOrderItem.objects.filter(
-                    station=station,
-                    status='preparing'
-                ).count()
-                
-                workload[station.name] = {
-                    'pending': pending_count,
-                    'preparing': preparing_count,
-                    'total': pending_count + preparing_count
-                }
-            
-            return workload
+            return {
+                row['station_name']: row
+                for row in KitchenWorkloadService.for_branch(branch)
+            }
         except Exception:
             return {}
 
     @staticmethod
     def optimize_station_assignment(branch):
         """
-        Optimize order assignment based on station workload
+        Name of the station that would clear a new item soonest
         """
         try:
-            workload = KitchenAssignmentService.get_station_workload(branch)
-            
-            # Find stations with lowest workload
-            sorted_stations = sorted(
-                workload.items(),
-                key=lambda x: x[1]['total']
+            stations = dict(
+                KitchenStation.objects.filter(branch=branch, is_active=True).values_list('id', 'name')
             )
-            
-            if sorted_stations:
-                return sorted_stations[0][0]  # Return station name with lowest workload
-            return None
+            if not stations:
+                return None
+            capacity = KitchenAssignmentService.station_capacity(branch, list(stations))
+            return stations[min(capacity, key=lambda station_id: KitchenAssignmentService.clear_time(capacity[station_id]))]
         except Exception:
             return None
+
+    @staticmethod
+    def station_capacity(branch, station_ids):
+        """
+        ``{station_id: [active items, seconds per item, cooks]}`` for scoring
+        stations by expected clear time. Active items and available cooks
+        (at least one) come from two grouped queries; seconds per item is
+        the station's average from the prep time estimate snapshot, which
+        is refreshed with these counts on the way.
+        """
+        workload = KitchenWorkloadService.counts(station_ids)
+        staff = KitchenWorkloadService.staff_counts(station_ids)
+        eta = KitchenETAService.get_table(branch.id)
+        default = KitchenETAService.default_seconds(branch)
+
+        capacity = {}
+        for station_id in station_ids:
+            eta['depth'][station_id] = workload[station_id]['total']
+            eta['cooks'][station_id] = staff[station_id]['available_staff']
+            capacity[station_id] = [
+                workload[station_id]['total'],
+                eta['stations'].get(station_id, default),
+                max(staff[station_id]['available_staff'], 1)
+            ]
+        return capacity
+
+    @staticmethod
+    def clear_time(station_capacity):
+        """Seconds until the station would finish one more item: queue and item over its cooks"""
+        queued, seconds_per_item, cooks = station_capacity
+        return (queued + 1) * seconds_per_item / cooks
+
+class KitchenWorkloadService:
+    """
+    Active item counts per station. Every method answers for any number of
+    stations with one GROUP BY query instead of COUNT queries per station.
+    """
+    ACTIVE_STATUSES = ('pending', 'preparing')
+
+    @staticmethod
+    def counts(station_ids):
+        """{station_id: {'pending', 'preparing', 'total'}} from one GROUP BY station_id, status"""
+        counts = {station_id: {'pending': 0, 'preparing': 0, 'total': 0} for station_id in station_ids}
+        rows = (
+            KitchenOrderItem.objects
+            .filter(station_id__in=counts.keys(), status__in=KitchenWorkloadService.ACTIVE_STATUSES)
+            .values_list('station_id', 'status')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for station_id, item_status, count in rows:
+            counts[station_id][item_status] = count
+            counts[station_id]['total'] += count
+        return counts
+
+    @staticmethod
+    def staff_counts(station_ids):
+        """{station_id: {'staff_count', 'available_staff'}} from one GROUP BY station_id"""
+        counts = {station_id: {'staff_count': 0, 'available_staff': 0} for station_id in station_ids}
+        rows = (
+            KitchenStaff.objects
+            .filter(station_id__in=counts.keys())
+            .values_list('station_id')
+            .annotate(
+                staff_count=Count('id'),
+                available_staff=Count('id', filter=Q(is_available=True))
+            )
+            .order_by()
+        )
+        for station_id, staff_count, available_staff in rows:
+            counts[station_id] = {'staff_count': staff_count, 'available_staff': available_staff}
+        return counts
+
+    @staticmethod
+    def for_stations(stations, include_staff=False, counts=None):
+        """
+        Workload rows (station_id, station_name, pending, preparing, total)
+        for the given stations; ``counts`` can supply the item counts (e.g.
+        from the kitchen projection) instead of the GROUP BY query
+        """
+        stations = list(stations)
+        station_ids = [station.id for station in stations]
+        if counts is None:
+            counts = KitchenWorkloadService.counts(station_ids)
+        staff = KitchenWorkloadService.staff_counts(station_ids) if include_staff else {}
+
+        return [
+            {
+                'station_id': station.id,
+                'station_name': station.name,
+                **counts[station.id],
+                **staff.get(station.id, {})
+            }
+            for station in stations
+        ]
+
+    @staticmethod
+    def for_branch(branch, include_staff=False):
+        """Workload rows for all of the branch's active stations"""
+        stations = KitchenStation.objects.filter(branch=branch, is_active=True).only('id', 'name')
+        return KitchenWorkloadService.for_stations(stations, include_staff)
+
+class KitchenQueueService:
+    """
+    Station work queues ordered by an aging score:
+
+        score = priority + waiting time / aging interval
+
+    where priority is the ticket's stored base priority (which includes the
+    order type weight). Every item gains a point per interval waited, so old
+    low-priority tickets eventually overtake new urgent ones. Ordering by
+    the score is the same as ordering by KitchenOrderItem.queue_key
+    ascending, so queues are read in index order.
+    """
+    ACTIVE_STATUSES = ('pending', 'preparing')
+
+    @staticmethod
+    def aging_interval():
+        return timedelta(minutes=getattr(settings, 'KITCHEN_PRIORITY_AGING_MINUTES', 5))
+
+    @staticmethod
+    def queue_key(priority, created_at=None):
+        return (created_at or timezone.now()) - KitchenQueueService.aging_interval() * (priority or 0)
+
+    @staticmethod
+    def reprioritize(kitchen_order):
+        """Re-key a ticket's items after its base priority changed"""
+        KitchenOrderItem.objects.filter(kitchen_order=kitchen_order).update(
+            queue_key=F('created_at') - Value(
+                KitchenQueueService.aging_interval() * (kitchen_order.priority or 0),
+                output_field=DurationField()
+            )
+        )
+
+    @staticmethod
+    def get_queue(station_ids):
+        """
+        Active items at the given stations, highest aging score first, with
+        everything a KDS tile needs, in one query
+        """
+        rows = (
+            KitchenOrderItem.objects
+            .filter(station_id__in=station_ids, status__in=KitchenQueueService.ACTIVE_STATUSES)
+            .annotate(aging=ExpressionWrapper(Now() - F('queue_key'), output_field=DurationField()))
+            .order_by('queue_key', 'id')
+            .values(
+                'id', 'status', 'station_id', 'kitchen_order_id', 'created_at', 'started_at', 'aging',
+                'kitchen_order__priority', 'kitchen_order__order_id', 'kitchen_order__order__order_number',
+                'kitchen_order__order__order_type', 'order_item__quantity', 'order_item__item__name'
+            )
+        )
+        interval = KitchenQueueService.aging_interval().total_seconds()
+        return [
+            {
+                'id': row['id'],
+                'status': row['status'],
+                'station_id': row['station_id'],
+                'kitchen_order_id': row['kitchen_order_id'],
+                'order_id': row['kitchen_order__order_id'],
+                'order_number': Order.format_display_number(
+                    row['kitchen_order__order_id'], row['kitchen_order__order__order_number']
+                ),
+                'order_type': row['kitchen_order__order__order_type'],
+                'item_name': row['order_item__item__name'],
+                'quantity': row['order_item__quantity'],
+                'priority': row['kitchen_order__priority'],
+                'score': round(row['aging'].total_seconds() / interval, 2),
+                'created_at': row['created_at'],
+                'started_at': row['started_at'],
+            }
+            for row in rows
+        ]
+
+class KitchenTicketService:
+    ACTIVE_STATUSES = ('pending', 'preparing')
+
+    @staticmethod
+    def build(kitchen_order_ids):
+        """
+        Flat KDS tickets (without ``age``) for the given ticket ids or id
+        subquery, highest priority and oldest first. Built from one
+        values() query over the tickets' items, grouped into tickets in
+        Python, instead of the nested order/station/user serializers.
+        """
+        rows = (
+            KitchenOrderItem.objects
+            .filter(kitchen_order__in=kitchen_order_ids)
+            .order_by('-kitchen_order__priority', 'kitchen_order__created_at', 'kitchen_order_id', 'id')
+            .values(
+                'id', 'status', 'station_id', 'notes', 'kitchen_order_id',
+                'kitchen_order__status', 'kitchen_order__priority', 'kitchen_order__notes',
+                'kitchen_order__created_at', 'kitchen_order__order_id',
+                'kitchen_order__order__order_number', 'kitchen_order__order__order_type',
+                'kitchen_order__order__table__table_number',
+                'order_item__quantity', 'order_item__item_id', 'order_item__item__name'
+            )
+        )
+
+        result = {}
+        for row in rows:
+            ticket = result.get(row['kitchen_order_id'])
+            if ticket is None:
+                ticket = result[row['kitchen_order_id']] = {
+                    'id': row['kitchen_order_id'],
+                    'order_id': row['kitchen_order__order_id'],
+                    'order_number': Order.format_display_number(
+                        row['kitchen_order__order_id'], row['kitchen_order__order__order_number']
+                    ),
+                    'order_type': row['kitchen_order__order__order_type'],
+                    'table': row['kitchen_order__order__table__table_number'],
+                    'status': row['kitchen_order__status'],
+                    'priority': row['kitchen_order__priority'],
+                    'notes': row['kitchen_order__notes'],
+                    'created_at': row['kitchen_order__created_at'],
+                    'items': [],
+                }
+            ticket['items'].append({
+                'id': row['id'],
+                'item_id': row['order_item__item_id'],
+                'name': row['order_item__item__name'],
+                'quantity': row['order_item__quantity'],
+                'notes': row['notes'],
+                'station_id': row['station_id'],
+                'status': row['status'],
+            })
+        return list(result.values())
+
+class KitchenStateService:
+    """
+    Per-branch kitchen state version (Branch.kitchen_state_version), bumped
+    after every committed kitchen write. Displays poll with the version as
+    an ETag and get a 304 without any ORM work while nothing has changed,
+    or ask for just the tickets changed since the version they hold
+    (KitchenOrder.state_version).
+
+    Versions are allocated after commit with a single UPDATE ... RETURNING
+    on the branch row, so they are handed out in commit order, and mirrored
+    into the cache for the ETag check. The cached copy expires after
+    KITCHEN_STATE_CACHE_SECONDS and is then re-read from the branch row, so
+    with a per-process cache other workers see a bump within that long
+    (right away with a shared cache). Each bump also appends the changed
+    tickets to the branch's KitchenEvent log under the new version, so the
+    log has no gaps and in-memory projections can follow it.
+    """
+    _local = threading.local()
+
+    @staticmethod
+    def _cache_key(branch_id):
+        return f'kitchen:state-version:{branch_id}'
+
+    @staticmethod
+    def cache_seconds():
+        return getattr(settings, 'KITCHEN_STATE_CACHE_SECONDS', 1)
+
+    @staticmethod
+    def current_version(branch_id):
+        """Latest committed version, from the cache; one query once the cached copy expires"""
+        key = KitchenStateService._cache_key(branch_id)
+        version = cache.get(key)
+        if version is None:
+            version = Branch.objects.filter(id=branch_id).values_list('kitchen_state_version', flat=True).first() or 0
+            cache.add(key, version, KitchenStateService.cache_seconds())
+        return version
+
+    @staticmethod
+    def _pending():
+        """
+        Changes of the current transaction, published together once it
+        commits: ({kitchen_order_id: kind}, {branch_id: removed ticket ids}).
+        The changes are already committed when it runs, so a failed publish
+        is logged and does not drop the commit hooks queued after it.
+        """
+        return commit_batch(
+            KitchenStateService._local,
+            lambda: ({}, defaultdict(set)),
+            lambda pending: KitchenStateService.publish(*pending),
+            robust=True
+        )
+
+    @staticmethod
+    def touch(*kitchen_order_ids, kind=KitchenEvent.Kind.TICKET_UPDATED):
+        """Mark tickets as changed once the current transaction commits"""
+        ids = [kitchen_order_id for kitchen_order_id in kitchen_order_ids if kitchen_order_id is not None]
+        if not ids:
+            return
+        if not connection.in_atomic_block:
+            KitchenStateService.publish(dict.fromkeys(ids, kind), {})
+            return
+        tickets = KitchenStateService._pending()[0]
+        for kitchen_order_id in ids:
+            tickets[kitchen_order_id] = KitchenStateService._stronger(tickets.get(kitchen_order_id), kind)
+
+    @staticmethod
+    def touch_removed(branch_id, *kitchen_order_ids):
+        """Publish deleted tickets of the branch once the current transaction commits"""
+        if not connection.in_atomic_block:
+            KitchenStateService.publish({}, {branch_id: set(kitchen_order_ids)})
+            return
+        KitchenStateService._pending()[1][branch_id].update(kitchen_order_ids)
+
+    @staticmethod
+    def _stronger(kind, other):
+        kinds = KitchenEvent.Kind.values
+        return other if kind is None or kinds.index(other) < kinds.index(kind) else kind
+
+    @staticmethod
+    def publish(tickets, removed):
+        """Bump each affected branch once for the committed changes"""
+        by_branch = defaultdict(dict)
+        if tickets:
+            rows = KitchenOrder.objects.filter(id__in=list(tickets)).values_list('id', 'order__branch_id')
+            for kitchen_order_id, branch_id in rows:
+                by_branch[branch_id][kitchen_order_id] = tickets[kitchen_order_id]
+        for branch_id in set(by_branch) | set(removed):
+            KitchenStateService.bump(branch_id, by_branch.get(branch_id, {}), removed.get(branch_id, ()))
+
+    @staticmethod
+    def bump(branch_id, tickets=None, removed=()):
+        """
+        Allocate the branch's next version, stamp it on the changed tickets
+        (``{kitchen_order_id: kind}``) and log them, with the ``removed``
+        ticket ids, as the version's event
+        """
+        tickets = tickets or {}
+        table = connection.ops.quote_name(Branch._meta.db_table)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET kitchen_state_version = kitchen_state_version + 1 "
+                    f"WHERE id = %s RETURNING kitchen_state_version",
+                    [branch_id]
+                )
+                row = cursor.fetchone()
+            if row is None:
+                return None
+            version = row[0]
+            snapshots = []
+            if tickets:
+                KitchenOrder.objects.filter(id__in=list(tickets), order__branch_id=branch_id).update(
+                    state_version=version
+                )
+                snapshots = KitchenTicketService.build(list(tickets))
+
+            # Tickets left without items drop off the displays like deleted ones
+            found = {ticket['id'] for ticket in snapshots}
+            gone = sorted(set(removed) | (set(tickets) - found))
+            kind = None
+            for ticket_kind in tickets.values():
+                kind = KitchenStateService._stronger(kind, ticket_kind)
+            if gone and kind is None:
+                kind = KitchenEvent.Kind.TICKET_REMOVED
+            KitchenEvent.objects.create(
+                branch_id=branch_id,
+                sequence=version,
+                kind=kind or KitchenEvent.Kind.TICKET_UPDATED,
+                tickets=snapshots,
+                removed=gone
+            )
+
+        # Never move the cached version backwards if bumps finish out of order
+        key = KitchenStateService._cache_key(branch_id)
+        if version > (cache.get(key) or 0):
+            cache.set(key, version, KitchenStateService.cache_seconds())
+        return version
+
+    @staticmethod
+    def purge_events(older_than, batch_size=1000):
+        """
+        Delete kitchen events logged before ``older_than`` in batches of
+        ``batch_size``, each in its own short transaction. Projections
+        further behind than that rebuild from the tickets. Returns the
+        number deleted.
+        """
+        return delete_in_batches(KitchenEvent.objects.filter(created_at__lt=older_than), batch_size)
+
+
+class KitchenAnalyticsService:
+    @staticmethod
+    def record_completed(kitchen_order):
+        """
+        Fold a completed ticket's timed items into their stations' daily
+        accumulators: one query for the items, one insert for missing rows
+        and a single UPDATE per station, so concurrent completions never
+        overwrite each other's counts.
+        """
+        items = KitchenOrderItem.objects.filter(
+            kitchen_order=kitchen_order,
+            station__isnull=False,
+            started_at__isnull=False,
+            completed_at__isnull=False
+        ).values_list('station_id', 'started_at', 'completed_at')
+
+        # Items slower than the ticket SLA (KITCHEN_SLA_MINUTES) count as breaches
+        threshold = KitchenSLAService.sla().total_seconds()
+        totals = {}
+        for station_id, started_at, completed_at in items:
+            seconds = max((completed_at - started_at).total_seconds(), 0)
+            total = totals.setdefault(station_id, {
+                'count': 0, 'sum': 0.0, 'sumsq': 0.0, 'breaches': 0,
+                'buckets': defaultdict(int), 'hours': defaultdict(int)
+            })
+            total['count'] += 1
+            total['sum'] += seconds
+            total['sumsq'] += seconds * seconds
+            total['breaches'] += seconds > threshold
+            total['buckets'][KitchenAnalytics.bucket_for(seconds)] += 1
+            total['hours'][timezone.localtime(completed_at).hour] += 1
+
+        if not totals:
+            return
+
+        date = timezone.localdate()
+        with transaction.atomic():
+            KitchenAnalytics.objects.bulk_create(
+                [KitchenAnalytics(station_id=station_id, date=date) for station_id in totals],
+                ignore_conflicts=True
+            )
+            for station_id, total in totals.items():
+                KitchenAnalytics.objects.filter(station_id=station_id, date=date).update(
+                    total_orders=F('total_orders') + total['count'],
+                    prep_seconds_sum=F('prep_seconds_sum') + total['sum'],
+                    prep_seconds_sumsq=F('prep_seconds_sumsq') + total['sumsq'],
+                    sla_breaches=F('sla_breaches') + total['breaches'],
+                    prep_histogram=JSONArrayAdd('prep_histogram', total['buckets']),
+                    peak_hours=JSONArrayAdd('peak_hours', total['hours']),
+                    updated_at=timezone.now()
+                )
+
+    @staticmethod
+    def summary(rows):
+        """
+        Combine accumulator rows (several stations and/or days) into one
+        summary: weighted mean, standard deviation, p50/p90 and peak hour
+        """
+        combined = KitchenAnalytics(
+            prep_histogram=[0] * (len(KitchenAnalytics.PREP_TIME_BUCKETS) + 1),
+            peak_hours=[0] * 24
+        )
+        for row in rows:
+            combined.total_orders += row.total_orders
+            combined.prep_seconds_sum += row.prep_seconds_sum
+            combined.prep_seconds_sumsq += row.prep_seconds_sumsq
+            combined.sla_breaches += row.sla_breaches
+            for index, count in enumerate(row.prep_histogram):
+                combined.prep_histogram[index] += count
+            for hour, count in enumerate(row.peak_hours):
+                combined.peak_hours[hour] += count
+        return {
+            'total_orders': combined.total_orders,
+            'avg_time': combined.average_preparation_time,
+            'stddev': combined.preparation_time_stddev,
+            'p50': combined.preparation_time_percentile(50),
+            'p90': combined.preparation_time_percentile(90),
+            'peak_hour': combined.peak_hour,
+            'sla_breaches': combined.sla_breaches,
+        }
+
+class KitchenStaffStatsService:
+    # Default window of the performance endpoints
+    DEFAULT_DAYS = 30
+
+    @staticmethod
+    def complete_items(items, completed_at=None):
+        """
+        Complete the not yet completed ``items`` in one UPDATE, credit the
+        prep times to the cooks who started them and fold them into the
+        items' prep time stats. Returns the number of items completed.
+        """
+        completed_at = completed_at or timezone.now()
+        items = items.exclude(status='completed')
+        timed = list(
+            items.filter(started_at__isnull=False)
+            .values_list('prepared_by_id', 'started_at', 'station__branch_id', 'order_item__item_id', 'station_id')
+        )
+        completed = items.update(status='completed', completed_at=completed_at)
+        KitchenStaffStatsService.record(
+            (user_id, started_at, completed_at) for user_id, started_at, *_ in timed
+        )
+        KitchenETAService.record(
+            (branch_id, item_id, station_id, started_at, completed_at)
+            for _, started_at, branch_id, item_id, station_id in timed
+        )
+        return completed
+
+    @staticmethod
+    def record(rows):
+        """
+        Add ``(user_id, started_at, completed_at)`` prep times to the cooks'
+        running totals. A cook's first item of the day starts the day's row
+        from the previous row's totals; one UPDATE then adds the items to
+        that row and any later ones, so every row stays cumulative.
+        """
+        totals = {}
+        for user_id, started_at, completed_at in rows:
+            if user_id is None or started_at is None or completed_at is None:
+                continue
+            seconds = max((completed_at - started_at).total_seconds(), 0)
+            total = totals.setdefault(
+                (user_id, timezone.localdate(completed_at)),
+                {'count': 0, 'sum': 0.0, 'buckets': defaultdict(int)}
+            )
+            total['count'] += 1
+            total['sum'] += seconds
+            total['buckets'][KitchenStaffStats.bucket_for(seconds)] += 1
+
+        if not totals:
+            return
+
+        with transaction.atomic():
+            for (user_id, date), total in totals.items():
+                latest = (
+                    KitchenStaffStats.objects.filter(user_id=user_id, date__lte=date)
+                    .order_by('-date').first()
+                )
+                if latest is None or latest.date != date:
+                    KitchenStaffStats.objects.bulk_create([
+                        KitchenStaffStats(
+                            user_id=user_id,
+                            date=date,
+                            completed_items=latest.completed_items if latest else 0,
+                            prep_seconds_sum=latest.prep_seconds_sum if latest else 0,
+                            prep_histogram=latest.prep_histogram if latest else KitchenStaffStats().prep_histogram
+                        )
+                    ], ignore_conflicts=True)
+                KitchenStaffStats.objects.filter(user_id=user_id, date__gte=date).update(
+                    completed_items=F('completed_items') + total['count'],
+                    prep_seconds_sum=F('prep_seconds_sum') + total['sum'],
+                    prep_histogram=JSONArrayAdd('prep_histogram', total['buckets']),
+                    updated_at=timezone.now()
+                )
+
+    @staticmethod
+    def summary(user_id, start=None, end=None):
+        """
+        A cook's completed items, mean and p50/p90/p99 prep time and daily
+        throughput between ``start`` and ``end`` (inclusive dates), from at
+        most two rows whatever the range
+        """
+        end = end or timezone.localdate()
+        start = start or end - timedelta(days=KitchenStaffStatsService.DEFAULT_DAYS - 1)
+        rows = KitchenStaffStats.objects.filter(user_id=user_id).order_by('-date')
+        until_end = rows.filter(date__lte=end).first()
+        before_start = rows.filter(date__lt=start).first()
+
+        empty = KitchenStaffStats()
+        until_end = until_end or empty
+        before_start = before_start or empty
+        count = until_end.completed_items - before_start.completed_items
+        histogram = [
+            after - before for after, before in zip(until_end.prep_histogram, before_start.prep_histogram)
+        ]
+        days = (end - start).days + 1
+        return {
+            'start': start,
+            'end': end,
+            'completed_items': count,
+            'average_preparation_time': (
+                timedelta(seconds=(until_end.prep_seconds_sum - before_start.prep_seconds_sum) / count)
+                if count else None
+            ),
+            'p50': KitchenStaffStats.histogram_percentile(histogram, 50),
+            'p90': KitchenStaffStats.histogram_percentile(histogram, 90),
+            'p99': KitchenStaffStats.histogram_percentile(histogram, 99),
+            'throughput_per_day': round(count / days, 2) if days > 0 else None,
+        }
+
+# Prep time estimate snapshots of this worker: {branch_id: (loaded_at, table)}
+_eta_tables = {}
+
+
+class KitchenETAService:
+    """
+    Ticket completion estimates from per (item, station) prep time stats.
+    Completed items are folded into ItemPrepStats as they finish. Each
+    worker keeps a per-branch snapshot of the moving averages, station
+    queue depths and available cooks, reloaded every
+    KITCHEN_ETA_REFRESH_SECONDS, so estimating a new ticket runs no
+    queries; tickets it estimates count towards the snapshot's queue
+    depths until the next reload.
+    """
+
+    @staticmethod
+    def refresh_seconds():
+        return getattr(settings, 'KITCHEN_ETA_REFRESH_SECONDS', 30)
+
+    @staticmethod
+    def record(rows):
+        """
+        Add ``(branch_id, item_id, station_id, started_at, completed_at)``
+        prep times to the stats, in order: one insert for missing rows and
+        a single UPDATE per (item, station), so concurrent completions
+        never overwrite each other.
+        """
+        samples = defaultdict(list)
+        for branch_id, item_id, station_id, started_at, completed_at in rows:
+            if station_id is None or started_at is None or completed_at is None:
+                continue
+            samples[(branch_id, item_id, station_id)].append(
+                max((completed_at - started_at).total_seconds(), 0)
+            )
+
+        if not samples:
+            return
+
+        with transaction.atomic():
+            ItemPrepStats.objects.bulk_create(
+                [
+                    ItemPrepStats(branch_id=branch_id, item_id=item_id, station_id=station_id)
+                    for branch_id, item_id, station_id in samples
+                ],
+                ignore_conflicts=True
+            )
+            for (branch_id, item_id, station_id), seconds in samples.items():
+                buckets = defaultdict(int)
+                for value in seconds:
+                    buckets[ItemPrepStats.bucket_for(value)] += 1
+                # average' = average * (1 - alpha)^n + (the samples' average starting from 0)
+                decay = (1 - ItemPrepStats.EWMA_ALPHA) ** len(seconds)
+                ItemPrepStats.objects.filter(branch_id=branch_id, item_id=item_id, station_id=station_id).update(
+                    ewma_seconds=Case(
+                        When(samples=0, then=Value(ItemPrepStats.moving_average(seconds))),
+                        default=F('ewma_seconds') * decay + ItemPrepStats.moving_average(seconds, 0),
+                        output_field=FloatField()
+                    ),
+                    samples=F('samples') + len(seconds),
+                    prep_histogram=JSONArrayAdd('prep_histogram', buckets),
+                    updated_at=timezone.now()
+                )
+
+    @staticmethod
+    def get_table(branch_id):
+        """The branch's estimate snapshot, reloaded once it is refresh_seconds() old"""
+        cached = _eta_tables.get(branch_id)
+        if cached is not None and time.monotonic() - cached[0] < KitchenETAService.refresh_seconds():
+            return cached[1]
+
+        station_ids = StationRoutingService.get_table(branch_id)['stations']
+        items = {}
+        station_totals = defaultdict(list)
+        rows = ItemPrepStats.objects.filter(branch_id=branch_id, samples__gt=0).values_list(
+            'item_id', 'station_id', 'ewma_seconds'
+        )
+        for item_id, station_id, ewma_seconds in rows:
+            items[(item_id, station_id)] = ewma_seconds
+            station_totals[station_id].append(ewma_seconds)
+
+        table = {
+            'items': items,
+            'stations': {
+                station_id: sum(averages) / len(averages) for station_id, averages in station_totals.items()
+            },
+            'depth': {
+                station_id: counts['total']
+                for station_id, counts in KitchenWorkloadService.counts(station_ids).items()
+            },
+            'cooks': {
+                station_id: counts['available_staff']
+                for station_id, counts in KitchenWorkloadService.staff_counts(station_ids).items()
+            },
+        }
+        _eta_tables[branch_id] = (time.monotonic(), table)
+        return table
+
+    @staticmethod
+    def default_seconds(branch):
+        """Prep time of items with no stats at a station without any either"""
+        return (branch.kitchen_settings or {}).get('default_preparation_time', 15) * 60
+
+    @staticmethod
+    def estimate(branch, items, station_ids):
+        """
+        Expected time until a new ticket of ``items`` routed to
+        ``station_ids`` is done. Each station first works off its queue,
+        then the ticket's items, spread over its available cooks (at least
+        one); the ticket is done when its slowest station is. Items without
+        stats use their station's average, then the branch's default
+        preparation time.
+        """
+        table = KitchenETAService.get_table(branch.id)
+        default = KitchenETAService.default_seconds(branch)
+
+        station_items = defaultdict(list)
+        for order_item, station_id in zip(items, station_ids):
+            station_items[station_id].append(
+                table['items'].get((order_item.item_id, station_id))
+                or table['stations'].get(station_id, default)
+            )
+
+        seconds = 0
+        for station_id, prep_times in station_items.items():
+            cooks = max(table['cooks'].get(station_id, 0), 1)
+            queued = table['depth'].get(station_id, 0) * table['stations'].get(station_id, default) / cooks
+            seconds = max(seconds, queued + max(max(prep_times), sum(prep_times) / cooks))
+            if station_id in table['depth']:
+                table['depth'][station_id] += len(prep_times)
+        return timedelta(seconds=seconds)
+
+class KitchenSLAService:
+    ACTIVE_STATUSES = ('pending', 'preparing')
+
+    @staticmethod
+    def sla():
+        return timedelta(minutes=getattr(settings, 'KITCHEN_SLA_MINUTES', 20))
+
+    @staticmethod
+    def scan(now=None, batch_size=500):
+        """
+        Flag active tickets past their SLA deadline, each exactly once, and
+        send one coalesced alert per branch. Due tickets are read from the
+        partial deadline index in batches, locked with SKIP LOCKED so
+        concurrent scanners split the work, and flagged with a conditional
+        update. Returns the number of tickets flagged.
+        """
+        now = now or timezone.now()
+        breaches = defaultdict(list)
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    KitchenOrder.objects
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .filter(
+                        sla_breached_at__isnull=True,
+                        status__in=KitchenSLAService.ACTIVE_STATUSES,
+                        sla_breach_time__lte=now
+                    )
+                    .order_by('sla_breach_time', 'id')
+                    .values('id', 'order_id', 'order__branch_id', 'sla_breach_time')[:batch_size]
+                )
+                if batch:
+                    KitchenOrder.objects.filter(
+                        id__in=[row['id'] for row in batch],
+                        sla_breached_at__isnull=True
+                    ).update(sla_breached_at=now)
+
+            for row in batch:
+                breaches[row['order__branch_id']].append({
+                    'kitchen_order_id': row['id'],
+                    'order_id': row['order_id'],
+                    'delay_minutes': int((now - row['sla_breach_time']).total_seconds() // 60),
+                })
+            if len(batch) < batch_size:
+                break
+
+        for branch_id, orders in breaches.items():
+            KitchenNotificationService.notify_sla_breaches(branch_id, orders)
+        return sum(len(orders) for orders in breaches.values())
+
+class KitchenProgressService:
+    """
+    Keeps the kitchen progress summary on Order (kitchen_items_total and
+    kitchen_items_done) in step with KitchenOrderItem writes, so order lists
+    can show "3/5 done" without joining kitchen rows.
+    """
+    @staticmethod
+    def items_added(order_id, count=1):
+        if count:
+            Order.objects.filter(order_id=order_id).update(
+                kitchen_items_total=F('kitchen_items_total') + count
+            )
+
+    @staticmethod
+    def items_completed(order_id, count=1):
+        if count:
+            Order.objects.filter(order_id=order_id).update(
+                kitchen_items_done=F('kitchen_items_done') + count
+            )
+
+    @staticmethod
+    def items_removed(order_id, count=1, completed=0):
+        if count:
+            Order.objects.filter(order_id=order_id).update(
+                kitchen_items_total=F('kitchen_items_total') - count,
+                kitchen_items_done=F('kitchen_items_done') - completed
+            )
+
+
+class KitchenBumpService:
+    """
+    Moves many items through the bump bar at once. Each transition is one
+    conditional UPDATE, ticket readiness is worked out with one aggregate
+    query, and the displays get one batched update when the bump commits.
+    """
+    # Status an item has to be in to be bumped to each target status
+    TRANSITIONS = {'preparing': 'pending', 'completed': 'preparing'}
+
+    @staticmethod
+    def bump_items(items, target, user=None):
+        """
+        Move the ``items`` that are in the preceding status to ``target``;
+        items in any other status are left alone. Returns the ids of the
+        items moved and of the tickets they left with nothing to cook.
+        """
+        source = KitchenBumpService.TRANSITIONS[target]
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                items.filter(status=source).select_for_update(of=('self',))
+                .values_list('id', 'kitchen_order_id', 'kitchen_order__order_id', 'kitchen_order__order__branch_id')
+            )
+            if not rows:
+                return [], []
+
+            item_ids = [item_id for item_id, *_ in rows]
+            bumped = KitchenOrderItem.objects.filter(id__in=item_ids, status=source)
+            tickets = {ticket_id: branch_id for _, ticket_id, _, branch_id in rows}
+            ready = []
+            if target == 'preparing':
+                bumped.update(status='preparing', started_at=now, prepared_by=user)
+                kind, update = KitchenEvent.Kind.ITEM_STARTED, 'item_started'
+            else:
+                KitchenStaffStatsService.complete_items(bumped, completed_at=now)
+                completed = defaultdict(int)
+                for _, _, order_id, _ in rows:
+                    completed[order_id] += 1
+                for order_id, count in completed.items():
+                    KitchenProgressService.items_completed(order_id, count)
+
+                ready = list(
+                    KitchenOrder.objects.filter(id__in=list(tickets), status__in=KitchenTicketService.ACTIVE_STATUSES)
+                    .annotate(open_items=Count('items', filter=~Q(items__status='completed')))
+                    .filter(open_items=0)
+                    .values_list('id', flat=True)
+                )
+                if ready:
+                    KitchenOrder.objects.filter(id__in=ready).update(status='ready')
+                kind, update = KitchenEvent.Kind.ITEM_COMPLETED, 'item_completed'
+
+            KitchenStateService.touch(*tickets, kind=kind)
+            ready_ids = set(ready)
+            for ticket_id, branch_id in tickets.items():
+                KitchenNotificationService.notify_kitchen_update(
+                    branch_id, ticket_id, 'ready' if ticket_id in ready_ids else update
+                )
+        return item_ids, ready
+
+
+class KitchenTicketBuilder:
+    """
+    Builds kitchen tickets for committed orders. Routing comes from the
+    branch's compiled station routing table, and priority and the estimated
+    completion time are worked out in memory; every KitchenOrderItem for the ticket is written with a single
+    bulk_create.
+    """
+    @staticmethod
+    def create_ticket(order, items):
+        """Create the kitchen order and all of its items for a newly placed order"""
+        if not order.branch.kitchen_enabled:
+            return None
+
+        station_ids = KitchenTicketBuilder.route(order.branch, items)
+        now = timezone.now()
+        with transaction.atomic():
+            kitchen_order = KitchenOrder.objects.create(
+                order=order,
+                status='pending',
+                priority=calculate_order_priority(order),
+                notes=f"Auto-created from order {order.order_id}",
+                estimated_completion_time=now + KitchenETAService.estimate(order.branch, items, station_ids),
+                sla_breach_time=now + KitchenSLAService.sla()
+            )
+            KitchenTicketBuilder._create_items(kitchen_order, order, items, station_ids)
+        return kitchen_order
+
+    @staticmethod
+    def add_items(order, items):
+        """Append items added to an existing order to its kitchen ticket"""
+        if not order.branch.kitchen_enabled or not items:
+            return None
+
+        station_ids = KitchenTicketBuilder.route(order.branch, items)
+        now = timezone.now()
+        with transaction.atomic():
+            kitchen_order, _ = KitchenOrder.objects.get_or_create(
+                order=order,
+                defaults={
+                    'status': 'pending',
+                    'priority': calculate_order_priority(order),
+                    'notes': f"Auto-created from order {order.order_id}",
+                    'estimated_completion_time': now + KitchenETAService.estimate(order.branch, items, station_ids),
+                    'sla_breach_time': now + KitchenSLAService.sla()
+                }
+            )
+            KitchenTicketBuilder._create_items(kitchen_order, order, items, station_ids)
+            KitchenStateService.touch(kitchen_order.id, kind=KitchenEvent.Kind.ITEMS_ADDED)
+        return kitchen_order
+
+    @staticmethod
+    def _create_items(kitchen_order, order, items, station_ids):
+        queue_key = KitchenQueueService.queue_key(kitchen_order.priority)
+        KitchenOrderItem.objects.bulk_create([
+            KitchenOrderItem(
+                kitchen_order=kitchen_order,
+                order_item=order_item,
+                station_id=station_id,
+                status='pending',
+                queue_key=queue_key
+            )
+            for order_item, station_id in zip(items, station_ids)
+        ])
+        KitchenProgressService.items_added(order.order_id, len(items))
+
+        if order.branch.kitchen_settings.get('auto_assign_stations', False):
+            KitchenAssignmentService.auto_assign_orders(order.branch)
+
+    @staticmethod
+    def route(branch, items):
+        """
+        Pick a station id for each order item from the routing table. Items
+        with no route go to the station that would clear them soonest (its
+        queue times its average item time, over its available cooks); items
+        routed this way count towards its queue, so one large order is
+        spread out rather than piled onto whichever station was idle when it
+        arrived.
+        """
+        table = StationRoutingService.get_table(branch.id)
+        if not items or not table['stations']:
+            return [None] * len(items)
+
+        routed = [
+            StationRoutingService.lookup(table, order_item.item_id, order_item.item.category_id)
+            for order_item in items
+        ]
+        if None not in routed:
+            return routed
+
+        capacity = KitchenAssignmentService.station_capacity(branch, table['stations'])
+        for index, station_id in enumerate(routed):
+            if station_id is None:
+                station_id = routed[index] = min(
+                    table['stations'],
+                    key=lambda station_id: KitchenAssignmentService.clear_time(capacity[station_id])
+                )
+            capacity[station_id][0] += 1
+        return routed
+
+
+# Compiled routing tables for this worker: {branch_id: (version, compiled_at, table)}
+_routing_tables = {}
+
+
+class StationRoutingService:
+    """
+    Per-branch station routing compiled into plain dicts, so routing an item
+    is a dictionary lookup. Each worker keeps its own compiled copy and
+    checks it against a version counter in the cache; any change to routes,
+    stations or categories bumps the counter and every worker recompiles on
+    its next lookup. Configure a shared cache (REDIS_URL in production) so
+    the bump reaches all worker processes; without one, other workers pick
+    the change up once their copy is KITCHEN_ROUTING_MAX_AGE_SECONDS old.
+    """
+    # Name-based defaults for categories without an explicit route:
+    # category name fragment -> preferred station name fragments, in order
+    DEFAULT_CATEGORY_STATIONS = {
+        'dessert': ['dessert', 'bakery', 'pastry'],
+        'salad': ['salad', 'cold kitchen', 'prep'],
+        'grill': ['grill', 'bbq', 'hot kitchen'],
+        'pizza': ['pizza', 'oven', 'hot kitchen'],
+        'sushi': ['sushi', 'cold kitchen', 'prep'],
+        'drinks': ['bar', 'beverage', 'drinks'],
+        'appetizer': ['appetizer', 'prep', 'cold kitchen'],
+        'main course': ['main kitchen', 'hot kitchen', 'grill'],
+        'side dish': ['prep', 'cold kitchen', 'main kitchen']
+    }
+
+    @staticmethod
+    def _version_key(branch_id):
+        return f'kitchen:station-routing:{branch_id}'
+
+    @staticmethod
+    def max_age_seconds():
+        return getattr(settings, 'KITCHEN_ROUTING_MAX_AGE_SECONDS', 60)
+
+    @staticmethod
+    def get_table(branch_id):
+        """Compiled routing table for the branch, recompiled after a change or once it is too old"""
+        version = cache.get(StationRoutingService._version_key(branch_id), 0)
+        cached = _routing_tables.get(branch_id)
+        if (cached is not None and cached[0] == version
+                and time.monotonic() - cached[1] < StationRoutingService.max_age_seconds()):
+            return cached[2]
+
+        table = StationRoutingService.compile(branch_id)
+        _routing_tables[branch_id] = (version, time.monotonic(), table)
+        return table
+
+    @staticmethod
+    def compile(branch_id):
+        """
+        Build the routing table from the database: active station ids, a
+        category -> station map (explicit routes over name-based defaults)
+        and an item -> station override map.
+        """
+        stations = list(
+            KitchenStation.objects.filter(branch_id=branch_id, is_active=True)
+            .order_by('id').values_list('id', 'name')
+        )
+        categories = {}
+        items = {}
+        if stations:
+            for category_id, name in Category.objects.filter(restaurant__branches=branch_id).values_list('pk', 'name'):
+                station_id = StationRoutingService._default_station(name, stations)
+                if station_id is not None:
+                    categories[category_id] = station_id
+
+            routes = StationRoute.objects.filter(
+                branch_id=branch_id,
+                station__is_active=True
+            ).values_list('station_id', 'category_id', 'item_id')
+            for station_id, category_id, item_id in routes:
+                if item_id is not None:
+                    items[item_id] = station_id
+                else:
+                    categories[category_id] = station_id
+
+        return {
+            'stations': [station_id for station_id, _ in stations],
+            'categories': categories,
+            'items': items,
+        }
+
+    @staticmethod
+    def _default_station(category_name, stations):
+        category_name = category_name.lower()
+        for category_key, station_names in StationRoutingService.DEFAULT_CATEGORY_STATIONS.items():
+            if category_key in category_name:
+                for station_name in station_names:
+                    for station_id, name in stations:
+                        if station_name in name.lower():
+                            return station_id
+                return None
+        return None
+
+    @staticmethod
+    def lookup(table, item_id, category_id):
+        """Station id for an item, or None when neither it nor its category is routed"""
+        return table['items'].get(item_id) or table['categories'].get(category_id)
+
+    @staticmethod
+    def invalidate(branch_id):
+        key = StationRoutingService._version_key(branch_id)
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+    @staticmethod
+    def invalidate_restaurant(restaurant_id):
+        for branch_id in Branch.objects.filter(restaurant_id=restaurant_id).values_list('id', flat=True):
+            StationRoutingService.invalidate(branch_id)
@@ -1,87 +1,37 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from orders.models import Order, OrderItem
-from .models import KitchenOrder, KitchenOrderItem, KitchenStation
-from .services import KitchenAssignmentService
-from .utils import calculate_order_priority
 from django.db import transaction
+from django.db.models import Min
+from orders.models import Order, OrderItem
+from orders.signals import order_placed, order_items_added
+from items.models import Category
+from .models import KitchenEvent, KitchenOrder, KitchenOrderItem, KitchenStation, StationRoute
+from .services import KitchenProgressService, KitchenQueueService, KitchenStaffStatsService, KitchenStateService, KitchenTicketBuilder, StationRoutingService
 from django.utils import timezone
 
-@receiver(post_save, sender=Order)
-def create_kitchen_order(sender, instance, created, **kwargs):
+@receiver(order_placed)
+def create_kitchen_order(sender, order, items, **kwargs):
     """
-    Automatically create kitchen order when a regular order is created
+    Build the kitchen ticket once a regular order and its items have been
+    committed
     """
-    if created and instance.branch.kitchen_enabled:
-        with transaction.atomic():
-            # Calculate priority for the kitchen order
-            priority = calculate_order_priority(instance)
-            
-            # Create kitchen order
-            kitchen_order = KitchenOrder.objects.create(
-                order=instance,
-                status='pending',
-                priority=priority,
-                notes=f"Auto-created from order {instance.order_id}"
-            )
-            
-            # Create kitchen order items for each order item
-            for order_item in instance.items.all():
-                # Auto-assign to a station based on item category and station workload
-                station = _assign_item_to_station(order_item, instance.branch)
-                
-                KitchenOrderItem.objects.create(
-                    kitchen_order=kitchen_order,
-                    order_item=order_item,
-                    station=station,
-                    status='pending'
-                )
-            
-            # Auto-assign orders to stations if enabled
-            if instance.branch.kitchen_settings.get('auto_assign_stations', False):
-                KitchenAssignmentService.auto_assign_orders(instance.branch)
+    KitchenTicketBuilder.create_ticket(order, items)
 
-@receiver(post_save, sender=OrderItem)
-def create_kitchen_order_item(sender, instance, created, **kwargs):
+@receiver(order_items_added)
+def add_kitchen_order_items(sender, order, items, **kwargs):
     """
-    Create kitchen order item when a new order item is added to an existing order
+    Add kitchen order items once items added to an existing order have been
+    committed
     """
-    if created and instance.order.branch.kitchen_enabled:
-        try:
-            # Check if kitchen order already exists
-            kitchen_order, created_ko = KitchenOrder.objects.get_or_create(
-                order=instance.order,
-                defaults={
-                    'status': 'pending',
-                    'priority': calculate_order_priority(instance.order),
-                    'notes': f"Auto-created from order {instance.order.order_id}"
-                }
-            )
-            
-            # Create kitchen order item
-            station = _assign_item_to_station(instance, instance.order.branch)
-            
-            KitchenOrderItem.objects.create(
-                kitchen_order=kitchen_order,
-                order_item=instance,
-                station=station,
-                status='pending'
-            )
-            
-            # Auto-assign if enabled
-            if instance.order.branch.kitchen_settings.get('auto_assign_stations', False):
-                KitchenAssignmentService.auto_assign_orders(instance.order.branch)
-                
-        except Exception:
-            # Ignore errors during creation
-            pass
+    KitchenTicketBuilder.add_items(order, items)
 
 @receiver(post_save, sender=Order)
-def update_kitchen_order_status(sender, instance, **kwargs):
+def update_kitchen_order_status(sender, instance, created, **kwargs):
     """
     Update kitchen order status when regular order status changes
     """
-    if not instance.branch.kitchen_enabled:
+    # New orders get their kitchen order from ``order_placed`` after commit
+    if created or not instance.branch.kitchen_enabled:
         return
     
     try:
@@ -101,21 +51,18 @@ def update_kitchen_order_status(sender, instance, **kwargs):
             kitchen_order.status = new_status
             
             # Update timestamps
-            if new_status == 'preparing' and old_status == 'pending':
-                kitchen_order.started_at = timezone.now()
-            elif new_status == 'completed' and old_status in ['pending', 'preparing']:
+            if new_status == 'completed' and old_status in ['pending', 'preparing']:
                 kitchen_order.completed_at = timezone.now()
-                if kitchen_order.started_at:
-                    kitchen_order.preparation_time = kitchen_order.completed_at - kitchen_order.started_at
+                started_at = kitchen_order.items.aggregate(started_at=Min('started_at'))['started_at']
+                if started_at:
+                    kitchen_order.preparation_time = kitchen_order.completed_at - started_at
             
             kitchen_order.save()
             
             # Update kitchen order items status
             if new_status == 'completed':
-                kitchen_order.items.update(
-                    status='completed',
-                    completed_at=timezone.now()
-                )
+                completed = KitchenStaffStatsService.complete_items(kitchen_order.items.all())
+                KitchenProgressService.items_completed(instance.order_id, completed)
             elif new_status == 'cancelled':
                 kitchen_order.items.update(status='cancelled')
             elif new_status == 'preparing':
@@ -146,15 +93,28 @@ def update_kitchen_order_item(sender, instance, created, **kwargs):
             # Update the kitchen order item if needed
             if kitchen_order_item.status == 'pending':
                 # Reassign to appropriate station if item category changed
-                new_station = _assign_item_to_station(instance, instance.order.branch)
-                if new_station and new_station != kitchen_order_item.station:
-                    kitchen_order_item.station = new_station
+                new_station_id = KitchenTicketBuilder.route(instance.order.branch, [instance])[0]
+                if new_station_id and new_station_id != kitchen_order_item.station_id:
+                    kitchen_order_item.station_id = new_station_id
                     kitchen_order_item.save()
                     
         except KitchenOrderItem.DoesNotExist:
             # Kitchen order item doesn't exist, ignore
             pass
 
+@receiver(pre_delete, sender=OrderItem)
+def release_kitchen_progress(sender, instance, **kwargs):
+    """
+    Take an order item's kitchen items out of the order's progress while
+    they still exist; they are cascade-deleted before post_delete runs
+    """
+    statuses = list(KitchenOrderItem.objects.filter(order_item=instance).values_list('status', flat=True))
+    KitchenProgressService.items_removed(
+        instance.order_id,
+        len(statuses),
+        completed=statuses.count('completed')
+    )
+
 @receiver(post_delete, sender=OrderItem)
 def remove_kitchen_order_item(sender, instance, **kwargs):
     """
@@ -163,9 +123,7 @@ def remove_kitchen_order_item(sender, instance, **kwargs):
     if instance.order.branch.kitchen_enabled:
         try:
             # Find and delete the corresponding kitchen order item
-            KitchenOrderItem.objects.filter(
-                order_item=instance
-            ).delete()
+            KitchenOrderItem.objects.filter(order_item=instance).delete()
             
             # Check if kitchen order has no more items
             kitchen_order = KitchenOrder.objects.filter(
@@ -192,93 +150,69 @@ def remove_kitchen_order(sender, instance, **kwargs):
             # Ignore errors during cleanup
             pass
 
-def _assign_item_to_station(order_item, branch):
+@receiver([post_save, post_delete], sender=StationRoute)
+@receiver([post_save, post_delete], sender=KitchenStation)
+def invalidate_station_routing(sender, instance, **kwargs):
     """
-    Intelligently assign an order item to a kitchen station based on:
-    1. Item category
-    2. Station workload
-    3. Station specialization
+    Recompile the branch's routing table when its routes or stations change.
+    Bumped after commit so no worker recompiles from uncommitted rows.
     """
-    try:
-        # Get available stations for this branch
-        available_stations = KitchenStation.objects.filter(
-            branch=branch,
-            is_active=True
-        )
-        
-        if not available_stations.exists():
-            return None
-        
-        # Try to find a station based on item category
-        if order_item.item.category:
-            category_name = order_item.item.category.name.lower()
-            
-            # Map categories to preferred stations
-            category_station_mapping = {
-                'dessert': ['dessert', 'bakery', 'pastry'],
-                'salad': ['salad', 'cold kitchen', 'prep'],
-                'grill': ['grill', 'bbq', 'hot kitchen'],
-                'pizza': ['pizza', 'oven', 'hot kitchen'],
-                'sushi': ['sushi', 'cold kitchen', 'prep'],
-                'drinks': ['bar', 'beverage', 'drinks'],
-                'appetizer': ['appetizer', 'prep', 'cold kitchen'],
-                'main course': ['main kitchen', 'hot kitchen', 'grill'],
-                'side dish': ['prep', 'cold kitchen', 'main kitchen']
-            }
-            
-            # Find preferred stations for this category
-            preferred_stations = []
-            for category_key, station_names in category_station_mapping.items():
-                if category_key in category_name:
-                    preferred_stations = station_names
-                    break
-            
-            # Try to assign to preferred stations first
-            if preferred_stations:
-                for station_name in preferred_stations:
-                    station = available_stations.filter(
-                        name__icontains=station_name
-                    ).first()
-                    if station:
-                        return station
-        
-        # If no category-based assignment, use workload-based assignment
-        return _assign_by_workload(available_stations)
-        
-    except Exception:
-        # Fallback: return first available station
-        return available_stations.first() if available_stations.exists() else None
+    branch_id = instance.branch_id
+    transaction.on_commit(lambda: StationRoutingService.invalidate(branch_id))
 
-def _assign_by_workload(stations):
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_routing(sender, instance, **kwargs):
     """
-    Assign to station with lowest workload
+    Category names feed the default routes of every branch of the restaurant
     """
-    try:
-        from .services import KitchenAssignmentService
-        
-        # Get workload for all stations
-        workload_data = {}
-        for station in stations:
-            pending_count = KitchenOrderItem.objects.filter(
-                station=station,
-                status='pending'
-            ).count()
-            
-            preparing_count = KitchenOrderItem.objects.filter(
-                station=station,
-                status='preparing'
-            ).count()
-            
-            workload_data[station] = pending_count + preparing_count
-        
-        # Find station with lowest workload
-        if workload_data:
-            min_workload_station = min(workload_data.items(), key=lambda x: x[1])[0]
-            return min_workload_station
-        
-        # If no workload data, return first station
-        return stations.first()
-        
-    except Exception:
-        # Fallback: return first station
-        return stations.first() if stations.exists() else None
+    restaurant_id = instance.restaurant_id
+    transaction.on_commit(lambda: StationRoutingService.invalidate_restaurant(restaurant_id))
+
+@receiver(post_save, sender=KitchenOrder)
+def reprioritize_kitchen_order_items(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keep the items' queue position in step with the ticket's base priority
+    """
+    if created or (update_fields is not None and 'priority' not in update_fields):
+        return
+    KitchenQueueService.reprioritize(instance)
+
+@receiver(post_save, sender=KitchenOrder)
+@receiver(post_save, sender=KitchenOrderItem)
+def touch_kitchen_state(sender, instance, created, **kwargs):
+    """
+    Bump the branch's kitchen state version after commit so polling
+    displays see the change, logged as a kitchen event of the matching kind
+    """
+    if sender is KitchenOrder:
+        if created:
+            kind = KitchenEvent.Kind.TICKET_CREATED
+        elif instance.status == 'cancelled':
+            kind = KitchenEvent.Kind.TICKET_CANCELLED
+        else:
+            kind = KitchenEvent.Kind.TICKET_UPDATED
+        KitchenStateService.touch(instance.id, kind=kind)
+        return
+
+    if created:
+        kind = KitchenEvent.Kind.ITEMS_ADDED
+    elif instance.status == 'preparing':
+        kind = KitchenEvent.Kind.ITEM_STARTED
+    elif instance.status == 'completed':
+        kind = KitchenEvent.Kind.ITEM_COMPLETED
+    else:
+        kind = KitchenEvent.Kind.TICKET_UPDATED
+    KitchenStateService.touch(instance.kitchen_order_id, kind=kind)
+
+@receiver(post_delete, sender=KitchenOrderItem)
+def touch_kitchen_state_on_item_delete(sender, instance, **kwargs):
+    KitchenStateService.touch(instance.kitchen_order_id)
+
+@receiver(post_delete, sender=KitchenOrder)
+def remove_kitchen_state(sender, instance, **kwargs):
+    """
+    Log deleted tickets so displays and projections drop them
+    """
+    branch_id = Order.objects.filter(order_id=instance.order_id).values_list('branch_id', flat=True).first()
+    if branch_id is not None:
+        KitchenStateService.touch_removed(branch_id, instance.id)
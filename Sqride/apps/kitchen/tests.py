@@ -1,10 +1,36 @@
-from django.test import TestCase
+import json
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from channels.db import database_sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.db.models import Count, F
+from django.urls import reverse
 from django.utils import timezone
+from rest_framework.test import APIClient
 from restaurants.models import Restaurant, Branch, Currency
+from restaurants.testing import RestaurantTestMixin
 from accounts.models import Owner, SuperAdmin, UserRole, User
-from .models import KitchenStation, KitchenOrder, KitchenOrderItem, KitchenDisplay, KitchenStaff
-from .services import KitchenSystemService, KitchenAssignmentService
+from .models import (
+    KitchenStation, StationRoute, KitchenOrder, KitchenOrderItem, KitchenDisplay, KitchenStaff, KitchenAnalytics,
+    KitchenStaffStats, KitchenNotification, ItemPrepStats, KitchenEvent
+)
+from .services import (
+    KitchenSystemService, KitchenAssignmentService, KitchenNotificationService, KitchenTicketBuilder,
+    StationRoutingService, KitchenWorkloadService, KitchenQueueService, KitchenStateService,
+    KitchenAnalyticsService, KitchenStaffStatsService, KitchenUpdateBuffer, KitchenETAService, _eta_tables
+)
+from .projection import KitchenProjectionService, _projections
 from orders.models import Order, OrderItem
+from orders.services import OrderService
+from accounts.views.user_views import get_tokens_for_user
+from Sqride.asgi import application
 from items.models import Item, Category
 from customers.models import Customer
 
@@ -297,3 +323,1037 @@ class KitchenSystemTestCase(TestCase):
         
         self.assertGreater(stations_count, 0)
         self.assertGreater(staff_count, 0)
+
+
+class KitchenTestMixin(RestaurantTestMixin):
+    """
+    A kitchen-enabled branch with grill and prep stations, a cashier and a
+    kitchen display role; every test starts with self.client authenticated
+    as the kitchen display. Test cases use it with
+    KITCHEN_STATE_CACHE_SECONDS=60 so cached kitchen state versions last the
+    whole test and query counts do not depend on how fast it runs.
+    """
+    BRANCH_FIELDS = {'kitchen_enabled': True}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        grill = Category.objects.create(restaurant=cls.restaurant, name='Grill')
+        misc = Category.objects.create(restaurant=cls.restaurant, name='Misc')
+        cls.steak = Item.objects.create(branch=cls.branch, category=grill, name='Steak', cost=8, price=20)
+        cls.soup = Item.objects.create(branch=cls.branch, category=misc, name='Soup', cost=2, price=6)
+        cls.grill_station = KitchenStation.objects.create(name='Grill', branch=cls.branch)
+        cls.prep_a = KitchenStation.objects.create(name='Prep A', branch=cls.branch)
+        cls.prep_b = KitchenStation.objects.create(name='Prep B', branch=cls.branch)
+        cls.role = UserRole.objects.create(name='Cashier', branch=cls.branch, order=True)
+        cls.user = User.objects.create_user(
+            branch=cls.branch,
+            role=cls.role,
+            username='cashier',
+            name='Cashier',
+            email='cashier@test.com',
+            password='testpass123'
+        )
+        cls.kitchen_role = UserRole.objects.create(name='Kitchen', branch=cls.branch, kitchen_display=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user, token={'role_id': self.kitchen_role.id})
+        # Compiled tables and cached versions outlive the rolled-back test transaction
+        StationRoutingService.invalidate(self.branch.id)
+        cache.delete(KitchenStateService._cache_key(self.branch.id))
+        _eta_tables.clear()
+        _projections.clear()
+
+    def place_order(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return OrderService.create_order(self.branch, items)
+
+
+@override_settings(KITCHEN_STATE_CACHE_SECONDS=60)
+class KitchenRoutingTestCase(KitchenTestMixin, TestCase):
+    def test_ticket_routed_in_memory(self):
+        """Ticket items are routed by category, then spread by load, in a fixed number of queries"""
+        items = [{'item': self.steak.item_id, 'quantity': 1}] * 2 + [{'item': self.soup.item_id, 'quantity': 1}] * 4
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            order = OrderService.create_order(self.branch, items)
+        StationRoutingService.get_table(self.branch.id)
+        KitchenETAService.get_table(self.branch.id)
+
+        # workload and staff for unrouted items; savepoint, ticket insert,
+        # items bulk insert, progress update, release (the ETA comes from
+        # the snapshot)
+        with self.assertNumQueries(7):
+            callbacks[0]()
+
+        stations = list(
+            KitchenOrderItem.objects.filter(kitchen_order__order=order)
+            .order_by('order_item_id').values_list('station__name', flat=True)
+        )
+        self.assertEqual(stations[:2], ['Grill', 'Grill'])
+        self.assertEqual(stations[2:], ['Prep A', 'Prep B', 'Prep A', 'Prep B'])
+
+    def test_overflow_routing_by_clear_time(self):
+        """Unrouted items go to the station that clears soonest, not the one with the fewest items"""
+        order = self.place_order([{'item': self.soup.item_id, 'quantity': 1}] * 14)
+        items = list(KitchenOrderItem.objects.filter(kitchen_order__order=order).values_list('id', flat=True))
+        KitchenOrderItem.objects.filter(id__in=items[:3]).update(station=self.grill_station)
+        KitchenOrderItem.objects.filter(id__in=items[3:8]).update(station=self.prep_a)
+        KitchenOrderItem.objects.filter(id__in=items[8:]).update(station=self.prep_b)
+        KitchenStaff.objects.create(user=self.user, station=self.prep_a)
+        for index in range(4):
+            cook = User.objects.create_user(
+                branch=self.branch,
+                role=self.role,
+                username=f'cook{index}',
+                name='Cook',
+                email=f'cook{index}@test.com',
+                password='testpass123'
+            )
+            KitchenStaff.objects.create(user=cook, station=self.prep_b)
+
+        # 1 cook with 5 items against 4 cooks with 6: active items and available cooks
+        with self.assertNumQueries(2):
+            routed = KitchenTicketBuilder.route(self.branch, [OrderItem(item=self.soup)] * 4)
+        self.assertEqual(routed, [self.prep_b.id] * 4)
+
+    def test_added_items_reach_kitchen(self):
+        """Items added to an existing order are appended to its ticket after commit"""
+        order = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        self.client.force_authenticate(user=self.user, token={'role_id': self.role.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('order-add-item', args=[order.order_id]),
+                {'item': self.soup.item_id, 'quantity': 2},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 201)
+        kitchen_order = KitchenOrder.objects.get(order=order)
+        self.assertEqual(kitchen_order.items.count(), 2)
+        order.refresh_from_db()
+        self.assertEqual(order.kitchen_items_total, 2)
+
+    def test_routing_table_lookup(self):
+        """Routing is a lookup in the compiled table, recompiled when routes change"""
+        with self.captureOnCommitCallbacks(execute=True):
+            StationRoute.objects.create(branch=self.branch, category=self.soup.category, station=self.prep_a)
+            StationRoute.objects.create(branch=self.branch, item=self.steak, station=self.prep_b)
+        order_items = [OrderItem(item=self.steak), OrderItem(item=self.soup)]
+        StationRoutingService.get_table(self.branch.id)
+
+        with self.assertNumQueries(0):
+            routed = KitchenTicketBuilder.route(self.branch, order_items)
+        self.assertEqual(routed, [self.prep_b.id, self.prep_a.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StationRoute.objects.filter(item=self.steak).delete()
+        self.assertEqual(KitchenTicketBuilder.route(self.branch, order_items), [self.grill_station.id, self.prep_a.id])
+
+    @override_settings(KITCHEN_ROUTING_MAX_AGE_SECONDS=0.1)
+    def test_routing_table_max_age(self):
+        """Route changes this worker was not told about are picked up once its table is too old"""
+        route = StationRoute.objects.create(branch=self.branch, item=self.steak, station=self.prep_b)
+        order_items = [OrderItem(item=self.steak)]
+        self.assertEqual(KitchenTicketBuilder.route(self.branch, order_items), [self.prep_b.id])
+
+        # Changed through another worker, whose invalidation this worker's cache missed
+        StationRoute.objects.filter(id=route.id).update(station=self.prep_a)
+        self.assertEqual(KitchenTicketBuilder.route(self.branch, order_items), [self.prep_b.id])
+        time.sleep(0.2)
+        self.assertEqual(KitchenTicketBuilder.route(self.branch, order_items), [self.prep_a.id])
+
+    def test_workload_single_query(self):
+        """Workload for all stations comes from one grouped query"""
+        order = self.place_order([{'item': self.soup.item_id, 'quantity': 1}] * 3)
+        KitchenOrderItem.objects.filter(kitchen_order__order=order, station=self.prep_a).update(status='preparing')
+        KitchenStaff.objects.create(user=self.user, station=self.prep_a)
+
+        with self.assertNumQueries(1):
+            counts = KitchenWorkloadService.counts([self.grill_station.id, self.prep_a.id, self.prep_b.id])
+        self.assertEqual(counts[self.grill_station.id], {'pending': 1, 'preparing': 0, 'total': 1})
+        self.assertEqual(counts[self.prep_a.id], {'pending': 0, 'preparing': 1, 'total': 1})
+
+        # stations, item counts, staff counts
+        with self.assertNumQueries(3):
+            rows = KitchenWorkloadService.for_branch(self.branch, include_staff=True)
+        prep_a = next(row for row in rows if row['station_id'] == self.prep_a.id)
+        self.assertEqual((prep_a['staff_count'], prep_a['available_staff']), (1, 1))
+
+    def test_auto_assign_batch_matching(self):
+        """Free staff take the highest priority, oldest items at their station in bulk"""
+        cooks = [
+            User.objects.create_user(
+                branch=self.branch,
+                role=self.role,
+                username=f'cook{i}',
+                name=f'Cook {i}',
+                email=f'cook{i}@test.com',
+                password='testpass123'
+            )
+            for i in range(3)
+        ]
+        grill_cook = KitchenStaff.objects.create(user=cooks[0], station=self.grill_station)
+        KitchenStaff.objects.create(user=cooks[1], station=self.prep_a)
+        KitchenStaff.objects.create(user=cooks[2], station=self.prep_a, is_available=False)
+
+        takeaway = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        KitchenOrder.objects.filter(order=takeaway).update(priority=5)
+        dining = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+
+        # savepoint, free staff, pending items, staff update, items update, release
+        with self.assertNumQueries(6):
+            assigned = KitchenAssignmentService.auto_assign_orders(self.branch)
+
+        self.assertEqual(assigned, 1)
+        grill_cook.refresh_from_db()
+        self.assertFalse(grill_cook.is_available)
+        self.assertEqual(grill_cook.current_order, KitchenOrder.objects.get(order=dining))
+        self.assertEqual(
+            KitchenOrderItem.objects.get(kitchen_order__order=dining).status, 'preparing'
+        )
+        self.assertEqual(
+            KitchenOrderItem.objects.get(kitchen_order__order=takeaway).status, 'pending'
+        )
+
+        # Completing an auto-assigned item credits the cook it went to
+        item = KitchenOrderItem.objects.filter(kitchen_order__order=dining)
+        self.assertEqual(item.get().prepared_by, cooks[0])
+        KitchenStaffStatsService.complete_items(item)
+        self.assertEqual(KitchenStaffStats.objects.get(user=cooks[0]).completed_items, 1)
+
+    def test_station_queue_ages_items(self):
+        """Long-waiting tickets overtake newer higher-priority ones, served in one query"""
+        old = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        new = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        old_ticket = KitchenOrder.objects.get(order=old)
+        old_ticket.priority = 5
+        old_ticket.save()
+
+        url = reverse('kitchen-station-queue', args=[self.grill_station.id])
+
+        # role, station, queue
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual([row['order_id'] for row in response.data], [new.order_id, old.order_id])
+        self.assertEqual([row['order_number'] for row in response.data], [new.display_number, old.display_number])
+
+        # Waiting three aging intervals outweighs the two-point priority gap
+        KitchenOrderItem.objects.filter(kitchen_order=old_ticket).update(
+            created_at=F('created_at') - KitchenQueueService.aging_interval() * 3
+        )
+        old_ticket.save()
+        response = self.client.get(url)
+        self.assertEqual([row['order_id'] for row in response.data], [old.order_id, new.order_id])
+        self.assertGreater(response.data[0]['score'], response.data[1]['score'])
+
+
+
+@override_settings(KITCHEN_STATE_CACHE_SECONDS=60)
+class KitchenETATestCase(KitchenTestMixin, TestCase):
+    def test_prep_stats_moving_average(self):
+        """Prep times fold into a per (item, station) moving average and histogram, batch by batch"""
+        now = timezone.now()
+        first = [120, 240]
+        second = [600]
+        for batch in (first, second):
+            KitchenETAService.record([
+                (self.branch.id, self.steak.item_id, self.grill_station.id, now - timedelta(seconds=seconds), now)
+                for seconds in batch
+            ])
+
+        stats = ItemPrepStats.objects.get(item=self.steak, station=self.grill_station)
+        self.assertEqual(stats.samples, 3)
+        self.assertAlmostEqual(stats.ewma_seconds, ItemPrepStats.moving_average(first + second))
+        self.assertAlmostEqual(stats.ewma_seconds, 120 + 0.2 * 120 + 0.2 * (600 - 144))
+        self.assertEqual(stats.preparation_time_percentile(100), timedelta(seconds=600))
+
+    def test_ticket_eta_from_stats(self):
+        """New tickets get an ETA from item prep times and the station's queue"""
+        now = timezone.now()
+        KitchenETAService.record([
+            (self.branch.id, self.steak.item_id, self.grill_station.id, now - timedelta(minutes=10), now)
+        ])
+
+        order = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        ticket = KitchenOrder.objects.get(order=order)
+        self.assertAlmostEqual(
+            (ticket.estimated_completion_time - ticket.created_at).total_seconds(), 600, delta=5
+        )
+
+        # The first steak is now queued at the grill ahead of the second one
+        order = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        ticket = KitchenOrder.objects.get(order=order)
+        self.assertAlmostEqual(
+            (ticket.estimated_completion_time - ticket.created_at).total_seconds(), 1200, delta=5
+        )
+
+
+
+@override_settings(KITCHEN_STATE_CACHE_SECONDS=60)
+class KitchenProjectionTestCase(KitchenTestMixin, TestCase):
+    def test_station_all_day_counts(self):
+        """All-day counts sum open items per item and notes, served from the projection"""
+        self.place_order([{'item': self.steak.item_id, 'quantity': 2}, {'item': self.soup.item_id, 'quantity': 1}])
+        second = self.place_order([{'item': self.steak.item_id, 'quantity': 3}])
+        rare = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        done = self.place_order([{'item': self.steak.item_id, 'quantity': 4}])
+        with self.captureOnCommitCallbacks(execute=True):
+            item = KitchenOrderItem.objects.get(kitchen_order__order=second)
+            item.status = 'preparing'
+            item.save()
+            item = KitchenOrderItem.objects.get(kitchen_order__order=rare)
+            item.notes = 'rare'
+            item.save()
+            item = KitchenOrderItem.objects.get(kitchen_order__order=done)
+            item.status = 'completed'
+            item.save()
+
+        url = reverse('kitchen-station-all-day', args=[self.grill_station.id])
+        response = self.client.get(url)
+        self.assertEqual(
+            [(row['name'], row['notes'], row['quantity'], row['pending'], row['preparing']) for row in response.data['items']],
+            [('Steak', '', 5, 2, 3), ('Steak', 'rare', 1, 1, 0)]
+        )
+        self.assertEqual(response.data['items'][0]['item_id'], self.steak.item_id)
+
+        # role, station; the warm projection is already current
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        # role only
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_real_time_data_conditional_polling(self):
+        """Unchanged displays get a 304 without ORM work; deltas carry only changed tickets"""
+        first = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        display = KitchenDisplay.objects.create(name='Pass', branch=self.branch)
+        display.stations.add(self.grill_station)
+
+        url = reverse('kitchen-display-real-time-data', args=[display.id])
+
+        response = self.client.get(url)
+        etag, version = response['ETag'], response.data['version']
+        self.assertEqual(len(response.data['active_orders']), 2)
+
+        # role only
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        ticket = KitchenOrder.objects.get(order=first)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.status = 'completed'
+            ticket.save()
+
+        response = self.client.get(url, {'since_version': version}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.data['version'], version)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertFalse(response.data['full'])
+        self.assertEqual([row['id'] for row in response.data['active_orders']], [ticket.id])
+        self.assertEqual(response.data['active_orders'][0]['status'], 'completed')
+
+    def test_display_tickets_compact(self):
+        """Display tickets are flat and served from the projection however many tickets are active"""
+        for _ in range(3):
+            self.place_order([{'item': self.steak.item_id, 'quantity': 2}, {'item': self.soup.item_id, 'quantity': 1}])
+        display = KitchenDisplay.objects.create(name='Grill', branch=self.branch)
+        display.stations.add(self.grill_station)
+
+        url = reverse('kitchen-display-active-orders', args=[display.id])
+        self.client.get(url)
+
+        # role, display, stations; the warm projection is already current
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+
+        self.assertEqual([ticket['order_number'] for ticket in response.data], ['#001', '#002', '#003'])
+        ticket = response.data[0]
+        self.assertEqual(ticket['order_type'], 'dining')
+        self.assertEqual(
+            [(item['name'], item['quantity']) for item in ticket['items']],
+            [('Steak', 2), ('Soup', 1)]
+        )
+        self.assertEqual(ticket['items'][0]['station_id'], self.grill_station.id)
+
+    def test_station_orders_from_projection(self):
+        """A station's open items are served from the projection with their ticket's order details"""
+        first = self.place_order([{'item': self.steak.item_id, 'quantity': 2}, {'item': self.soup.item_id, 'quantity': 1}])
+        second = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        with self.captureOnCommitCallbacks(execute=True):
+            item = KitchenOrderItem.objects.get(kitchen_order__order=second)
+            item.status = 'completed'
+            item.save()
+        url = reverse('kitchen-station-orders', args=[self.grill_station.id])
+        self.client.get(url)
+
+        # role, station; the warm projection is already current
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEqual(
+            [(row['order_id'], row['order_number'], row['name'], row['quantity'], row['status']) for row in response.data],
+            [(first.order_id, '#001', 'Steak', 2, 'pending')]
+        )
+
+    def test_state_changes_logged_as_events(self):
+        """Each kitchen state version logs one event carrying the changed tickets"""
+        order = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        ticket = KitchenOrder.objects.get(order=order)
+        item = ticket.items.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.status = 'preparing'
+            item.started_at = timezone.now()
+            item.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.status = 'cancelled'
+            ticket.save()
+
+        self.branch.refresh_from_db()
+        events = list(KitchenEvent.objects.filter(branch=self.branch).order_by('sequence'))
+        self.assertEqual(
+            [event.sequence for event in events], list(range(1, self.branch.kitchen_state_version + 1))
+        )
+        self.assertEqual(
+            [event.kind for event in events],
+            [KitchenEvent.Kind.TICKET_CREATED, KitchenEvent.Kind.ITEM_STARTED, KitchenEvent.Kind.TICKET_CANCELLED]
+        )
+        self.assertEqual([data['id'] for data in events[1].tickets], [ticket.id])
+        self.assertEqual(events[1].tickets[0]['items'][0]['status'], 'preparing')
+        self.assertEqual(events[2].tickets[0]['status'], 'cancelled')
+
+        ticket_id = ticket.id
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        self.assertEqual(KitchenEvent.objects.filter(branch=self.branch).latest('sequence').removed, [ticket_id])
+
+    @override_settings(KITCHEN_STATE_CACHE_SECONDS=0.05)
+    def test_state_version_cache_expires(self):
+        """A cached version that missed another worker's bump is re-read from the branch once it expires"""
+        self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        version = KitchenStateService.current_version(self.branch.id)
+
+        # Bumped by another worker, whose cache this worker does not share
+        Branch.objects.filter(id=self.branch.id).update(kitchen_state_version=F('kitchen_state_version') + 1)
+        self.assertEqual(KitchenStateService.current_version(self.branch.id), version)
+        time.sleep(0.1)
+        self.assertEqual(KitchenStateService.current_version(self.branch.id), version + 1)
+
+    def test_stale_branch_save_keeps_state_version(self):
+        """Saving a branch loaded before a kitchen write neither rewinds its version nor breaks later bumps"""
+        stale = Branch.objects.get(id=self.branch.id)
+        self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        stale.name = 'Renamed Branch'
+        stale.save()
+        self.place_order([{'item': self.soup.item_id, 'quantity': 1}])
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.name, 'Renamed Branch')
+        self.assertEqual(stale.kitchen_state_version, 2)
+        self.assertEqual(
+            list(KitchenEvent.objects.filter(branch=self.branch).values_list('sequence', flat=True)), [1, 2]
+        )
+
+    @override_settings(KITCHEN_STATE_CACHE_SECONDS=0.2)
+    def test_all_day_sees_other_workers_writes(self):
+        """A projection behind another worker's write catches up once the cached version expires"""
+        self.place_order([{'item': self.steak.item_id, 'quantity': 2}])
+        url = reverse('kitchen-station-all-day', args=[self.grill_station.id])
+        response = self.client.get(url)
+        etag, version = response['ETag'], response.data['version']
+
+        # Written through another worker, whose bump this worker's cache missed
+        self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        cache.set(KitchenStateService._cache_key(self.branch.id), version, 0.2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        time.sleep(0.3)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.data['version'], version)
+        self.assertEqual(response.data['items'][0]['quantity'], 3)
+
+    def test_projection_follows_event_log(self):
+        """A warm projection folds in new events with one query and rebuilds when they are gone"""
+        first = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        second = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        stations = [self.grill_station.id]
+        tickets, full, _ = KitchenProjectionService.tickets(self.branch.id, stations)
+        self.assertTrue(full)
+        self.assertEqual([row['order_id'] for row in tickets], [first.order_id, second.order_id])
+
+        ticket = KitchenOrder.objects.get(order=first)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.status = 'completed'
+            ticket.save()
+
+        # event tail (the version comes from the cache)
+        with self.assertNumQueries(1):
+            tickets, _, _ = KitchenProjectionService.tickets(self.branch.id, stations)
+        self.assertEqual([row['order_id'] for row in tickets], [second.order_id])
+        self.assertEqual(KitchenProjectionService.workload(self.branch.id, stations)[self.grill_station.id]['pending'], 1)
+
+        # Purged events cannot be followed, so the next read rebuilds
+        third = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        self.assertGreater(KitchenStateService.purge_events(timezone.now() + timedelta(minutes=1)), 0)
+        tickets, full, _ = KitchenProjectionService.tickets(self.branch.id, stations)
+        self.assertTrue(full)
+        self.assertEqual([row['order_id'] for row in tickets], [second.order_id, third.order_id])
+
+
+
+@override_settings(KITCHEN_STATE_CACHE_SECONDS=60)
+class KitchenSLATestCase(KitchenTestMixin, TestCase):
+    def test_analytics_accumulate_per_station(self):
+        """Completed tickets fold into per-station daily accumulators with one UPDATE per station"""
+        prep_times = [(90, 200), (150, 700)]
+        for grill_seconds, prep_seconds in prep_times:
+            order = self.place_order([{'item': self.steak.item_id, 'quantity': 1}, {'item': self.soup.item_id, 'quantity': 1}])
+            ticket = KitchenOrder.objects.get(order=order)
+            now = timezone.now()
+            for item in ticket.items.select_related('station'):
+                seconds = grill_seconds if item.station == self.grill_station else prep_seconds
+                item.started_at = now - timedelta(seconds=seconds)
+                item.completed_at = now
+                item.save()
+
+            # items, savepoint, missing rows, one update per station, release
+            with self.assertNumQueries(6):
+                KitchenAnalyticsService.record_completed(ticket)
+
+        grill = KitchenAnalytics.objects.get(station=self.grill_station)
+        self.assertEqual(grill.total_orders, 2)
+        self.assertEqual(grill.average_preparation_time, timedelta(seconds=120))
+        self.assertEqual(grill.preparation_time_stddev, timedelta(seconds=30))
+        self.assertEqual(grill.prep_histogram[KitchenAnalytics.bucket_for(90)], 1)
+        self.assertEqual(grill.prep_histogram[KitchenAnalytics.bucket_for(150)], 1)
+        self.assertEqual(grill.peak_hours[timezone.localtime().hour], 2)
+        self.assertEqual(grill.peak_hour, timezone.localtime().hour)
+        self.assertEqual(grill.sla_breaches, 0)
+
+        summary = KitchenAnalyticsService.summary(KitchenAnalytics.objects.filter(station__branch=self.branch))
+        self.assertEqual(summary['total_orders'], 4)
+        self.assertEqual(summary['sla_breaches'], 0)
+        self.assertEqual(summary['p50'], timedelta(seconds=180))
+
+    def test_analytics_breaches_follow_sla_setting(self):
+        """An item counts as an SLA breach when it took longer than KITCHEN_SLA_MINUTES"""
+        # An 18 minute item is within the default 20 minute SLA, not a tighter one
+        for sla_minutes in (20, 15):
+            order = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+            ticket = KitchenOrder.objects.get(order=order)
+            now = timezone.now()
+            ticket.items.update(started_at=now - timedelta(minutes=18), completed_at=now)
+            with override_settings(KITCHEN_SLA_MINUTES=sla_minutes):
+                KitchenAnalyticsService.record_completed(ticket)
+        self.assertEqual(KitchenAnalytics.objects.get(station=self.grill_station).sla_breaches, 1)
+
+    def test_sla_scan_flags_each_ticket_once(self):
+        """Overdue tickets are flagged once and alerted in one message per branch, however often the scan runs"""
+        orders = [self.place_order([{'item': self.soup.item_id, 'quantity': 1}]) for _ in range(4)]
+        KitchenOrder.objects.filter(order__in=orders[:3]).update(
+            sla_breach_time=timezone.now() - timedelta(minutes=5)
+        )
+
+        with mock.patch.object(KitchenNotificationService, 'notify_sla_breaches') as notify:
+            call_command('scan_sla_breaches', batch_size=2, stdout=StringIO())
+            call_command('scan_sla_breaches', batch_size=2, stdout=StringIO())
+
+        notify.assert_called_once()
+        branch_id, breached = notify.call_args.args
+        self.assertEqual(branch_id, self.branch.id)
+        self.assertEqual(sorted(row['order_id'] for row in breached), [order.order_id for order in orders[:3]])
+        self.assertEqual(breached[0]['delay_minutes'], 5)
+        self.assertEqual(KitchenOrder.objects.filter(sla_breached_at__isnull=False).count(), 3)
+
+    def test_kitchen_timing_settings_read_at_call_time(self):
+        """Overridden timing settings apply without reloading the services"""
+        with override_settings(KITCHEN_SLA_MINUTES=45, KITCHEN_PRIORITY_AGING_MINUTES=2,
+                               KITCHEN_ETA_REFRESH_SECONDS=5):
+            order = self.place_order([{'item': self.soup.item_id, 'quantity': 1}])
+            self.assertEqual(KitchenQueueService.aging_interval(), timedelta(minutes=2))
+            self.assertEqual(KitchenETAService.refresh_seconds(), 5)
+        ticket = KitchenOrder.objects.get(order=order)
+        self.assertAlmostEqual(
+            (ticket.sla_breach_time - ticket.created_at).total_seconds(), 45 * 60, delta=5
+        )
+
+
+
+@override_settings(KITCHEN_STATE_CACHE_SECONDS=60)
+class KitchenStaffStatsTestCase(KitchenTestMixin, TestCase):
+    def test_staff_stats_over_date_ranges(self):
+        """Cooks are credited as items complete and any date range reads two rows"""
+        order = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        item = KitchenOrderItem.objects.get(kitchen_order__order=order)
+        self.client.post(reverse('kitchen-item-start', args=[item.id]))
+        self.client.post(reverse('kitchen-item-complete', args=[item.id]))
+        self.assertEqual(KitchenStaffStats.objects.get(user=self.user).completed_items, 1)
+        self.assertEqual(ItemPrepStats.objects.get(item=self.steak, station=self.grill_station).samples, 1)
+
+        now = timezone.now()
+        earlier = now - timedelta(days=2)
+        KitchenStaffStatsService.record([
+            (self.user.id, earlier - timedelta(seconds=90), earlier),
+            (self.user.id, now - timedelta(seconds=150), now),
+            (self.user.id, now - timedelta(seconds=250), now),
+        ])
+        # The earlier day slots in below today's running totals
+        self.assertEqual(
+            list(KitchenStaffStats.objects.filter(user=self.user).order_by('date').values_list('completed_items', flat=True)),
+            [1, 4]
+        )
+
+        staff = KitchenStaff.objects.create(user=self.user, station=self.grill_station)
+        url = reverse('kitchen-staff-performance', args=[staff.id])
+        # staff, stats up to the end, stats before the start
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'start': timezone.localdate().isoformat()})
+        self.assertEqual(response.data['completed_items'], 3)
+        self.assertEqual(response.data['p50'], timedelta(seconds=150))
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['completed_items'], 4)
+        self.assertEqual(response.data['throughput_per_day'], round(4 / 30, 2))
+        self.assertEqual(self.client.get(url, {'start': 'yesterday'}).status_code, 400)
+
+
+
+@override_settings(KITCHEN_STATE_CACHE_SECONDS=60)
+class KitchenNotificationTestCase(KitchenTestMixin, TestCase):
+    def test_notifications_coalesce_and_acknowledge_in_bulk(self):
+        """Unread notifications coalesce per order, are read in one update and purged in batches"""
+        for order_id, status in [(1, 'pending'), (1, 'preparing'), (2, 'pending'), (3, 'pending'), (1, 'ready')]:
+            KitchenNotificationService.create_database_notification(self.branch.id, order_id, status)
+        self.assertEqual(
+            dict(KitchenNotification.objects.values_list('order_id', 'status')),
+            {1: 'ready', 2: 'pending', 3: 'pending'}
+        )
+
+        ids = sorted(KitchenNotification.objects.values_list('id', flat=True))
+
+        # role, update
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('kitchen-notification-read'), {'up_to_id': ids[1]}, format='json')
+        self.assertEqual(response.data['marked'], 2)
+        response = self.client.get(reverse('kitchen-notification-unread-count'))
+        self.assertEqual(response.data['unread_count'], 1)
+
+        # A read notification is not reused; the order's next status is new
+        KitchenNotificationService.create_database_notification(self.branch.id, 1, 'completed')
+        response = self.client.post(reverse('kitchen-notification-read'), {'notification_ids': ids[2:]}, format='json')
+        self.assertEqual(response.data['marked'], 1)
+        self.assertEqual(KitchenNotification.objects.count(), 4)
+        self.assertEqual(self.client.post(reverse('kitchen-notification-read'), {}, format='json').status_code, 400)
+
+        KitchenNotification.objects.filter(id__in=ids).update(updated_at=timezone.now() - timedelta(days=30))
+        call_command('purge_kitchen_notifications', batch_size=2, stdout=StringIO())
+        self.assertEqual(list(KitchenNotification.objects.values_list('status', flat=True)), ['completed'])
+
+    def test_kitchen_updates_batched_per_branch(self):
+        """Updates made before commit reach the branch as one message, the latest per order"""
+        first = self.place_order([{'item': self.steak.item_id, 'quantity': 1}, {'item': self.soup.item_id, 'quantity': 1}])
+        second = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        items = KitchenOrderItem.objects.filter(kitchen_order__order__in=[first, second]).order_by('id')
+
+        with mock.patch.object(KitchenNotificationService, 'send_kitchen_updates') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                for item in items:
+                    self.client.post(reverse('kitchen-item-start', args=[item.id]))
+                self.client.post(reverse('kitchen-item-complete', args=[items[0].id]))
+
+        send.assert_called_once()
+        branch_id, updates = send.call_args.args
+        self.assertEqual(branch_id, self.branch.id)
+        self.assertEqual(
+            [(update['order_id'], update['status']) for update in updates],
+            [(items[0].kitchen_order_id, 'item_completed'), (items[2].kitchen_order_id, 'item_started')]
+        )
+
+    def test_failed_state_publish_keeps_later_hooks(self):
+        """A kitchen state publish that fails after commit is logged without dropping the display update"""
+        order = self.place_order([{'item': self.steak.item_id, 'quantity': 1}])
+        ticket = KitchenOrder.objects.get(order=order)
+
+        with mock.patch.object(KitchenStateService, 'publish', side_effect=RuntimeError('cache down')), \
+                mock.patch.object(KitchenNotificationService, 'send_kitchen_updates') as send:
+            with self.assertLogs('django', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    KitchenStateService.touch(ticket.id)
+                    KitchenNotificationService.notify_kitchen_update(self.branch.id, ticket.id, 'item_started')
+
+        send.assert_called_once()
+
+    def test_kitchen_updates_of_rolled_back_savepoint_dropped(self):
+        """A batch opened in a rolled back savepoint is forgotten; later updates start a new one"""
+        with mock.patch.object(KitchenNotificationService, 'send_kitchen_updates') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    KitchenNotificationService.notify_kitchen_update(self.branch.id, 1, 'item_started')
+                    raise RuntimeError
+                KitchenNotificationService.notify_kitchen_update(self.branch.id, 2, 'item_started')
+
+        send.assert_called_once()
+        self.assertEqual([update['order_id'] for update in send.call_args.args[1]], [2])
+
+    @override_settings(KITCHEN_UPDATE_DEBOUNCE_MS=50)
+    def test_kitchen_updates_debounced(self):
+        """Committed batches within the debounce window are merged into one message"""
+        with mock.patch.object(KitchenNotificationService, 'send_kitchen_updates') as send:
+            KitchenUpdateBuffer.send({self.branch.id: {1: {'order_id': 1, 'status': 'item_started'}}})
+            KitchenUpdateBuffer.send({self.branch.id: {2: {'order_id': 2, 'status': 'item_started'}}})
+            time.sleep(0.3)
+
+        send.assert_called_once()
+        self.assertEqual([update['order_id'] for update in send.call_args.args[1]], [1, 2])
+
+
+
+@override_settings(KITCHEN_STATE_CACHE_SECONDS=60)
+class KitchenBumpTestCase(KitchenTestMixin, TestCase):
+    def test_bulk_bump_items(self):
+        """Bumped items move with conditional UPDATEs and finished tickets turn ready in one batched update"""
+        first = self.place_order([{'item': self.steak.item_id, 'quantity': 1}, {'item': self.soup.item_id, 'quantity': 1}])
+        second = self.place_order([{'item': self.steak.item_id, 'quantity': 1}, {'item': self.soup.item_id, 'quantity': 1}])
+        first_items = list(KitchenOrderItem.objects.filter(kitchen_order__order=first).order_by('id'))
+        second_items = list(KitchenOrderItem.objects.filter(kitchen_order__order=second).order_by('id'))
+        url = reverse('kitchen-item-bump')
+
+        all_ids = [item.id for item in first_items + second_items]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'items': all_ids, 'status': 'preparing'}, format='json')
+        self.assertEqual(sorted(response.data['bumped']), all_ids)
+        self.assertEqual(
+            set(KitchenOrderItem.objects.filter(id__in=all_ids).values_list('status', 'prepared_by')),
+            {('preparing', self.user.id)}
+        )
+
+        bump = [item.id for item in first_items] + [second_items[0].id]
+        with mock.patch.object(KitchenNotificationService, 'send_kitchen_updates') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, {'items': bump + [second_items[0].id], 'status': 'completed'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        first_ticket = KitchenOrder.objects.get(order=first)
+        second_ticket = KitchenOrder.objects.get(order=second)
+        self.assertEqual(response.data['ready'], [first_ticket.id])
+        self.assertEqual(response.data['skipped'], [])
+        self.assertEqual(first_ticket.status, 'ready')
+        self.assertEqual(second_ticket.status, 'pending')
+        first.refresh_from_db()
+        self.assertEqual(first.kitchen_items_done, 2)
+        self.assertEqual(KitchenStaffStats.objects.get(user=self.user).completed_items, 3)
+
+        send.assert_called_once()
+        self.assertEqual(
+            sorted((update['order_id'], update['status']) for update in send.call_args.args[1]),
+            [(first_ticket.id, 'ready'), (second_ticket.id, 'item_completed')]
+        )
+
+        # Completed items are not bumped twice
+        response = self.client.post(url, {'items': bump, 'status': 'completed'}, format='json')
+        self.assertEqual((response.data['bumped'], response.data['skipped']), ([], sorted(bump)))
+        response = self.client.post(url, {'items': bump, 'status': 'ready'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class KitchenQueryIndexTestCase(RestaurantTestMixin, TestCase):
+    """
+    EXPLAIN the hot kitchen queries against a large seeded kitchen history
+    and assert the planner searches indexes instead of scanning tables.
+    Run with KITCHEN_EXPLAIN_SEED_ROWS=1000000 for a production-sized kitchen.
+    """
+    SEED_ROWS = int(os.environ.get('KITCHEN_EXPLAIN_SEED_ROWS', 20_000))
+    BATCH_SIZE = 5_000
+    BRANCHES = 10
+    ACTIVE = ['pending', 'preparing']
+    BRANCH_FIELDS = {'kitchen_enabled': True}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.branches = [cls.branch] + [cls.create_branch(f'Branch {i}') for i in range(1, cls.BRANCHES)]
+        category = Category.objects.create(restaurant=cls.restaurant, name='Grill')
+        item = Item.objects.create(branch=cls.branches[0], category=category, name='Steak', cost=8, price=20)
+        cls.stations = [
+            KitchenStation.objects.create(name=f'Station {i}', branch=branch)
+            for branch in cls.branches for i in range(2)
+        ]
+        role = UserRole.objects.create(name='Cook', branch=cls.branches[0], kitchen_display=True)
+        cls.cook = User.objects.create_user(
+            branch=cls.branches[0],
+            role=role,
+            username='cook',
+            name='Cook',
+            email='cook@test.com',
+            password='testpass123'
+        )
+
+        # Mostly finished history with a small live kitchen, as in production
+        def status(i):
+            return {0: 'pending', 1: 'preparing', 2: 'cancelled'}.get(i % 20, 'completed')
+
+        now = timezone.now()
+        for batch_start in range(0, cls.SEED_ROWS, cls.BATCH_SIZE):
+            rows = range(batch_start, min(batch_start + cls.BATCH_SIZE, cls.SEED_ROWS))
+            orders = Order.objects.bulk_create([
+                Order(branch=cls.branches[i % cls.BRANCHES], status=status(i), total_amount=20)
+                for i in rows
+            ])
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(order=order, item=item, quantity=1, price=20) for order in orders
+            ])
+            tickets = KitchenOrder.objects.bulk_create([
+                KitchenOrder(
+                    order=order,
+                    status=status(i),
+                    state_version=i,
+                    sla_breach_time=now + timedelta(minutes=i % 40 - 20)
+                )
+                for i, order in zip(rows, orders)
+            ])
+            KitchenOrderItem.objects.bulk_create([
+                KitchenOrderItem(
+                    kitchen_order=ticket,
+                    order_item=order_item,
+                    station=cls.stations[(i % cls.BRANCHES) * 2 + i % 2],
+                    status=status(i),
+                    prepared_by=cls.cook if i % 50 == 0 else None,
+                    completed_at=now if status(i) == 'completed' else None,
+                    queue_key=now - timedelta(seconds=i)
+                )
+                for i, ticket, order_item in zip(rows, tickets, order_items)
+            ])
+            KitchenEvent.objects.bulk_create([
+                KitchenEvent(
+                    branch=cls.branches[i % cls.BRANCHES],
+                    sequence=i // cls.BRANCHES + 1,
+                    kind=KitchenEvent.Kind.TICKET_UPDATED,
+                    tickets=[{'id': ticket.id}]
+                )
+                for i, ticket in zip(rows, tickets)
+            ])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertSearchesIndexes(self, name, queryset, models):
+        plan = queryset.explain()
+        for model in models:
+            table = model._meta.db_table
+            if connection.vendor == 'postgresql':
+                self.assertNotIn(f'Seq Scan on {table}', plan, f'{name}: {plan}')
+            else:
+                self.assertNotRegex(plan, rf'SCAN {table}\b', f'{name}: {plan}')
+
+    def test_hot_queries_use_indexes(self):
+        branch = self.branches[3]
+        station_ids = [self.stations[6].id, self.stations[7].id]
+        queries = {
+            'station queue': (
+                KitchenOrderItem.objects.filter(station_id__in=station_ids, status__in=self.ACTIVE)
+                .order_by('queue_key', 'id'),
+                [KitchenOrderItem]
+            ),
+            'station workload': (
+                KitchenOrderItem.objects.filter(station_id__in=station_ids, status__in=self.ACTIVE)
+                .values_list('station_id', 'status').annotate(count=Count('id')).order_by(),
+                [KitchenOrderItem]
+            ),
+            'auto-assign pending items': (
+                KitchenOrderItem.objects.filter(
+                    kitchen_order__order__branch=branch, status='pending', station_id__in=station_ids
+                ),
+                [KitchenOrderItem]
+            ),
+            'branch items by status': (
+                KitchenOrderItem.objects.filter(kitchen_order__order__branch=branch, status='preparing'),
+                [KitchenOrderItem, KitchenOrder]
+            ),
+            'branch active tickets': (
+                KitchenOrder.objects.filter(order__branch=branch, status__in=self.ACTIVE),
+                [KitchenOrder]
+            ),
+            'projection rebuild': (
+                KitchenOrderItem.objects.filter(kitchen_order__in=KitchenOrder.objects.filter(
+                    order__branch=branch, status__in=self.ACTIVE
+                ).values('id')),
+                [KitchenOrderItem, KitchenOrder]
+            ),
+            'event tail': (
+                KitchenEvent.objects.filter(branch=branch, sequence__gt=self.SEED_ROWS // self.BRANCHES - 10)
+                .order_by('sequence'),
+                [KitchenEvent]
+            ),
+            'cook items': (
+                KitchenOrderItem.objects.filter(prepared_by=self.cook, status='completed'),
+                [KitchenOrderItem]
+            ),
+            'SLA due': (
+                KitchenOrder.objects.filter(
+                    sla_breached_at__isnull=True, status__in=self.ACTIVE, sla_breach_time__lte=timezone.now()
+                ).order_by('sla_breach_time', 'id'),
+                [KitchenOrder]
+            ),
+        }
+        for name, (queryset, models) in queries.items():
+            with self.subTest(name):
+                self.assertSearchesIndexes(name, queryset, models)
+
+class WebsocketClient(ApplicationCommunicator):
+    """Minimal WebSocket test client (channels.testing needs daphne installed)"""
+
+    def __init__(self, path):
+        path, _, query_string = path.partition('?')
+        super().__init__(application, {
+            'type': 'websocket',
+            'path': path,
+            'query_string': query_string.encode(),
+            'headers': [],
+            'subprotocols': [],
+        })
+
+    async def connect(self):
+        await self.send_input({'type': 'websocket.connect'})
+        return await self.receive_output()
+
+    async def send_json_to(self, data):
+        await self.send_input({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def receive_json_from(self):
+        return json.loads((await self.receive_output())['text'])
+
+    async def disconnect(self):
+        await self.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.wait()
+
+
+class KitchenConsumerTestCase(RestaurantTestMixin, TransactionTestCase):
+    BRANCH_FIELDS = {'kitchen_enabled': True}
+
+    def setUp(self):
+        self.create_restaurant()
+        self.kitchen_role = UserRole.objects.create(name='Kitchen', branch=self.branch, kitchen_display=True)
+        self.cashier_role = UserRole.objects.create(name='Cashier', branch=self.branch, order=True)
+
+    def token_for(self, role):
+        user = User.objects.create_user(
+            branch=self.branch,
+            role=role,
+            username=f'user{role.id}',
+            name='Staff',
+            email=f'user{role.id}@test.com',
+            password='testpass123'
+        )
+        return get_tokens_for_user(user)['access']
+
+    async def test_query_string_token_receives_branch_updates(self):
+        """An authenticated display joins its branch group and receives pushes"""
+        token = await database_sync_to_async(self.token_for)(self.kitchen_role)
+        communicator = WebsocketClient(f'/ws/kitchen/?token={token}')
+        self.assertEqual((await communicator.connect())['type'], 'websocket.accept')
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'authenticated', 'branch_id': self.branch.id})
+
+        await database_sync_to_async(KitchenNotificationService.notify_kitchen_update)(self.branch.id, 42, 'ready')
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'kitchen.update')
+        self.assertEqual([(update['order_id'], update['status']) for update in message['updates']], [(42, 'ready')])
+        await communicator.disconnect()
+
+    async def test_first_message_authentication(self):
+        """The token may be sent as the first message instead of in the URL"""
+        token = await database_sync_to_async(self.token_for)(self.kitchen_role)
+        communicator = WebsocketClient('/ws/kitchen/')
+        await communicator.connect()
+        await communicator.send_json_to({'type': 'authenticate', 'token': token})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'authenticated')
+        await communicator.disconnect()
+
+    async def test_rejects_invalid_or_unauthorized_tokens(self):
+        """Bad tokens and roles without kitchen access are closed"""
+        communicator = WebsocketClient('/ws/kitchen/?token=not-a-jwt')
+        await communicator.connect()
+        self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': 4401})
+
+        token = await database_sync_to_async(self.token_for)(self.cashier_role)
+        communicator = WebsocketClient(f'/ws/kitchen/?token={token}')
+        await communicator.connect()
+        self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': 4403})
+
+    @override_settings(KITCHEN_WS_AUTH_TIMEOUT_SECONDS=0.1)
+    async def test_closes_sockets_that_never_authenticate(self):
+        """A socket that sends no token is closed once the authentication timeout passes"""
+        communicator = WebsocketClient('/ws/kitchen/')
+        await communicator.connect()
+        self.assertEqual(await communicator.receive_output(timeout=2), {'type': 'websocket.close', 'code': 4401})
+
+
+class KitchenLoadSimulatorTestCase(RestaurantTestMixin, TransactionTestCase):
+    def setUp(self):
+        self.create_restaurant()
+        KitchenSystemService.enable_kitchen_system(self.branch.id)
+        display = KitchenDisplay.objects.get(branch=self.branch)
+        display.stations.set(KitchenStation.objects.filter(branch=self.branch))
+
+        role = UserRole.objects.create(name='Kitchen', branch=self.branch, kitchen_display=True)
+        User.objects.create_user(
+            branch=self.branch,
+            role=role,
+            username='cook',
+            name='Cook',
+            email='cook@test.com',
+            password='testpass123'
+        )
+        for name in ('Main Course', 'Dessert'):
+            category = Category.objects.create(restaurant=self.restaurant, name=name)
+            Item.objects.create(branch=self.branch, category=category, name=name, cost=5, price=10)
+        self.grill = KitchenStation.objects.get(branch=self.branch, name='Grill')
+
+    def simulate(self, **options):
+        out = StringIO()
+        call_command(
+            'simulate_kitchen_load',
+            branch_id=self.branch.id,
+            rate=600,
+            duration=1,
+            workers=1,
+            start_delay=0,
+            prep_time=0,
+            refresh_interval=0.2,
+            seed=7,
+            stdout=out,
+            stderr=StringIO(),
+            **options
+        )
+        return out.getvalue()
+
+    def test_orders_flow_through_kitchen(self):
+        """Every simulated order gets a ticket that is started and bumped, and all operations are reported"""
+        output = self.simulate()
+
+        orders = Order.objects.filter(branch=self.branch)
+        self.assertTrue(orders.exists())
+        self.assertEqual(
+            KitchenOrder.objects.filter(order__in=orders, status='completed').count(),
+            orders.count()
+        )
+        for operation in ('create', 'start', 'bump', 'refresh'):
+            self.assertRegex(output, rf'\n{operation}\s+[1-9]\d*\s+0\s')
+        self.assertIn(f'{orders.count()}/{orders.count()} created, {orders.count()} bumped', output)
+
+    def test_station_mix_picks_routed_items(self):
+        """A station mix only orders items routed to the chosen stations"""
+        dessert = KitchenStation.objects.get(branch=self.branch, name='Dessert')
+        self.simulate(station_mix=f'{dessert.id}:1')
+
+        stations = set(KitchenOrderItem.objects.values_list('station_id', flat=True))
+        self.assertEqual(stations, {dessert.id})
+
+        with self.assertRaises(CommandError):
+            self.simulate(station_mix=f'{self.grill.id}:1')
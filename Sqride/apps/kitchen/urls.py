@@ -2,13 +2,14 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     KitchenStationViewSet,
+    StationRouteViewSet,
     KitchenOrderViewSet,
     KitchenOrderItemViewSet,
     KitchenDisplayViewSet,
     KitchenSystemViewSet,
     KitchenStaffViewSet,
     KitchenAnalyticsViewSet,
-    
+    KitchenNotificationViewSet,
 )
 
 router = DefaultRouter()
@@ -16,6 +17,7 @@ router = DefaultRouter()
 # Basic Kitchen System URLs
 router.register('system', KitchenSystemViewSet, basename='kitchen-system')
 router.register('stations', KitchenStationViewSet, basename='kitchen-station')
+router.register('routes', StationRouteViewSet, basename='kitchen-route')
 router.register('orders', KitchenOrderViewSet, basename='kitchen-order')
 router.register('items', KitchenOrderItemViewSet, basename='kitchen-item')
 router.register('displays', KitchenDisplayViewSet, basename='kitchen-display')
@@ -26,6 +28,9 @@ router.register('staff', KitchenStaffViewSet, basename='kitchen-staff')
 # Analytics URLs
 router.register('analytics', KitchenAnalyticsViewSet, basename='kitchen-analytics')
 
+# Notification fallback URLs
+router.register('notifications', KitchenNotificationViewSet, basename='kitchen-notification')
+
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -25,14 +25,13 @@ def calculate_order_priority(order):
             priority += 1
     
     # Order type priority
-    if hasattr(order.order, 'order_type'):
-        if order.order.order_type == 'dining':
-            priority += 2  # Dining orders get higher priority
-        elif order.order.order_type == 'delivery':
-            priority += 1  # Delivery orders get medium priority
+    if order.order_type == 'dining':
+        priority += 2  # Dining orders get higher priority
+    elif order.order_type == 'delivery':
+        priority += 1  # Delivery orders get medium priority
     
     # Customer priority (VIP customers, etc.)
-    if hasattr(order.order, 'customer') and order.order.customer:
+    if order.customer_id:
         # You can implement customer priority logic here
         pass
     
@@ -41,38 +40,12 @@ def calculate_order_priority(order):
 
 def check_sla_breaches():
     """
-    Check for SLA breaches and send notifications
+    Flag overdue kitchen orders and alert their branches; run periodically
+    by the scan_sla_breaches management command
     """
-    from .services import KitchenNotificationService
-    
-    # Find orders that are taking too long
-    threshold_time = timezone.now() - timedelta(minutes=20)  # 20 minutes threshold
-    
-    overdue_orders = KitchenOrder.objects.filter(
-        status='preparing',
-        started_at__lt=threshold_time
-    )
-    
-    for order in overdue_orders:
-        # Calculate delay
-        delay_minutes = int((timezone.now() - order.started_at).total_seconds() / 60)
-        
-        # Send delay notification
-        KitchenNotificationService.notify_delay_alert(
-            order.order.branch.id,
-            order.id,
-            delay_minutes
-        )
-        
-        # Update analytics
-        for item in order.items.all():
-            if item.station:
-                analytics, _ = KitchenAnalytics.objects.get_or_create(
-                    station=item.station,
-                    date=timezone.now().date()
-                )
-                analytics.sla_breaches += 1
-                analytics.save()
+    from .services import KitchenSLAService
+
+    return KitchenSLAService.scan()
 
 
 def get_station_efficiency(station, days=7):
@@ -95,8 +68,11 @@ def get_station_efficiency(station, days=7):
             'efficiency_score': 0
         }
     
-    total_orders = analytics.aggregate(total=Sum('total_orders'))['total'] or 0
-    sla_breaches = analytics.aggregate(total=Sum('sla_breaches'))['total'] or 0
+    from .services import KitchenAnalyticsService
+
+    summary = KitchenAnalyticsService.summary(analytics)
+    total_orders = summary['total_orders']
+    sla_breaches = summary['sla_breaches']
     
     # Calculate efficiency score (0-100)
     if total_orders > 0:
@@ -107,9 +83,7 @@ def get_station_efficiency(station, days=7):
     
     return {
         'total_orders': total_orders,
-        'average_preparation_time': analytics.aggregate(
-            avg_time=Avg('average_preparation_time')
-        )['avg_time'],
+        'average_preparation_time': summary['avg_time'],
         'sla_breaches': sla_breaches,
         'efficiency_score': round(efficiency_score, 2)
     }
@@ -4,22 +4,49 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.db import transaction
-from .models import KitchenStation, KitchenOrder, KitchenOrderItem, KitchenDisplay, KitchenAnalytics, KitchenStaff, KitchenNotification
+from .models import KitchenStation, StationRoute, KitchenOrder, KitchenOrderItem, KitchenDisplay, KitchenAnalytics, KitchenStaff, KitchenNotification, KitchenEvent
 from .serializers import (
-    KitchenStationSerializer, KitchenOrderSerializer,
+    KitchenStationSerializer, StationRouteSerializer, KitchenOrderSerializer,
     KitchenOrderItemSerializer, KitchenDisplaySerializer,
     KitchenStaffSerializer, KitchenAnalyticsSerializer, KitchenNotificationSerializer,
     KitchenWorkloadSerializer, KitchenPerformanceSerializer
 )
 from accounts.permissions import HasRolePermission, IsOwnerOrSuperAdmin
-from .services import KitchenSystemService, KitchenAssignmentService, KitchenNotificationService
-from django.db.models import Avg, Count, Sum, Q
+from .services import KitchenSystemService, KitchenAssignmentService, KitchenNotificationService, KitchenProgressService, KitchenQueueService, KitchenStateService, KitchenAnalyticsService, KitchenStaffStatsService, KitchenETAService, KitchenWorkloadService, KitchenBumpService
+from .projection import KitchenProjectionService
+from django.db.models import Avg, Count, Min, Sum, Q
 from datetime import timedelta
+from collections import defaultdict
 from django.core.exceptions import ValidationError
 
 # Create your views here.
 
+def staff_performance_response(request, staff):
+    """
+    Prep time stats of a cook over ?start=YYYY-MM-DD&end=YYYY-MM-DD
+    (default: the last 30 days), read from their running daily totals
+    """
+    dates = {}
+    for name in ('start', 'end'):
+        value = request.query_params.get(name)
+        try:
+            dates[name] = parse_date(value) if value else None
+        except ValueError:
+            dates[name] = None
+        if value and dates[name] is None:
+            return Response({"error": f"{name} must be a date (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+    if dates['start'] and dates['end'] and dates['start'] > dates['end']:
+        return Response({"error": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+
+    stats = KitchenStaffStatsService.summary(staff.user_id, dates['start'], dates['end'])
+    return Response({
+        **stats,
+        'total_orders': stats['completed_items'],
+        'current_order': staff.current_order_id
+    })
+
 class KitchenStationViewSet(viewsets.ModelViewSet):
     queryset = KitchenStation.objects.all()
     serializer_class = KitchenStationSerializer
@@ -42,14 +69,9 @@ class KitchenStationViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def orders(self, request, pk=None):
+        """The station's pending and preparing items, from the branch's in-memory kitchen projection"""
         station = self.get_object()
-        orders = KitchenOrderItem.objects.filter(
-            station=station,
-            status__in=['pending', 'preparing']
-        ).select_related('kitchen_order', 'order_item')
-        
-        serializer = KitchenOrderItemSerializer(orders, many=True)
-        return Response(serializer.data)
+        return Response(KitchenProjectionService.station_items(station.branch_id, station.id))
 
     @action(detail=True, methods=['get'])
     def staff(self, request, pk=None):
@@ -69,35 +91,41 @@ class KitchenStationViewSet(viewsets.ModelViewSet):
     def workload(self, request, pk=None):
         """Get current workload for a specific station"""
         station = self.get_object()
-        
-        pending_count = KitchenOrderItem.objects.filter(
-            station=station,
-            status='pending'
-        ).count()
-        
-        preparing_count = KitchenOrderItem.objects.filter(
-            station=station,
-            status='preparing'
-        ).count()
-        
-        staff_count = KitchenStaff.objects.filter(station=station).count()
-        available_staff = KitchenStaff.objects.filter(
-            station=station,
-            is_available=True
-        ).count()
-        
-        workload_data = {
-            'station_name': station.name,
-            'pending': pending_count,
-            'preparing': preparing_count,
-            'total': pending_count + preparing_count,
-            'staff_count': staff_count,
-            'available_staff': available_staff
-        }
+        counts = KitchenProjectionService.workload(station.branch_id, [station.id])
+        workload_data = KitchenWorkloadService.for_stations([station], include_staff=True, counts=counts)[0]
         
         serializer = KitchenWorkloadSerializer(workload_data)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def all_day(self, request, pk=None):
+        """
+        Quantities of every item still to cook at this station, summed over
+        the open tickets per item and notes, from the branch's in-memory
+        kitchen projection. Like real_time_data, responses carry the
+        projection's version as an ETag so unchanged polls get a 304.
+        """
+        version = KitchenProjectionService.version(request.user.branch_id)
+        etag = f'"kitchen-all-day-{request.user.branch_id}-{pk}-{version}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        station = self.get_object()
+        counts, version = KitchenProjectionService.all_day(station.branch_id, [station.id])
+        items = counts[station.id]
+        etag = f'"kitchen-all-day-{request.user.branch_id}-{pk}-{version}"'
+        return Response({
+            'version': version,
+            'station': station.id,
+            'items': items
+        }, headers={'ETag': etag})
+
+    @action(detail=True, methods=['get'])
+    def queue(self, request, pk=None):
+        """Active items at this station, highest aging score first"""
+        station = self.get_object()
+        return Response(KitchenQueueService.get_queue([station.id]))
+
 class KitchenOrderViewSet(viewsets.ModelViewSet):
     queryset = KitchenOrder.objects.all()
     serializer_class = KitchenOrderSerializer
@@ -140,6 +168,7 @@ class KitchenOrderViewSet(viewsets.ModelViewSet):
             
             # Update all items
             order.items.update(status='preparing', started_at=timezone.now())
+            KitchenStateService.touch(order.id, kind=KitchenEvent.Kind.ITEM_STARTED)
             
             # Notify kitchen
             KitchenNotificationService.notify_kitchen_update(
@@ -164,20 +193,20 @@ class KitchenOrderViewSet(viewsets.ModelViewSet):
             order.status = 'completed'
             order.completed_at = timezone.now()
             
-            # Calculate preparation time
-            if order.started_at:
-                order.preparation_time = order.completed_at - order.started_at
+            # Calculate preparation time from when its first item was started
+            started_at = order.items.aggregate(started_at=Min('started_at'))['started_at']
+            if started_at:
+                order.preparation_time = order.completed_at - started_at
             
             order.save()
             
             # Update all items
-            order.items.update(
-                status='completed',
-                completed_at=timezone.now()
-            )
+            completed = KitchenStaffStatsService.complete_items(order.items.all())
+            KitchenProgressService.items_completed(order.order_id, completed)
+            KitchenStateService.touch(order.id, kind=KitchenEvent.Kind.ITEM_COMPLETED)
             
             # Update analytics
-            self._update_analytics(order)
+            KitchenAnalyticsService.record_completed(order)
             
             # Notify kitchen
             KitchenNotificationService.notify_kitchen_update(
@@ -278,32 +307,11 @@ class KitchenOrderViewSet(viewsets.ModelViewSet):
             )
         
         order.estimated_completion_time = timezone.now() + timedelta(minutes=estimated_minutes)
+        order.sla_breach_time = order.calculate_sla_breach()
         order.save()
         
         return Response({"message": f"Estimated completion time set to {estimated_minutes} minutes"})
 
-    def _update_analytics(self, order):
-        """Update analytics for completed order"""
-        for item in order.items.all():
-            if item.station:
-                analytics, _ = KitchenAnalytics.objects.get_or_create(
-                    station=item.station,
-                    date=timezone.now().date()
-                )
-                
-                if item.started_at and item.completed_at:
-                    preparation_time = item.completed_at - item.started_at
-                    
-                    analytics.total_orders += 1
-                    analytics.average_preparation_time = (
-                        (analytics.average_preparation_time or timedelta(0)) + preparation_time
-                    ) / 2
-                    
-                    if preparation_time > timedelta(minutes=15):  # SLA breach threshold
-                        analytics.sla_breaches += 1
-                    
-                    analytics.save()
-
 class KitchenOrderItemViewSet(viewsets.ModelViewSet):
     queryset = KitchenOrderItem.objects.all()
     serializer_class = KitchenOrderItemSerializer
@@ -362,6 +370,12 @@ class KitchenOrderItemViewSet(viewsets.ModelViewSet):
             item.status = 'completed'
             item.completed_at = timezone.now()
             item.save()
+            KitchenProgressService.items_completed(item.kitchen_order.order_id)
+            KitchenStaffStatsService.record([(item.prepared_by_id, item.started_at, item.completed_at)])
+            KitchenETAService.record([(
+                item.kitchen_order.order.branch_id, item.order_item.item_id, item.station_id,
+                item.started_at, item.completed_at
+            )])
             
             # Check if all items are completed
             kitchen_order = item.kitchen_order
@@ -378,6 +392,39 @@ class KitchenOrderItemViewSet(viewsets.ModelViewSet):
         
         return Response({"message": "Item completed"})
 
+    @action(detail=False, methods=['post'])
+    def bump(self, request):
+        """
+        Bump many items at once, e.g. from a bump bar:
+        ``{"items": [<item id>, ...], "status": "preparing" | "completed"}``.
+        Items not in the preceding status (pending, preparing) are skipped.
+        """
+        target = request.data.get('status')
+        item_ids = request.data.get('items')
+        if target not in KitchenBumpService.TRANSITIONS:
+            return Response(
+                {"error": "Status must be one of: " + ", ".join(KitchenBumpService.TRANSITIONS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            item_ids = [int(item_id) for item_id in item_ids]
+        except (TypeError, ValueError):
+            item_ids = None
+        if not item_ids:
+            return Response(
+                {"error": "Items must be a non-empty list of item IDs"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        bumped, ready = KitchenBumpService.bump_items(
+            self.get_queryset().filter(id__in=item_ids), target, request.user
+        )
+        return Response({
+            "bumped": bumped,
+            "skipped": sorted(set(item_ids) - set(bumped)),
+            "ready": ready
+        })
+
     @action(detail=True, methods=['post'])
     def reassign(self, request, pk=None):
         """Reassign an item to a different station"""
@@ -397,6 +444,24 @@ class KitchenOrderItemViewSet(viewsets.ModelViewSet):
         else:
             return Response({"error": message}, status=status.HTTP_400_BAD_REQUEST)
 
+class StationRouteViewSet(viewsets.ModelViewSet):
+    """Category and item routes to kitchen stations for the user's branch"""
+    queryset = StationRoute.objects.all()
+    serializer_class = StationRouteSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_permissions(self):
+        return [IsAuthenticated(), HasRolePermission('kitchen_display')]
+
+    def get_queryset(self):
+        user = self.request.user
+        if hasattr(user, 'branch'):
+            return StationRoute.objects.filter(branch=user.branch).select_related('station')
+        return StationRoute.objects.none()
+
+    def perform_create(self, serializer):
+        serializer.save(branch=self.request.user.branch)
+
 class KitchenDisplayViewSet(viewsets.ModelViewSet):
     queryset = KitchenDisplay.objects.all()
     serializer_class = KitchenDisplaySerializer
@@ -420,52 +485,58 @@ class KitchenDisplayViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def active_orders(self, request, pk=None):
         display = self.get_object()
-        stations = display.stations.all()
-        
-        orders = KitchenOrder.objects.filter(
-            items__station__in=stations,
-            status__in=['pending', 'preparing']
-        ).distinct()
-        
-        serializer = KitchenOrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        station_ids = display.stations.values_list('id', flat=True)
+        return Response(KitchenProjectionService.tickets(display.branch_id, station_ids)[0])
+
+    @action(detail=True, methods=['get'])
+    def queue(self, request, pk=None):
+        """Active items across the display's stations, highest aging score first"""
+        display = self.get_object()
+        station_ids = list(display.stations.values_list('id', flat=True))
+        return Response(KitchenQueueService.get_queue(station_ids))
 
     @action(detail=True, methods=['get'])
     def real_time_data(self, request, pk=None):
-        """Get real-time data for kitchen display"""
+        """
+        Get real-time data for kitchen display, from the branch's in-memory
+        kitchen projection.
+
+        Responses carry the version the projection is current with as an
+        ETag; a poll with a matching If-None-Match gets a 304 without
+        touching the database. ``?since_version=<n>`` returns only the tickets changed
+        after version ``n``, in any status, so displays can drop finished
+        ones; deleted tickets are only dropped on a full refresh, which is
+        also what a delta from too long ago gets (``full`` is then true).
+        """
+        version = KitchenProjectionService.version(request.user.branch_id)
+        etag = f'"kitchen-{request.user.branch_id}-{pk}-{version}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        since_version = request.query_params.get('since_version')
+        if since_version is not None:
+            try:
+                since_version = int(since_version)
+            except ValueError:
+                return Response({"error": "since_version must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
         display = self.get_object()
-        stations = display.stations.all()
-        
-        # Get active orders
-        active_orders = KitchenOrder.objects.filter(
-            items__station__in=stations,
-            status__in=['pending', 'preparing']
-        ).distinct()
+        stations = list(display.stations.only('id', 'name'))
+        station_ids = [station.id for station in stations]
+        tickets, full, version = KitchenProjectionService.tickets(display.branch_id, station_ids, since_version)
+        etag = f'"kitchen-{request.user.branch_id}-{pk}-{version}"'
         
         # Get station workload
-        workload = {}
-        for station in stations:
-            pending_count = KitchenOrderItem.objects.filter(
-                station=station,
-                status='pending'
-            ).count()
-            
-            preparing_count = KitchenOrderItem.objects.filter(
-                station=station,
-                status='preparing'
-            ).count()
-            
-            workload[station.name] = {
-                'pending': pending_count,
-                'preparing': preparing_count,
-                'total': pending_count + preparing_count
-            }
+        counts = KitchenProjectionService.workload(display.branch_id, station_ids)
+        workload = {station.name: counts[station.id] for station in stations}
         
         return Response({
-            'active_orders': KitchenOrderSerializer(active_orders, many=True).data,
+            'version': version,
+            'full': full,
+            'active_orders': tickets,
             'workload': workload,
             'last_updated': timezone.now().isoformat()
-        })
+        }, headers={'ETag': etag})
 
 class KitchenSystemViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsOwnerOrSuperAdmin]
@@ -536,23 +607,7 @@ class KitchenAnalyticsViewSet(viewsets.ViewSet):
     @action(detail=True, methods=['get'])
     def staff_performance(self, request, pk=None):
         staff = KitchenStaff.objects.get(pk=pk)
-        completed_orders = KitchenOrderItem.objects.filter(
-            prepared_by=staff.user,
-            status='completed'
-        )
-        
-        if completed_orders.exists():
-            avg_time = completed_orders.aggregate(
-                avg_time=Avg('completed_at' - 'started_at')
-            )['avg_time']
-        else:
-            avg_time = None
-        
-        return Response({
-            'total_orders': completed_orders.count(),
-            'average_time': avg_time,
-            'current_order': staff.current_order.id if staff.current_order else None
-        })
+        return staff_performance_response(request, staff)
 
     @action(detail=False, methods=['get'])
     def overview(self, request):
@@ -585,36 +640,27 @@ class KitchenAnalyticsViewSet(viewsets.ViewSet):
         branch = request.user.branch
         
         stations = KitchenStation.objects.filter(branch=branch)
-        analytics = []
+        rows = defaultdict(list)
+        for row in KitchenAnalytics.objects.filter(station__branch=branch):
+            rows[row.station_id].append(row)
         
-        for station in stations:
-            station_analytics = KitchenAnalytics.objects.filter(
-                station=station
-            ).aggregate(
-                total_orders=Sum('total_orders'),
-                avg_time=Avg('average_preparation_time'),
-                sla_breaches=Sum('sla_breaches')
-            )
-            
-            analytics.append({
+        analytics = [
+            {
                 'station': station.name,
-                **station_analytics
-            })
+                **KitchenAnalyticsService.summary(rows[station.id])
+            }
+            for station in stations
+        ]
         
         return Response(analytics)
 
     @action(detail=False, methods=['get'])
     def daily(self, request):
         branch = request.user.branch
-        date = request.query_params.get('date', timezone.now().date())
-        
-        analytics = KitchenAnalytics.objects.filter(
-            station__branch=branch,
-            date=date
-        ).aggregate(
-            total_orders=Sum('total_orders'),
-            avg_time=Avg('average_preparation_time'),
-            sla_breaches=Sum('sla_breaches')
+        date = request.query_params.get('date', timezone.localdate())
+        
+        analytics = KitchenAnalyticsService.summary(
+            KitchenAnalytics.objects.filter(station__branch=branch, date=date)
         )
         
         return Response(analytics)
@@ -623,28 +669,17 @@ class KitchenAnalyticsViewSet(viewsets.ViewSet):
     def workload(self, request):
         """Get current workload for all stations"""
         branch = request.user.branch
-        workload = KitchenAssignmentService.get_station_workload(branch)
-        
-        # Add staff information to workload
-        for station_name, data in workload.items():
-            station = KitchenStation.objects.get(name=station_name, branch=branch)
-            staff_count = KitchenStaff.objects.filter(station=station).count()
-            available_staff = KitchenStaff.objects.filter(
-                station=station,
-                is_available=True
-            ).count()
-            
-            data['staff_count'] = staff_count
-            data['available_staff'] = available_staff
-        
-        serializer = KitchenWorkloadSerializer(workload.values(), many=True)
+        workload = KitchenWorkloadService.for_branch(branch, include_staff=True)
+        serializer = KitchenWorkloadSerializer(workload, many=True)
         return Response(serializer.data)
 
 class KitchenNotificationViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = KitchenNotificationSerializer
 
-    @action(detail=False, methods=['get'])
+    def get_permissions(self):
+        return [IsAuthenticated(), HasRolePermission('kitchen_display')]
+
     def list(self, request):
         branch = request.user.branch
         notifications = KitchenNotificationService.get_notifications(branch)
@@ -652,13 +687,37 @@ class KitchenNotificationViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['post'])
     def read(self, request):
-        notification_id = request.data.get('notification_id')
-        success = KitchenNotificationService.mark_as_read(notification_id)
-        
-        if success:
-            return Response({"message": "Notification marked as read"})
-        else:
-            return Response({"error": "Failed to mark notification as read"}, status=status.HTTP_400_BAD_REQUEST)
+        """
+        Mark notifications as read: ``notification_ids`` (a list),
+        ``notification_id`` (a single one) or every unread notification
+        with an id up to ``up_to_id``
+        """
+        notification_ids = request.data.get('notification_ids')
+        if notification_ids is None and request.data.get('notification_id') is not None:
+            notification_ids = [request.data.get('notification_id')]
+        up_to_id = request.data.get('up_to_id')
+
+        try:
+            if notification_ids is not None:
+                if not isinstance(notification_ids, list):
+                    raise ValueError
+                notification_ids = [int(notification_id) for notification_id in notification_ids]
+            elif up_to_id is not None:
+                up_to_id = int(up_to_id)
+            else:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Provide notification_ids (a list of ids) or up_to_id"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        marked = KitchenNotificationService.mark_as_read(
+            request.user.branch,
+            notification_ids=notification_ids,
+            up_to_id=up_to_id
+        )
+        return Response({"message": "Notifications marked as read", "marked": marked})
 
     @action(detail=False, methods=['post'])
     def clear(self, request):
@@ -673,15 +732,8 @@ class KitchenNotificationViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications"""
-        branch = request.user.branch
-        
         try:
-            count = KitchenNotification.objects.filter(
-                branch=branch,
-                is_read=False
-            ).count()
-            
-            return Response({"unread_count": count})
+            return Response({"unread_count": KitchenNotificationService.unread_count(request.user.branch)})
         except Exception:
             return Response({"unread_count": 0})
 
@@ -738,26 +790,7 @@ class KitchenStaffViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def performance(self, request, pk=None):
         staff = self.get_object()
-        
-        completed_items = KitchenOrderItem.objects.filter(
-            prepared_by=staff.user,
-            status='completed'
-        )
-        
-        total_orders = completed_items.count()
-        
-        if completed_items.exists():
-            avg_time = completed_items.aggregate(
-                avg_time=Avg('completed_at' - 'started_at')
-            )['avg_time']
-        else:
-            avg_time = None
-        
-        return Response({
-            'total_orders': total_orders,
-            'average_preparation_time': avg_time,
-            'current_order': staff.current_order.id if staff.current_order else None
-        })
+        return staff_performance_response(request, staff)
 
     @action(detail=True, methods=['post'])
     def toggle_availability(self, request, pk=None):
@@ -0,0 +1 @@
+# Order management commands
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from orders.models import Order, OrderItem
+from kitchen.models import KitchenOrderItem
+
+
+def _count_subquery(queryset, group_field):
+    """Correlated COUNT(*) per order, usable inside a single UPDATE"""
+    counts = queryset.values(group_field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized order summary columns (item and kitchen progress counts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--branch-id',
+            type=int,
+            help='Only repair orders of this branch'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Number of orders updated per statement'
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        if options['branch_id']:
+            orders = orders.filter(branch_id=options['branch_id'])
+
+        batch_size = options['batch_size']
+        kitchen_items = KitchenOrderItem.objects.filter(kitchen_order__order=OuterRef('pk'))
+        summaries = {
+            'item_count': _count_subquery(
+                OrderItem.objects.filter(order=OuterRef('pk')), 'order'
+            ),
+            'kitchen_items_total': _count_subquery(
+                kitchen_items, 'kitchen_order__order'
+            ),
+            'kitchen_items_done': _count_subquery(
+                kitchen_items.filter(status='completed'), 'kitchen_order__order'
+            ),
+        }
+
+        # Walk the primary key range so each UPDATE touches a bounded batch
+        ids = orders.order_by('order_id').values_list('order_id', flat=True)
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(ids.filter(order_id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                updated += orders.filter(
+                    order_id__gte=batch[0],
+                    order_id__lte=batch[-1]
+                ).update(**summaries)
+            last_id = batch[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Recomputed summaries for {updated} orders')
+        )
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_passwordresettoken'),
+        ('customers', '0001_initial'),
+        ('orders', '0003_order_table'),
+        ('restaurants', '0007_alter_branch_operating_hours_alter_branch_settings'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='idx_orders_branch_id',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['branch', 'created_at'], name='idx_orders_br_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['branch', 'status', 'created_at'], name='idx_orders_br_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['branch', 'paid', 'created_at'], name='idx_orders_br_paid_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['branch', 'order_type', 'created_at'], name='idx_orders_br_type_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['branch', 'total_amount'], name='idx_orders_br_amount'),
+        ),
+    ]
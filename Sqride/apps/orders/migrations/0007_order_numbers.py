@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_passwordresettoken'),
+        ('customers', '0001_initial'),
+        ('orders', '0006_order_version'),
+        ('restaurants', '0007_alter_branch_operating_hours_alter_branch_settings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_date', models.DateField()),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'order_number_counters',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='business_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='order_number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(fields=('branch', 'business_date', 'order_number'), name='unique_order_number_per_branch_day'),
+        ),
+        migrations.AddField(
+            model_name='ordernumbercounter',
+            name='branch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_number_counters', to='restaurants.branch'),
+        ),
+        migrations.AddConstraint(
+            model_name='ordernumbercounter',
+            constraint=models.UniqueConstraint(fields=('branch', 'business_date'), name='unique_order_counter_branch_day'),
+        ),
+    ]
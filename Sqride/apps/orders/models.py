@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from core.models import TimestampedModel
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -61,21 +62,93 @@ class Order(TimestampedModel):
     paid = models.BooleanField(default=False)
     paid_at = models.DateTimeField(null=True, blank=True)
     table = models.ForeignKey(RestaurantTable, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    # Denormalized summaries so list screens never join items or kitchen rows.
+    # Maintained incrementally by the order and kitchen services; rebuild with
+    # ``manage.py recompute_order_summaries``.
+    item_count = models.PositiveIntegerField(default=0)
+    kitchen_items_total = models.PositiveIntegerField(default=0)
+    kitchen_items_done = models.PositiveIntegerField(default=0)
+    # Bumped on every save of an existing order; documents rendered from the
+    # order (receipts, invoices) are cached against this version
+    version = models.PositiveIntegerField(default=1)
+    # Short per-branch ticket number (#001, #002, ...) that restarts every
+    # business day; allocated from OrderNumberCounter when the order is created
+    business_date = models.DateField(null=True, blank=True)
+    order_number = models.PositiveIntegerField(null=True, blank=True)
     objects = OrderManager()
 
     class Meta:
         indexes = [
-            models.Index(fields=['branch'], name='idx_orders_branch_id'),
+            # Composite indexes backing OrderFilter; each leads with branch and
+            # ends with created_at so filtered lists are served in index order
+            models.Index(fields=['branch', 'created_at'], name='idx_orders_br_created'),
+            models.Index(fields=['branch', 'status', 'created_at'], name='idx_orders_br_status_created'),
+            models.Index(fields=['branch', 'paid', 'created_at'], name='idx_orders_br_paid_created'),
+            models.Index(fields=['branch', 'order_type', 'created_at'], name='idx_orders_br_type_created'),
+            models.Index(fields=['branch', 'total_amount'], name='idx_orders_br_amount'),
             models.Index(fields=['customer'], name='idx_orders_customer_id'),
             models.Index(fields=['currency'], name='idx_orders_currency_id'),
             models.Index(fields=['status'], name='idx_orders_status'),
             models.Index(fields=['status_changed_at'], name='idx_orders_status_changed_at'),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['branch', 'business_date', 'order_number'],
+                name='unique_order_number_per_branch_day'
+            )
+        ]
         ordering = ['-created_at']
 
     def __str__(self):
         return f"Order {self.order_id} - {self.get_status_display()}"
 
+    @property
+    def display_number(self):
+        """Ticket number as shown to customers and on the KDS, e.g. #007"""
+        return Order.format_display_number(self.order_id, self.order_number)
+
+    @staticmethod
+    def format_display_number(order_id, order_number):
+        """display_number for rows fetched with values()"""
+        if order_number is None:
+            return f"#{order_id}"
+        return f"#{order_number:03d}"
+
+    # Summary counters maintained with F() updates (OrderService.items_changed,
+    # KitchenProgressService). Saving an existing order leaves them alone
+    # unless they are named in update_fields, so a stale instance never
+    # writes old counts back.
+    COUNTER_FIELDS = ('item_count', 'kitchen_items_total', 'kitchen_items_done')
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            # Incremented by the UPDATE itself, so two saves of stale
+            # instances never end up with the same version
+            self.version = F('version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                ]
+            else:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+            super().save(*args, **kwargs)
+            self.refresh_from_db(fields=['version'])
+            return
+        if self.order_number is None:
+            from .services import OrderNumberService
+            self.business_date = OrderNumberService.business_date(self.branch)
+            self.order_number = OrderNumberService.take_reserved(self.branch_id, self.business_date)
+            if self.order_number is None:
+                # Allocate inside the insert's transaction so a failed insert
+                # rolls the counter back and leaves no gap in the sequence
+                with transaction.atomic(savepoint=False):
+                    self.order_number = OrderNumberService.allocate(self.branch_id, self.business_date)
+                    super().save(*args, **kwargs)
+                return
+        super().save(*args, **kwargs)
+
     def validate_status_transition(self, new_status, user=None):
         """Validate if the status transition is allowed"""
         if new_status not in self.STATUS_TRANSITIONS[self.status]:
@@ -169,6 +242,25 @@ class Order(TimestampedModel):
                         # If ingredient not in inventory, skip
                         pass
 
+class OrderNumberCounter(models.Model):
+    """
+    Last ticket number handed out per branch and business day. Rows are only
+    touched through OrderNumberService.allocate, a single upsert that locks
+    just this branch's row for the rest of the allocating transaction.
+    """
+    branch = models.ForeignKey('restaurants.Branch', on_delete=models.CASCADE, related_name='order_number_counters')
+    business_date = models.DateField()
+    last_number = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "order_number_counters"
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'business_date'], name='unique_order_counter_branch_day')
+        ]
+
+    def __str__(self):
+        return f"{self.branch_id} {self.business_date}: {self.last_number}"
+
 class OrderItem(models.Model):
     order_item_id = models.AutoField(primary_key=True)
     order = models.ForeignKey(
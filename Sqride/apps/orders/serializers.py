@@ -42,12 +42,16 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = [
-            'order_id', 'branch', 'customer', 'order_type',
+            'order_id', 'order_number', 'business_date', 'branch', 'customer', 'order_type',
             'total_amount', 'currency', 'status', 'items',
             'status_changed_at', 'status_changed_by_name',
-            'status_history'
+            'status_history', 'item_count',
+            'kitchen_items_total', 'kitchen_items_done'
+        ]
+        read_only_fields = [
+            'order_id', 'order_number', 'business_date', 'total_amount', 'currency', 'status_changed_at', 'status_changed_by_name',
+            'item_count', 'kitchen_items_total', 'kitchen_items_done'
         ]
-        read_only_fields = ['order_id', 'total_amount', 'currency', 'status_changed_at', 'status_changed_by_name']
 
     def validate_status(self, value):
         """Validate status changes"""
@@ -57,4 +61,17 @@ class OrderSerializer(serializers.ModelSerializer):
                 instance.validate_status_transition(value, self.context.get('request').user)
             except ValidationError as e:
                 raise serializers.ValidationError(str(e))
-        return value
\ No newline at end of file
+        return value
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """Flat order row for list screens; reads only columns of the orders table."""
+
+    class Meta:
+        model = Order
+        fields = [
+            'order_id', 'order_number', 'business_date', 'branch', 'customer', 'table', 'order_type',
+            'total_amount', 'currency', 'status', 'paid', 'paid_at',
+            'item_count', 'kitchen_items_total', 'kitchen_items_done',
+            'status_changed_at', 'created_at'
+        ]
+        read_only_fields = fields
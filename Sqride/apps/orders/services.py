@@ -0,0 +1,183 @@
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from items.models import Item
+from .models import Order, OrderItem, OrderNumberCounter
+from .signals import order_placed, order_items_added
+
+logger = logging.getLogger(__name__)
+
+# Per-worker blocks of pre-allocated order numbers: {(branch_id, business_date): [next, last]}
+_reserved_blocks = {}
+_reserved_lock = threading.Lock()
+
+
+class OrderService:
+    @staticmethod
+    def build_order_items(items_data):
+        """
+        Resolve requested items and their prices with a single query.
+        Returns unsaved OrderItem instances and the order total.
+        """
+        if not items_data:
+            raise ValidationError("No items provided in the order.")
+
+        item_ids = [item_data["item"] for item_data in items_data]
+        item_map = Item.objects.in_bulk(item_ids)
+
+        order_items = []
+        total_amount = 0
+
+        for item_data in items_data:
+            item_id = item_data["item"]
+            quantity = item_data["quantity"]
+
+            item = item_map.get(item_id)
+            if not item:
+                raise ValidationError(f"Item with ID {item_id} does not exist")
+
+            price = item.price
+            total_amount += price * quantity
+
+            order_items.append(OrderItem(
+                item=item,
+                quantity=quantity,
+                price=price
+            ))
+
+        return order_items, total_amount
+
+    @staticmethod
+    def create_order(branch, items_data, customer=None, order_type=None, table=None):
+        """
+        Create an order with its items in one pipeline: items and totals are
+        resolved up front, the order is inserted once, its items are inserted
+        with one bulk_create, and downstream hooks run once after commit.
+        """
+        order_items, total_amount = OrderService.build_order_items(items_data)
+        business_date = OrderNumberService.business_date(branch)
+        order_number = OrderNumberService.take_reserved(branch.id, business_date)
+
+        with transaction.atomic():
+            order = Order.objects.create(
+                branch=branch,
+                business_date=business_date,
+                order_number=order_number,
+                customer=customer,
+                order_type=order_type or Order.OrderType.DINING,
+                currency=branch.currency.currency_code if branch.currency else "PKR",
+                total_amount=total_amount,
+                item_count=len(order_items),
+                table=table
+            )
+
+            for order_item in order_items:
+                order_item.order = order
+            OrderItem.objects.bulk_create(order_items)
+
+            transaction.on_commit(
+                lambda: OrderService.dispatch_order_placed(order, order_items)
+            )
+
+        return order
+
+    @staticmethod
+    def items_changed(order, count):
+        """
+        Add ``count`` (negative for removed items) to the order's item_count
+        with an F() update, so concurrent item writes never lose a change
+        """
+        if count:
+            Order.objects.filter(order_id=order.order_id).update(item_count=F('item_count') + count)
+            order.refresh_from_db(fields=['item_count'])
+
+    @staticmethod
+    def dispatch_order_placed(order, items):
+        """
+        Notify downstream consumers (kitchen tickets, notifications) that an
+        order has been committed. Receiver failures are logged, not raised,
+        since the order itself is already persisted.
+        """
+        OrderService._send(order_placed, order, items)
+
+    @staticmethod
+    def dispatch_order_items_added(order, items):
+        """Notify downstream consumers of items committed to an existing order"""
+        OrderService._send(order_items_added, order, items)
+
+    @staticmethod
+    def _send(signal, order, items):
+        responses = signal.send_robust(sender=Order, order=order, items=items)
+        for receiver, response in responses:
+            if isinstance(response, Exception):
+                logger.error(
+                    "Receiver %r failed for order %s: %s",
+                    receiver, order.order_id, response
+                )
+
+
+class OrderNumberService:
+    @staticmethod
+    def business_date(branch, at=None):
+        """
+        Business day an order placed at ``at`` belongs to. Branches open past
+        midnight can set ``business_day_start_hour`` in their settings so
+        late orders keep counting on the previous day's tickets.
+        """
+        start_hour = (branch.settings or {}).get('business_day_start_hour', 0)
+        local = timezone.localtime(at or timezone.now())
+        return (local - timedelta(hours=start_hour)).date()
+
+    @staticmethod
+    def allocate(branch_id, business_date, count=1):
+        """
+        Reserve ``count`` consecutive numbers for the branch's business day
+        and return the last one. A single INSERT ... ON CONFLICT DO UPDATE
+        ... RETURNING creates or bumps the counter row, so concurrent orders
+        only wait on their own branch's row until their transaction commits,
+        never on a table lock or a MAX() scan.
+        """
+        table = connection.ops.quote_name(OrderNumberCounter._meta.db_table)
+        sql = (
+            f"INSERT INTO {table} (branch_id, business_date, last_number) VALUES (%s, %s, %s) "
+            f"ON CONFLICT (branch_id, business_date) "
+            f"DO UPDATE SET last_number = {table}.last_number + EXCLUDED.last_number "
+            f"RETURNING last_number"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [branch_id, connection.ops.adapt_datefield_value(business_date), count])
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def take_reserved(branch_id, business_date):
+        """
+        Next number from this worker's pre-allocated block, or None when
+        blocks are disabled (ORDER_NUMBER_BLOCK_SIZE <= 1, the default).
+
+        Blocks trade gaplessness for fewer counter writes: numbers left in a
+        block when the worker exits are never used, and workers interleave.
+        A block is only reserved in autocommit mode; inside a transaction it
+        could be rolled back while this worker kept handing its numbers out,
+        so callers fall back to allocate() there.
+        """
+        block_size = getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 1)
+        if block_size <= 1 or connection.in_atomic_block:
+            return None
+
+        key = (branch_id, business_date)
+        with _reserved_lock:
+            block = _reserved_blocks.get(key)
+            if block is None or block[0] > block[1]:
+                last = OrderNumberService.allocate(branch_id, business_date, block_size)
+                block = _reserved_blocks[key] = [last - block_size + 1, last]
+                # Forget this branch's blocks from previous business days
+                for stale in [k for k in _reserved_blocks if k[0] == branch_id and k[1] != business_date]:
+                    del _reserved_blocks[stale]
+            number = block[0]
+            block[0] += 1
+        return number
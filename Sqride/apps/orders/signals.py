@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Sent once per order, after the transaction that created it has committed.
+# Receivers get ``order`` and ``items`` (the OrderItem rows created with it).
+order_placed = Signal()
+
+# Sent after commit when items are added to an existing order, with the same
+# ``order`` and ``items`` arguments.
+order_items_added = Signal()
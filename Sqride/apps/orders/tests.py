@@ -1,3 +1,377 @@
+import os
+from datetime import timedelta
+from io import StringIO
 from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import QueryDict
+from urllib.parse import urlencode
+from django.utils import timezone
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from restaurants.models import Branch, RestaurantTable
+from restaurants.testing import RestaurantTestMixin
+from accounts.models import UserRole, User
+from items.models import Item, Category
+from kitchen.models import KitchenOrder, KitchenOrderItem
+from kitchen.services import KitchenSystemService
+from .filters import OrderFilter
+from .models import Order, OrderItem, OrderStatus, OrderNumberCounter
+from .services import OrderNumberService
 
-# Create your tests here.
+
+class OrderTestMixin(RestaurantTestMixin):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.table = RestaurantTable.objects.create(
+            branch=cls.branch,
+            table_number='T1',
+            capacity=4
+        )
+        cls.category = Category.objects.create(
+            restaurant=cls.restaurant,
+            name='Main Course'
+        )
+        cls.burger = Item.objects.create(
+            branch=cls.branch,
+            category=cls.category,
+            name='Burger',
+            cost=5.00,
+            price=10.00
+        )
+        cls.fries = Item.objects.create(
+            branch=cls.branch,
+            category=cls.category,
+            name='Fries',
+            cost=1.00,
+            price=4.50
+        )
+        cls.role = UserRole.objects.create(
+            name='Cashier',
+            branch=cls.branch,
+            order=True
+        )
+        cls.user = User.objects.create_user(
+            branch=cls.branch,
+            role=cls.role,
+            username='cashier',
+            name='Cashier',
+            email='cashier@test.com',
+            password='testpass123'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user, token={'role_id': self.role.id})
+
+    def order_payload(self, **overrides):
+        payload = {
+            'order_type': 'dining',
+            'table': self.table.id,
+            'items': [
+                {'item': self.burger.item_id, 'quantity': 2},
+                {'item': self.fries.item_id, 'quantity': 1},
+            ]
+        }
+        payload.update(overrides)
+        return payload
+
+
+class OrderCreationPipelineTestCase(OrderTestMixin, TestCase):
+    def test_create_order_single_insert(self):
+        """Order is inserted once with its final total and items"""
+        saves = []
+
+        def record_save(sender, instance, created, **kwargs):
+            saves.append(created)
+
+        post_save.connect(record_save, sender=Order)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('order-list'), self.order_payload(), format='json')
+        finally:
+            post_save.disconnect(record_save, sender=Order)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(saves, [True])
+
+        order = Order.objects.get(order_id=response.data['order_id'])
+        self.assertEqual(order.total_amount, 24.50)
+        self.assertEqual(order.items.count(), 2)
+
+    def test_create_order_query_count(self):
+        """End-to-end query count for creating an order through the API"""
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('order-list'), self.order_payload(), format='json')
+
+        self.assertEqual(response.status_code, 201)
+        # role, table and items lookups; savepoint, order number upsert, order
+        # insert, items bulk insert, release; response prefetch of items, their
+        # menu items and history
+        self.assertEqual(len(ctx.captured_queries), 11, [q['sql'] for q in ctx.captured_queries])
+
+    def test_create_order_unknown_item_writes_nothing(self):
+        """Invalid items are rejected before anything is inserted"""
+        payload = self.order_payload(items=[{'item': 999999, 'quantity': 1}])
+        response = self.client.post(reverse('order-list'), payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Item with ID 999999 does not exist')
+        self.assertFalse(Order.objects.exists())
+
+    def test_create_order_builds_kitchen_ticket_after_commit(self):
+        """Kitchen ticket is built once the order and its items are committed"""
+        KitchenSystemService.enable_kitchen_system(self.branch.id)
+        KitchenSystemService.update_kitchen_settings(self.branch.id, {'auto_assign_stations': False})
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk), token={'role_id': self.role.id})
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(reverse('order-list'), self.order_payload(), format='json')
+
+        self.assertEqual(response.status_code, 201)
+        # order dispatch, then the kitchen state bump queued by the new ticket
+        self.assertEqual(len(callbacks), 2)
+
+        kitchen_order = KitchenOrder.objects.get(order_id=response.data['order_id'])
+        self.assertEqual(kitchen_order.items.count(), 2)
+        self.assertEqual(
+            set(KitchenOrderItem.objects.values_list('order_item_id', flat=True)),
+            set(OrderItem.objects.values_list('order_item_id', flat=True))
+        )
+
+
+class OrderFilterTestCase(OrderTestMixin, TestCase):
+    def test_filter_orders(self):
+        """Status, paid and amount filters narrow the branch's orders"""
+        Order.objects.create(branch=self.branch, status='completed', paid=True, total_amount=40)
+        Order.objects.create(branch=self.branch, status='completed', paid=False, total_amount=15)
+        Order.objects.create(branch=self.branch, status='pending', total_amount=25)
+
+        response = self.client.get(reverse('order-list'), {'status': 'completed', 'paid': 'true'})
+        self.assertEqual(response.data['count'], 1)
+
+        response = self.client.get(reverse('order-list'), {'amount_min': 20, 'amount_max': 30})
+        self.assertEqual(response.data['count'], 1)
+
+        response = self.client.get(reverse('order-list'), {'status': ['pending', 'completed']})
+        self.assertEqual(response.data['count'], 3)
+
+
+class OrderFilterIndexTestCase(OrderTestMixin, TestCase):
+    """
+    EXPLAIN every supported filter combination against a large seeded orders
+    table and assert the planner searches an index instead of scanning.
+    Run with ORDERS_EXPLAIN_SEED_ROWS=1000000 for a production-sized table.
+    """
+    SEED_ROWS = int(os.environ.get('ORDERS_EXPLAIN_SEED_ROWS', 100_000))
+    BATCH_SIZE = 10_000
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_branch = Branch.objects.create(
+            restaurant=cls.restaurant,
+            name='Other Branch',
+            address='456 Test St',
+            phone='123-456-7890',
+            currency=cls.currency
+        )
+        branches = [cls.branch, cls.other_branch]
+        statuses = [value for value, _ in OrderStatus.choices]
+        order_types = [value for value, _ in Order.OrderType.choices]
+        start = timezone.now() - timedelta(days=cls.SEED_ROWS // cls.BATCH_SIZE)
+
+        for batch_start in range(0, cls.SEED_ROWS, cls.BATCH_SIZE):
+            created = Order.objects.bulk_create([
+                Order(
+                    branch=branches[i % 2],
+                    status=statuses[i % len(statuses)],
+                    order_type=order_types[i % len(order_types)],
+                    paid=i % 3 == 0,
+                    total_amount=i % 500,
+                    table=cls.table if i % 50 == 0 else None
+                )
+                for i in range(batch_start, min(batch_start + cls.BATCH_SIZE, cls.SEED_ROWS))
+            ])
+            # Spread history across days; auto_now_add pins bulk inserts to now
+            Order.objects.filter(order_id__gte=created[0].order_id).update(
+                created_at=start + timedelta(days=batch_start // cls.BATCH_SIZE)
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, params):
+        filterset = OrderFilter(
+            QueryDict(urlencode(params, doseq=True)),
+            queryset=Order.objects.filter(branch=self.branch)
+        )
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        queryset = filterset.qs
+        plan = queryset.explain()
+        table = Order._meta.db_table
+        if connection.vendor == 'postgresql':
+            self.assertNotIn(f'Seq Scan on {table}', plan, f'{params}: {plan}')
+        else:
+            self.assertIn(f'SEARCH {table} USING', plan, f'{params}: {plan}')
+
+    def test_filters_use_indexes(self):
+        today = timezone.now().date()
+        week_ago = today - timedelta(days=7)
+        combinations = [
+            {},
+            {'created_after': week_ago, 'created_before': today},
+            {'status': 'pending'},
+            {'status': ['pending', 'preparing']},
+            {'status': 'completed', 'created_after': week_ago, 'created_before': today},
+            {'paid': 'false'},
+            {'paid': 'true', 'created_after': week_ago, 'created_before': today},
+            {'order_type': 'delivery'},
+            {'order_type': 'takeaway', 'created_after': week_ago},
+            {'table': self.table.id},
+            {'customer': 1},
+            {'amount_min': 100, 'amount_max': 120},
+            {'status': 'completed', 'paid': 'false'},
+        ]
+        for params in combinations:
+            with self.subTest(params=params):
+                self.assertUsesIndex(params)
+
+
+class OrderSummaryTestCase(OrderTestMixin, TestCase):
+    def create_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('order-list'), self.order_payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(order_id=response.data['order_id'])
+
+    def test_list_reads_only_orders_table(self):
+        """Order list is served from summary columns without joins"""
+        for _ in range(3):
+            self.create_order()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('order-list'))
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'][0]['item_count'], 2)
+        # role lookup, page count, page rows
+        self.assertEqual(len(ctx.captured_queries), 3)
+        for query in ctx.captured_queries[1:]:
+            self.assertNotIn('JOIN', query['sql'])
+
+    def test_kitchen_progress_maintained(self):
+        """Ticket creation and item completion update the order's progress"""
+        KitchenSystemService.enable_kitchen_system(self.branch.id)
+        KitchenSystemService.update_kitchen_settings(self.branch.id, {'auto_assign_stations': False})
+        kitchen_role = UserRole.objects.create(
+            name='Kitchen',
+            branch=self.branch,
+            order=True,
+            kitchen_display=True
+        )
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk), token={'role_id': kitchen_role.id})
+
+        order = self.create_order()
+        self.assertEqual((order.item_count, order.kitchen_items_total, order.kitchen_items_done), (2, 2, 0))
+
+        kitchen_item = KitchenOrderItem.objects.filter(kitchen_order__order=order).first()
+        self.client.post(reverse('kitchen-item-start', args=[kitchen_item.id]))
+        self.client.post(reverse('kitchen-item-complete', args=[kitchen_item.id]))
+
+        order.refresh_from_db()
+        self.assertEqual((order.kitchen_items_total, order.kitchen_items_done), (2, 1))
+
+    def test_update_replacing_items_keeps_counters(self):
+        """Replacing an order's items leaves the F()-maintained counters matching its rows"""
+        KitchenSystemService.enable_kitchen_system(self.branch.id)
+        KitchenSystemService.update_kitchen_settings(self.branch.id, {'auto_assign_stations': False})
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk), token={'role_id': self.role.id})
+        order = self.create_order()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse('order-detail', args=[order.order_id]),
+                {'items': [{'item': self.fries.item_id, 'quantity': 3}]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+        order.refresh_from_db()
+        self.assertEqual((order.item_count, order.kitchen_items_total, order.kitchen_items_done), (1, 1, 0))
+        self.assertEqual(KitchenOrderItem.objects.filter(kitchen_order__order=order).count(), 1)
+
+        # A full save of a stale instance does not write old counts back
+        stale = Order.objects.get(order_id=order.order_id)
+        Order.objects.filter(order_id=order.order_id).update(item_count=5)
+        stale.save()
+        order.refresh_from_db()
+        self.assertEqual(order.item_count, 5)
+
+    def test_recompute_order_summaries(self):
+        """The repair command rebuilds drifted summary columns"""
+        KitchenSystemService.enable_kitchen_system(self.branch.id)
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk), token={'role_id': self.role.id})
+        order = self.create_order()
+        KitchenOrderItem.objects.filter(kitchen_order__order=order).update(status='completed')
+        Order.objects.update(item_count=9, kitchen_items_total=9, kitchen_items_done=9)
+
+        call_command('recompute_order_summaries', batch_size=1, stdout=StringIO())
+
+        order.refresh_from_db()
+        self.assertEqual((order.item_count, order.kitchen_items_total, order.kitchen_items_done), (2, 2, 2))
+
+
+class OrderNumberTestCase(OrderTestMixin, TestCase):
+    def create_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('order-list'), self.order_payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def test_numbers_are_sequential_per_branch_day(self):
+        """Each branch counts its own tickets from 1 every business day"""
+        numbers = [self.create_order()['order_number'] for _ in range(3)]
+        self.assertEqual(numbers, [1, 2, 3])
+
+        other_branch = Branch.objects.create(
+            restaurant=self.restaurant,
+            name='Other Branch',
+            address='456 Test St',
+            phone='123-456-7890',
+            currency=self.currency
+        )
+        order = Order.objects.create(branch=other_branch)
+        self.assertEqual((order.order_number, order.display_number), (1, '#001'))
+
+        tomorrow = OrderNumberService.business_date(self.branch) + timedelta(days=1)
+        self.assertEqual(OrderNumberService.allocate(self.branch.id, tomorrow), 1)
+
+    def test_rolled_back_order_leaves_no_gap(self):
+        """A failed order creation releases its number"""
+        self.create_order()
+        try:
+            with transaction.atomic():
+                Order.objects.create(branch=self.branch)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(self.create_order()['order_number'], 2)
+
+    def test_business_day_start_hour(self):
+        """Orders before the branch's day start count towards the previous day"""
+        self.branch.settings = {'business_day_start_hour': 4}
+        late_night = timezone.make_aware(timezone.datetime(2025, 3, 2, 2, 30))
+        self.assertEqual(OrderNumberService.business_date(self.branch, late_night).isoformat(), '2025-03-01')
+
+    def test_allocate_block(self):
+        """Block allocation reserves a contiguous range in one statement"""
+        today = OrderNumberService.business_date(self.branch)
+        self.assertEqual(OrderNumberService.allocate(self.branch.id, today, count=50), 50)
+        self.assertEqual(OrderNumberService.allocate(self.branch.id, today), 51)
+        self.assertEqual(OrderNumberCounter.objects.get(branch=self.branch).last_number, 51)
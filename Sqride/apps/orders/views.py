@@ -3,9 +3,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from .models import Order, OrderItem,OrderStatus
 from items.models import Item
-from .serializers import OrderSerializer, OrderItemSerializer
+from .serializers import OrderSerializer, OrderItemSerializer, OrderListSerializer
+from .services import OrderService
+from .filters import OrderFilter
 from accounts.permissions import HasRolePermission
 from django.core.exceptions import ValidationError
 from customers.models import Customer
@@ -16,6 +19,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    filterset_class = OrderFilter
 
     def get_permissions(self):
         """Override get_permissions to use different permissions for different actions"""
@@ -30,103 +34,70 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Order.objects.filter(branch=user.branch)
         return Order.objects.none()
 
+    def get_serializer_class(self):
+        """List screens use the flat serializer backed by summary columns"""
+        if self.action == "list":
+            return OrderListSerializer
+        return super().get_serializer_class()
+
     def create(self, request, *args, **kwargs):
         """Create a new order with its items"""
         user = request.user
-        branch=user.branch
         if not hasattr(user, "branch"):
             return Response(
                 {"error": "User must be associated with a branch"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        branch = user.branch
 
         try:
-            with transaction.atomic():
-                # Get customer if provided
-                customer_id = request.data.get("customer")
-                customer = None
-                if customer_id:
-                    customer = Customer.objects.filter(customer_id=customer_id).first()
-                    if not customer:
-                        return Response(
-                            {"error": f"Customer with ID {customer_id} does not exist"},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-                order_type = request.data.get("order_type")
-                table_id=request.data.get("table")
-                
-                if branch.is_dine_in_available and order_type == "dining":
-                    if not table_id:
-                        return Response({
-                            "error":"Table is required for dining order"
-                            
-                        },status=status.HTTP_400_BAD_REQUEST)
-                    
-                    try:
-                        table=RestaurantTable.objects.get(pk=table_id,branch=branch)
-                    except RestaurantTable.DoesNotExist:
-                        return Response({
-                            "error":"There is no such table for this branch"
-                        },status=status.HTTP_400_BAD_REQUEST)
-                else:
-                    table=None
-                # Create the order
-                order = Order.objects.create(
-                    branch=branch,
-                    customer=customer,
-                    order_type=order_type,
-                    currency=branch.currency.currency_code if branch.currency else "PKR",
-                    total_amount=0,
-                    table=table
-                )
-
-                # Get item data from request
-                items_data = request.data.get("items", [])
-                if not items_data:
+            # Get customer if provided
+            customer_id = request.data.get("customer")
+            customer = None
+            if customer_id:
+                customer = Customer.objects.filter(customer_id=customer_id).first()
+                if not customer:
                     return Response(
-                        {"error": "No items provided in the order."},
+                        {"error": f"Customer with ID {customer_id} does not exist"},
                         status=status.HTTP_400_BAD_REQUEST
                     )
+            order_type = request.data.get("order_type")
+            table_id=request.data.get("table")
+            
+            if branch.is_dine_in_available and order_type == "dining":
+                if not table_id:
+                    return Response({
+                        "error":"Table is required for dining order"
+                        
+                    },status=status.HTTP_400_BAD_REQUEST)
+                
+                try:
+                    table=RestaurantTable.objects.get(pk=table_id,branch=branch)
+                except RestaurantTable.DoesNotExist:
+                    return Response({
+                        "error":"There is no such table for this branch"
+                    },status=status.HTTP_400_BAD_REQUEST)
+            else:
+                table=None
+
+            order = OrderService.create_order(
+                branch=branch,
+                items_data=request.data.get("items", []),
+                customer=customer,
+                order_type=order_type,
+                table=table
+            )
 
-                item_ids = [item["item"] for item in items_data]
-                items = Item.objects.filter(item_id__in=item_ids)
-                item_map = {item.item_id: item for item in items}
-
-                order_items = []
-                total_amount = 0
-
-                for item_data in items_data:
-                    item_id = item_data["item"]
-                    quantity = item_data["quantity"]
-
-                    item = item_map.get(item_id)
-                    if not item:
-                        return Response(
-                            {"error": f"Item with ID {item_id} does not exist"},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-
-                    price = item.price
-                    total_amount += price * quantity
-
-                    order_items.append(OrderItem(
-                        order=order,
-                        item=item,
-                        quantity=quantity,
-                        price=price
-                    ))
-
-                # Bulk insert order items
-                OrderItem.objects.bulk_create(order_items)
-
-                # Update order total
-                order.total_amount = total_amount
-                order.save()
-
-                # Return response
-                serializer = self.get_serializer(order)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
+            # Return response
+            prefetch_related_objects([order], 'items__item', 'status_history')
+            serializer = self.get_serializer(order)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+        except ValidationError as e:
+            return Response(
+                {"error": " ".join(e.messages)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)},
@@ -154,7 +125,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                 total_amount = 0
 
                 if items_data:
-                    instance.items.all().delete()
+                    removed = instance.items.all().delete()[1].get(OrderItem._meta.label, 0)
 
                     item_ids = [item["item"] for item in items_data]
                     items = Item.objects.filter(item_id__in=item_ids)
@@ -184,6 +155,10 @@ class OrderViewSet(viewsets.ModelViewSet):
                         ))
 
                     OrderItem.objects.bulk_create(order_item_objects)
+                    OrderService.items_changed(instance, len(order_item_objects) - removed)
+                    transaction.on_commit(
+                        lambda: OrderService.dispatch_order_items_added(instance, order_item_objects)
+                    )
 
                 # Update total and save
                 instance.total_amount = total_amount
@@ -258,6 +233,10 @@ class OrderViewSet(viewsets.ModelViewSet):
                 # Update order total
                 order.total_amount += (price * quantity)
                 order.save()
+                OrderService.items_changed(order, 1)
+                transaction.on_commit(
+                    lambda: OrderService.dispatch_order_items_added(order, [order_item])
+                )
                 
                 serializer = OrderItemSerializer(order_item)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -333,6 +312,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                 # Update order total
                 order.total_amount -= (order_item.price * order_item.quantity)
                 order.save()
+                OrderService.items_changed(order, -1)
                 
                 # Delete the item
                 order_item.delete()
@@ -530,6 +510,10 @@ class OrderItemViewSet(viewsets.ModelViewSet):
                 # Update order total
                 order.total_amount += (order_item.price * order_item.quantity)
                 order.save()
+                OrderService.items_changed(order, 1)
+                transaction.on_commit(
+                    lambda: OrderService.dispatch_order_items_added(order, [order_item])
+                )
 
                 serializer = self.get_serializer(order_item)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -597,6 +581,7 @@ class OrderItemViewSet(viewsets.ModelViewSet):
                 # Update order total
                 order.total_amount -= (order_item.price * order_item.quantity)
                 order.save()
+                OrderService.items_changed(order, -1)
 
                 # Delete the item
                 order_item.delete()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import POSSession, POSOrder, POSOrderItem
+from .models import POSSession, POSOrder, POSOrderItem, InvoiceDocument
 from unfold.admin import ModelAdmin
 
 @admin.register(POSSession)
@@ -25,3 +25,10 @@ class POSOrderItemAdmin(ModelAdmin):
     search_fields = ['item__name', 'pos_order__order__order_id']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
+
+@admin.register(InvoiceDocument)
+class InvoiceDocumentAdmin(ModelAdmin):
+    list_display = ['id', 'pos_order', 'order_version', 'digest', 'rendered_at']
+    search_fields = ['pos_order__order__order_id', 'digest']
+    readonly_fields = ['rendered_at']
+    ordering = ['-rendered_at']
@@ -0,0 +1,134 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.template.loader import render_to_string
+from .models import POSOrder, InvoiceDocument
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'INVOICE_RENDER_WORKERS', 2),
+            thread_name_prefix='invoice-render'
+        )
+    return _executor
+
+
+def _render_in_worker(pos_order_id):
+    try:
+        pos_order = POSOrder.objects.select_related('order', 'order__branch', 'table').get(pk=pos_order_id)
+        InvoiceRenderer.render(pos_order)
+    except Exception:
+        logger.exception("Failed to render invoice for POS order %s", pos_order_id)
+    finally:
+        # Worker threads hold their own connections; don't leak them
+        connections.close_all()
+
+
+class InvoiceRenderer:
+    template_name = 'pos/invoice.html'
+    # POSOrder fields printed on the receipt. Payment changes are saved on
+    # the POS order without touching the order's version, so a cached
+    # document must also match them.
+    POS_FIELDS = ('payment_method', 'payment_status')
+
+    @staticmethod
+    def build_receipt_data(pos_order):
+        """
+        Collect everything printed on the receipt in one pass over the
+        order's items
+        """
+        order = pos_order.order
+        items = pos_order.pos_items.select_related('item')
+
+        return {
+            'order_id': order.order_id,
+            'order_number': order.display_number,
+            'date': order.created_at,
+            'table': pos_order.table.table_number if pos_order.table else 'N/A',
+            'items': [
+                {
+                    'name': item.item.name,
+                    'quantity': item.quantity,
+                    'unit_price': item.unit_price,
+                    'subtotal': item.subtotal
+                } for item in items
+            ],
+            'total_amount': order.total_amount,
+            'payment_method': pos_order.payment_method,
+            'payment_status': pos_order.payment_status
+        }
+
+    @staticmethod
+    def render(pos_order):
+        """
+        Render the printable invoice for the order's current version and
+        store it content-addressed. Returns the cached document when it is
+        already up to date.
+        """
+        document = InvoiceRenderer.get_cached(pos_order)
+        if document is not None:
+            return document
+
+        order = pos_order.order
+        data = InvoiceRenderer.build_receipt_data(pos_order)
+        content = render_to_string(InvoiceRenderer.template_name, {
+            'receipt': data,
+            'branch': order.branch,
+            'currency': order.currency,
+        }).encode('utf-8')
+
+        digest = hashlib.sha256(content).hexdigest()
+        path = f'invoices/{digest[:2]}/{digest}.html'
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(content))
+
+        document, _ = InvoiceDocument.objects.update_or_create(
+            pos_order=pos_order,
+            defaults={
+                'order_version': order.version,
+                'digest': digest,
+                'file': path,
+                'data': data,
+            }
+        )
+        pos_order.invoice = document
+        return document
+
+    @staticmethod
+    def get_cached(pos_order):
+        """
+        Return the stored document if it was rendered from the current
+        order version and POS payment state
+        """
+        try:
+            document = pos_order.invoice
+        except InvoiceDocument.DoesNotExist:
+            return None
+        if document.order_version < pos_order.order.version:
+            return None
+        if any(document.data.get(field) != getattr(pos_order, field) for field in InvoiceRenderer.POS_FIELDS):
+            return None
+        return document
+
+    @staticmethod
+    def get_document(pos_order):
+        """Cached document for print/reprint; renders inline only if stale or missing"""
+        return InvoiceRenderer.get_cached(pos_order) or InvoiceRenderer.render(pos_order)
+
+    @staticmethod
+    def schedule(pos_order_id):
+        """Render the invoice in a background worker once the current transaction commits"""
+        if getattr(settings, 'INVOICE_RENDER_ASYNC', True):
+            transaction.on_commit(lambda: _get_executor().submit(_render_in_worker, pos_order_id))
+        else:
+            transaction.on_commit(lambda: _render_in_worker(pos_order_id))
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:27
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_version', models.PositiveIntegerField()),
+                ('digest', models.CharField(max_length=64)),
+                ('file', models.FileField(upload_to='invoices/')),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+                ('pos_order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='invoice', to='pos.posorder')),
+            ],
+            options={
+                'db_table': 'pos_invoice_documents',
+                'indexes': [models.Index(fields=['digest'], name='idx_pos_invoice_docs_digest')],
+            },
+        ),
+    ]
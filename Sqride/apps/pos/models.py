@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from restaurants.models import Branch, RestaurantTable
 from orders.models import Order
 from items.models import Item
@@ -109,3 +110,26 @@ class POSOrderItem(models.Model):
 
     def __str__(self):
         return f"{self.item.name} x {self.quantity} - {self.pos_order.order.order_id}"
+
+class InvoiceDocument(models.Model):
+    """
+    Rendered receipt/invoice for a POS order. The printable file is stored
+    content-addressed (named by its SHA-256 digest) and is only re-rendered
+    when the order's version moves past ``order_version`` or the POS
+    order's payment state no longer matches ``data``.
+    """
+    pos_order = models.OneToOneField(POSOrder, on_delete=models.CASCADE, related_name='invoice')
+    order_version = models.PositiveIntegerField()
+    digest = models.CharField(max_length=64)
+    file = models.FileField(upload_to='invoices/')
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'pos_invoice_documents'
+        indexes = [
+            models.Index(fields=['digest'], name='idx_pos_invoice_docs_digest'),
+        ]
+
+    def __str__(self):
+        return f"Invoice {self.pos_order.order_id} v{self.order_version}"
@@ -1,3 +1,134 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from rest_framework.test import APIClient
+from restaurants.testing import RestaurantTestMixin
+from accounts.models import UserRole, User
+from items.models import Item, Category
+from orders.models import Order
+from .invoices import InvoiceRenderer
+from .models import POSSession, POSOrder, POSOrderItem, InvoiceDocument
 
-# Create your tests here.
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, INVOICE_RENDER_ASYNC=False)
+class InvoiceDocumentTestCase(RestaurantTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        category = Category.objects.create(restaurant=cls.restaurant, name='Main Course')
+        cls.item = Item.objects.create(
+            branch=cls.branch,
+            category=category,
+            name='Burger',
+            cost=5.00,
+            price=10.00
+        )
+        cls.role = UserRole.objects.create(
+            name='Cashier',
+            branch=cls.branch,
+            POS_system=True,
+            process_billing_in_pos=True
+        )
+        cls.user = User.objects.create_user(
+            branch=cls.branch,
+            role=cls.role,
+            username='cashier',
+            name='Cashier',
+            email='cashier@test.com',
+            password='testpass123'
+        )
+        cls.session = POSSession.objects.create(user=cls.user, branch=cls.branch)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user, token={'role_id': self.role.id})
+        self.order = Order.objects.create(branch=self.branch, total_amount=20, currency='USD')
+        self.pos_order = POSOrder.objects.create(order=self.order, pos_session=self.session)
+        POSOrderItem.objects.create(
+            pos_order=self.pos_order,
+            item=self.item,
+            quantity=2,
+            unit_price=10,
+            subtotal=20
+        )
+
+    def pay(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('pos-order-process-payment', args=[self.pos_order.id]),
+                {'payment_method': 'CASH'}
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_payment_renders_invoice(self):
+        """Completing payment renders and stores the invoice for the final order version"""
+        self.pay()
+
+        document = InvoiceDocument.objects.get(pos_order=self.pos_order)
+        self.order.refresh_from_db()
+        self.assertEqual(document.order_version, self.order.version)
+        self.assertTrue(document.file.name.endswith(f'{document.digest}.html'))
+        self.assertTrue(default_storage.exists(document.file.name))
+        self.assertEqual(document.data['payment_status'], 'PAID')
+        self.assertEqual(document.data['order_number'], '#001')
+
+    def test_reprint_returns_cached_document(self):
+        """Print and reprint serve the stored document without rebuilding it"""
+        self.pay()
+
+        with mock.patch.object(InvoiceRenderer, 'build_receipt_data') as build:
+            for _ in range(2):
+                response = self.client.post(reverse('pos-order-print-receipt', args=[self.pos_order.id]))
+                self.assertEqual(response.status_code, 200)
+        build.assert_not_called()
+        self.assertEqual(response.data['items'][0]['name'], 'Burger')
+
+    def test_version_bump_rerenders(self):
+        """A changed order is re-rendered on the next print"""
+        self.pay()
+        first = InvoiceDocument.objects.get(pos_order=self.pos_order)
+
+        self.order.refresh_from_db()
+        self.order.total_amount = 25
+        self.order.save()
+
+        response = self.client.post(reverse('pos-order-print-receipt', args=[self.pos_order.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], first.order_version + 1)
+        self.assertNotEqual(InvoiceDocument.objects.get(pos_order=self.pos_order).digest, first.digest)
+
+    def test_payment_change_rerenders(self):
+        """A receipt printed before a split payment is not served once the payment state changes"""
+        response = self.client.post(reverse('pos-order-print-receipt', args=[self.pos_order.id]))
+        self.assertEqual(response.data['payment_status'], 'PENDING')
+
+        response = self.client.post(
+            reverse('pos-order-split-payment', args=[self.pos_order.id]),
+            {'payment_methods': ['CASH', 'CARD']},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(reverse('pos-order-print-receipt', args=[self.pos_order.id]))
+        self.assertEqual(response.data['payment_status'], 'PARTIALLY_PAID')
+
+    def test_concurrent_saves_get_distinct_versions(self):
+        """Saves of two stale copies of an order each bump its version"""
+        first = Order.objects.get(pk=self.order.pk)
+        second = Order.objects.get(pk=self.order.pk)
+        first.save()
+        second.save()
+
+        self.assertEqual((first.version, second.version), (self.order.version + 1, self.order.version + 2))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.version, second.version)
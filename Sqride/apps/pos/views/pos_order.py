@@ -4,9 +4,13 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.db import transaction
+from django.http import FileResponse
 from pos.models import POSSession, POSOrder, POSOrderItem
 from pos.serializers import POSOrderSerializer, POSOrderItemSerializer
+from pos.invoices import InvoiceRenderer
+from orders.models import OrderItem
 from orders.serializers import OrderSerializer
+from orders.services import OrderService
 from items.models import Item
 from restaurants.models import RestaurantTable
 from accounts.permissions import HasRolePermission
@@ -122,6 +126,7 @@ class POSOrderViewSet(viewsets.ModelViewSet):
 
                 total_amount = 0
                 created_items = []
+                order_items = []
                 
                 for item_data in items_data:
                     try:
@@ -140,12 +145,17 @@ class POSOrderViewSet(viewsets.ModelViewSet):
                             notes=item_data.get('notes')
                         )
                         created_items.append(pos_item)
+                        order_items.append(OrderItem(order=order, item=item, quantity=quantity, price=unit_price))
                     except Item.DoesNotExist:
                         # If any item is not found, roll back the transaction
                         raise Exception(f"Item with ID {item_data['item']} not found")
                     except Exception as e:
                         raise Exception(f"Error creating item: {str(e)}")
 
+                # The order's own items, which the kitchen builds its ticket from
+                OrderItem.objects.bulk_create(order_items)
+                OrderService.items_changed(order, len(order_items))
+
                 # Update order total
                 order.total_amount = total_amount
                 order.save()
@@ -158,6 +168,11 @@ class POSOrderViewSet(viewsets.ModelViewSet):
                 # Reserve stock
                 order.reserve_stock()
 
+                # Hand the order to downstream consumers (kitchen) once committed
+                transaction.on_commit(
+                    lambda: OrderService.dispatch_order_placed(order, order_items)
+                )
+
                 # Get the complete order with items
                 response_serializer = self.get_serializer(pos_order)
                 return Response(response_serializer.data, status=status.HTTP_201_CREATED)
@@ -282,6 +297,9 @@ class POSOrderViewSet(viewsets.ModelViewSet):
                 order.status = 'completed'
                 order.save()
 
+                # Build the invoice once, off the request, after the payment commits
+                InvoiceRenderer.schedule(instance.pk)
+
                 return Response({"message": "Payment processed successfully"})
 
         except Exception as e:
@@ -438,32 +456,27 @@ class POSOrderViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def print_receipt(self, request, pk=None):
-        """Generate receipt for an order"""
+        """Return the receipt for an order, re-rendering only if the order changed"""
         pos_order = self.get_object()
-        
-        # Get order details
-        order = pos_order.order
-        items = pos_order.pos_items.all()
-        
-        # Format receipt data
-        receipt_data = {
-            'order_id': order.order_id,
-            'date': order.created_at,
-            'table': pos_order.table.table_number if pos_order.table else 'N/A',
-            'items': [
-                {
-                    'name': item.item.name,
-                    'quantity': item.quantity,
-                    'unit_price': item.unit_price,
-                    'subtotal': item.subtotal
-                } for item in items
-            ],
-            'total_amount': order.total_amount,
-            'payment_method': pos_order.payment_method,
-            'payment_status': pos_order.payment_status
-        }
-        
-        return Response(receipt_data)
+        document = InvoiceRenderer.get_document(pos_order)
+
+        return Response({
+            **document.data,
+            'version': document.order_version,
+            'document_url': document.file.url
+        })
+
+    @action(detail=True, methods=['get'])
+    def invoice(self, request, pk=None):
+        """Download the printable invoice document for an order"""
+        pos_order = self.get_object()
+        document = InvoiceRenderer.get_document(pos_order)
+
+        return FileResponse(
+            document.file.open('rb'),
+            content_type='text/html; charset=utf-8',
+            filename=f"invoice-{pos_order.order_id}.html"
+        )
 
     @action(detail=True, methods=['post'])
     def transfer_table(self, request, pk=None):
@@ -504,5 +517,8 @@ class POSOrderViewSet(viewsets.ModelViewSet):
         # Update order
         pos_order.table = new_table
         pos_order.save()
+
+        # The table is printed on the receipt, so this is a new order revision
+        pos_order.order.save(update_fields=['updated_at'])
         
         return Response({"message": "Table transferred successfully"}) 
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0007_alter_branch_operating_hours_alter_branch_settings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='kitchen_state_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
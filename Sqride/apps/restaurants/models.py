@@ -85,6 +85,7 @@ class Branch(TimestampedModel):
     # Kitchen system
     kitchen_enabled = models.BooleanField(default=False)
     kitchen_settings = models.JSONField(default=dict, blank=True)  # For storing kitchen-specific settings
+    kitchen_state_version = models.PositiveBigIntegerField(default=0)  # Bumped after every committed kitchen write
     
     class Meta:
         db_table = "branches"
@@ -96,6 +97,19 @@ class Branch(TimestampedModel):
             models.UniqueConstraint(fields=["restaurant", "name"], name="unique_branch_name_per_restaurant")
         ]
 
+    # Bumped only by UPDATEs from KitchenStateService. Saving an existing
+    # branch leaves it alone unless it is named in update_fields, so a stale
+    # instance never writes an old version back.
+    COUNTER_FIELDS = ('kitchen_state_version',)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} - {self.restaurant.name}"
 
@@ -11,7 +11,7 @@ class BranchSerializer(serializers.ModelSerializer):
     class Meta:
         model = Branch
         fields = '__all__'
-        read_only_fields = ('restaurant',)
+        read_only_fields = ('restaurant', 'kitchen_state_version')
 
 class RestaurantSerializer(serializers.ModelSerializer):
     branches = BranchSerializer(many=True, read_only=True)
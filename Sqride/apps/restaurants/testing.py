@@ -0,0 +1,45 @@
+from accounts.models import Owner, SuperAdmin
+from .models import Restaurant, Branch, Currency
+
+
+class RestaurantTestMixin:
+    """
+    The super admin, owner, restaurant, currency and branch most tests start
+    from. TestCase subclasses get them once per class in setUpTestData;
+    TransactionTestCase subclasses call create_restaurant() from setUp.
+    BRANCH_FIELDS sets extra fields on the branch.
+    """
+    BRANCH_FIELDS = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.create_restaurant()
+
+    @classmethod
+    def create_restaurant(cls):
+        cls.super_admin = SuperAdmin.objects.create_user(
+            username='testadmin',
+            email='admin@test.com',
+            password='testpass123'
+        )
+        cls.owner = Owner.objects.create(
+            super_admin=cls.super_admin,
+            username='testowner',
+            name='Test Owner',
+            email='owner@test.com'
+        )
+        cls.restaurant = Restaurant.objects.create(owner=cls.owner, name='Test Restaurant')
+        cls.currency = Currency.objects.create(currency_code='USD', exchange_rate=1.0)
+        cls.branch = cls.create_branch()
+
+    @classmethod
+    def create_branch(cls, name='Test Branch', **fields):
+        return Branch.objects.create(
+            restaurant=cls.restaurant,
+            name=name,
+            address='123 Test St',
+            phone='123-456-7890',
+            currency=cls.currency,
+            **{**cls.BRANCH_FIELDS, **fields}
+        )